@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+图表类型分类器
+规则表（特征串 → 标签与权重）中的全部特征串建成前缀树并编译成一个正则，每段代码只扫描一遍即可找出全部特征串，
+再按命中的规则累加各标签的权重，得到带置信度的多标签结果（如 ybar 柱状图上叠加 scatter 标记时两者都保留）。
+共用前缀只比较一次，规则增加到上千条时扫描代价也几乎不变。各提取器共用此分类器。
+"""
+
+import re
+import time
+from typing import Any, List, Dict, Iterable, Optional, Set, Tuple
+
+OTHER = "other"
+PRIOR_WEIGHT = 4.0      # 提取器所属宏包的领域标签（如 circuitikz → circuit）的先验权重
+CONFIDENCE_DIGITS = 3
+
+# 规则：(标签, 权重, 特征串)，特征串全部出现才命中；同分时规则表中先出现的标签优先
+CHART_RULES: Tuple[Tuple[str, float, Tuple[str, ...]], ...] = (
+    # pgfplots
+    ("bar_chart", 4.0, ("\\addplot", "ybar")),
+    ("bar_chart", 4.0, ("\\addplot", "xbar")),
+    ("3d_plot", 3.5, ("\\addplot", "mesh")),
+    ("3d_plot", 3.5, ("\\addplot", "surf")),
+    ("3d_plot", 3.5, ("\\addplot3",)),
+    ("scatter_plot", 3.0, ("\\addplot", "scatter")),
+    ("scatter_plot", 1.0, ("\\addplot", "only marks")),
+    ("line_chart", 2.0, ("\\addplot",)),
+    ("pie_chart", 3.0, ("\\pie",)),
+    # 三维绘图宏包
+    ("3d_plot", 3.0, ("\\psSolid",)),
+    ("3d_plot", 2.0, ("\\psSurface",)),
+    ("3d_plot", 2.0, ("\\tdplotsetmaincoords",)),
+    # 领域宏包
+    ("network", 3.0, ("\\Vertex",)),
+    ("network", 2.0, ("\\Edge",)),
+    ("network", 1.0, ("\\Vertices",)),
+    ("chemistry", 4.0, ("\\chemfig",)),
+    ("chemistry", 1.0, ("\\chemname",)),
+    ("chemistry", 1.0, ("\\schemestart",)),
+    ("circuit", 4.0, ("\\begin{circuitikz}",)),
+    ("circuit", 2.0, ("\\ctikzset",)),
+    ("circuit", 1.0, ("to[R",)),
+    ("circuit", 1.0, ("to[C",)),
+    ("circuit", 1.0, ("to[L",)),
+    ("circuit", 1.0, ("to[battery",)),
+    ("circuit", 1.0, ("to[short",)),
+    ("geometry", 3.0, ("\\tkzDefPoint",)),
+    ("geometry", 2.0, ("\\tkzDraw",)),
+    ("geometry", 1.0, ("\\tkzLabel",)),
+    ("geometry", 1.0, ("\\tkzMark",)),
+    ("geometry", 1.0, ("\\tkzInit",)),
+    # 通用 TikZ
+    ("node_graph", 1.0, ("\\node", "\\draw")),
+)
+
+# 提取器所属宏包的领域标签
+PACKAGE_LABELS: Dict[str, str] = {
+    "tikz-network": "network",
+    "chemfig": "chemistry",
+    "circuitikz": "circuit",
+    "tkz-euclide": "geometry",
+}
+
+
+class PatternMatcher:
+    """多特征串匹配器：特征串先建成前缀树，再把前缀树编译成一个正则，由 re 在 C 中扫描
+
+    共用前缀只比较一次（如 \\addplot 与 \\addplot3、to[R 与 to[C），每个位置的代价取决于前缀树的深度而不是特征串个数；
+    每个起点贪婪地报告最长的特征串，被它包含的特征串（含同一起点的较短特征串）按包含关系补全。
+    下一次查找从上一处匹配的下一个字符开始，交叠的出现不会漏掉。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(dict.fromkeys(patterns))
+        trie: Dict[str, Dict] = {}
+        for pattern in self.patterns:
+            node = trie
+            for ch in pattern:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+        self._regex = re.compile(self._trie_pattern(trie))
+        self._implied = {p: tuple(i for i, q in enumerate(self.patterns) if q in p) for p in self.patterns}
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict[str, Dict]) -> str:
+        """前缀树结点 → 正则：子结点为分支；结点本身是特征串结尾时后续部分可选（贪婪，优先更长的特征串）"""
+        branches = [re.escape(ch) + cls._trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' not in node:
+            return body
+        return f'(?:{body})?' if len(branches) == 1 else body + '?'
+
+    def find(self, text: str) -> Set[int]:
+        """一遍扫描，返回在 text 中出现过的模式串下标"""
+        search = self._regex.search
+        found: Set[int] = set()
+        match = search(text)
+        while match is not None:
+            found.update(self._implied[match.group()])
+            match = search(text, match.start() + 1)
+        return found
+
+
+class ChartClassifier:
+    """规则表分类器：特征串命中后累加标签权重，置信度为各标签权重占总权重的比例"""
+
+    def __init__(self, rules: Iterable[Tuple[str, float, Tuple[str, ...]]] = CHART_RULES):
+        self.rules = list(rules)
+        self.matcher = PatternMatcher(p for _, _, patterns in self.rules for p in patterns)
+        index = {pattern: i for i, pattern in enumerate(self.matcher.patterns)}
+        # 特征串 → 需要它的规则；只有一个特征串的规则可以直接命中
+        self._rules_by_pattern: List[List[int]] = [[] for _ in self.matcher.patterns]
+        for rule, (_, _, patterns) in enumerate(self.rules):
+            for pattern in set(patterns):
+                self._rules_by_pattern[index[pattern]].append(rule)
+        self._required = [len(set(patterns)) for _, _, patterns in self.rules]
+        self._order = {label: i for i, label in enumerate(dict.fromkeys(label for label, _, _ in self.rules))}
+
+    def scores(self, code: str) -> Dict[str, float]:
+        """各标签的累计权重（只含命中的标签）"""
+        hits: Dict[int, int] = {}
+        scores: Dict[str, float] = {}
+        for pattern in self.matcher.find(code):
+            for rule in self._rules_by_pattern[pattern]:
+                hits[rule] = hits.get(rule, 0) + 1
+                if hits[rule] == self._required[rule]:
+                    label, weight, _ = self.rules[rule]
+                    scores[label] = scores.get(label, 0.0) + weight
+        return scores
+
+    def classify(self, code: str, prior: Optional[str] = None) -> Tuple[str, Dict[str, float]]:
+        """返回 (主标签, {标签: 置信度})，置信度降序；prior 为宏包的领域标签，按 PRIOR_WEIGHT 计入
+
+        没有任何规则命中时主标签为 prior，没有 prior 时为 other。
+        """
+        scores = self.scores(code)
+        if prior:
+            scores[prior] = scores.get(prior, 0.0) + PRIOR_WEIGHT
+        if not scores:
+            return OTHER, {OTHER: 1.0}
+        total = sum(scores.values())
+        ranked = sorted(scores, key=lambda label: (-scores[label], self._order.get(label, len(self._order)), label))
+        return ranked[0], {label: round(scores[label] / total, CONFIDENCE_DIGITS) for label in ranked}
+
+
+_classifier: Optional[ChartClassifier] = None
+
+
+def classify_chart(code: str, package: Optional[str] = None) -> Tuple[str, Dict[str, float]]:
+    """用默认规则表分类一段代码，package 为所属宏包（决定领域先验）"""
+    global _classifier
+    if _classifier is None:
+        _classifier = ChartClassifier()
+    return _classifier.classify(code, PACKAGE_LABELS.get(package or ""))
+
+
+def chart_fields(code: str, package: Optional[str] = None,
+                 aliases: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """知识库条目中的图表字段：主标签 chart_type 与带置信度的多标签 chart_labels
+
+    aliases 把分类器的标签改成调用方已有输出中的名称（如 network → network_graph）。
+    """
+    chart_type, chart_labels = classify_chart(code, package)
+    if aliases:
+        chart_type = aliases.get(chart_type, chart_type)
+        chart_labels = {aliases.get(label, label): confidence for label, confidence in chart_labels.items()}
+    return {"chart_type": chart_type, "chart_labels": chart_labels}
+
+
+def main():
+    """主函数：对知识库中的全部示例重新分类，与已有 chart_type 对比并统计多标签与耗时"""
+    import json
+    from pathlib import Path
+
+    print("=" * 70)
+    print("图表类型分类器")
+    print("=" * 70)
+
+    knowledge_file = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+    with open(knowledge_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    examples = [item for item in data if item.get('type') == 'executable_example']
+
+    classifier = ChartClassifier()
+    print(f"\n规则: {len(classifier.rules)} 条, 特征串: {len(classifier.matcher.patterns)} 个")
+    start = time.perf_counter()
+    results = [classifier.classify(item.get('code', ''), PACKAGE_LABELS.get(item.get('macro_package', '')))
+               for item in examples]
+    elapsed = time.perf_counter() - start
+    size = sum(len(item.get('code', '')) for item in examples)
+    print(f"✓ {len(examples)} examples ({size / 1024:.0f} KB) in {elapsed * 1000:.0f} ms")
+
+    same = sum(1 for item, (label, _) in zip(examples, results) if label == item.get('chart_type'))
+    multi = sum(1 for _, labels in results if len(labels) > 1)
+    print(f"  与现有 chart_type 一致: {same} ({same / len(examples):.1%})")
+    print(f"  多标签: {multi} ({multi / len(examples):.1%})")
+
+    # 扫描耗时随特征串数的变化：现有特征串，以及补入知识库中的宏名扩充到数百、上千个；对照逐个特征串做子串查找
+    codes = [item.get('code', '') for item in examples]
+    macros = sorted({m for code in codes for m in re.findall(r'\\[A-Za-z]+', code)} - set(classifier.matcher.patterns))
+    print(f"\n{'特征串':>8} {'PatternMatcher':>16} {'逐个 in':>10}")
+    for extra in (0, 300, 1000):
+        patterns = classifier.matcher.patterns + macros[::max(1, len(macros) // extra)][:extra] if extra else \
+            classifier.matcher.patterns
+        matcher = PatternMatcher(patterns)
+        start = time.perf_counter()
+        for code in codes:
+            matcher.find(code)
+        scanned = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for code in codes:
+            [i for i, pattern in enumerate(patterns) if pattern in code]
+        substring = (time.perf_counter() - start) * 1000
+        print(f"{len(patterns):>8} {scanned:>13.0f} ms {substring:>7.0f} ms")
+
+    changes: Dict[Tuple[str, str], int] = {}
+    for item, (label, _) in zip(examples, results):
+        if label != item.get('chart_type'):
+            key = (item.get('chart_type', ''), label)
+            changes[key] = changes.get(key, 0) + 1
+    if changes:
+        print("\n主标签变化:")
+        for (old, new), n in sorted(changes.items(), key=lambda x: -x[1])[:15]:
+            print(f"  {old:15s} -> {new:15s} {n:5d}")
+
+
+if __name__ == '__main__':
+    main()
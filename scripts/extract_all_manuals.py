@@ -12,6 +12,10 @@ from typing import List, Dict, Any
 import hashlib
 from abc import ABC, abstractmethod
 
+from stats_cube import StatsCube, kb_version
+from chart_classifier import chart_fields
+from index_snapshot import build_snapshot
+
 
 class BaseExtractor(ABC):
     """提取器基类"""
@@ -91,7 +95,7 @@ class TikzNetworkExtractor(BaseExtractor):
                 items.append({
                     "type": "executable_example",
                     "macro_package": self.package_name,
-                    "chart_type": "network",
+                    **chart_fields(code, self.package_name),
                     "code": code,
                     "source_file": "tikz-network.tex",
                     "id": self._generate_id(f"example_{idx}")
@@ -131,7 +135,7 @@ class ChemfigExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "chemistry",
+                **chart_fields(code, self.package_name),
                 "title": title,
                 "description": title,
                 "code": code,
@@ -233,7 +237,7 @@ class CircuitikzExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "circuit",
+                **chart_fields(code, self.package_name),
                 "code": code,
                 "source_file": "circuitikzmanual.tex",
                 "id": self._generate_id(f"example_{idx}")
@@ -296,7 +300,7 @@ class TkzEuclideExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "geometry",
+                **chart_fields(code, self.package_name),
                 "code": code,
                 "source_file": source_file.name,
                 "id": self._generate_id(f"example_{source_file.stem}_{idx}")
@@ -376,13 +380,10 @@ class StandardExtractor(BaseExtractor):
         for idx, match in enumerate(matches):
             code = match.group(2).strip()
 
-            # 判断图表类型
-            chart_type = self._detect_chart_type(code)
-
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": chart_type,
+                **chart_fields(code, self.package_name),
                 "code": code,
                 "source_file": str(filepath.relative_to(self.manual_dir)),
                 "id": self._generate_id(f"example_{filepath.stem}_{idx}")
@@ -390,24 +391,6 @@ class StandardExtractor(BaseExtractor):
 
         return items
 
-    def _detect_chart_type(self, code: str) -> str:
-        """检测图表类型"""
-        if '\\addplot' in code:
-            if 'ybar' in code or 'xbar' in code:
-                return "bar_chart"
-            elif 'scatter' in code:
-                return "scatter_plot"
-            elif 'mesh' in code or 'surf' in code:
-                return "3d_plot"
-            else:
-                return "line_chart"
-        elif '\\node' in code and '\\draw' in code:
-            return "node_graph"
-        elif '\\pie' in code:
-            return "pie_chart"
-        else:
-            return "other"
-
 
 class GenericTeXExtractor(BaseExtractor):
     """通用 TeX 提取器 - 用于新增的手册包"""
@@ -452,7 +435,7 @@ class GenericTeXExtractor(BaseExtractor):
                     items.append({
                         "type": "executable_example",
                         "macro_package": self.package_name,
-                        "chart_type": "other",
+                        **chart_fields(code, self.package_name),
                         "code": code,
                         "source_file": str(filepath.relative_to(self.manual_dir)),
                         "id": self._generate_id(f"example_{filepath.stem}_{env}_{idx}")
@@ -531,7 +514,7 @@ class DTXExtractor(BaseExtractor):
                     items.append({
                         "type": "executable_example",
                         "macro_package": self.package_name,
-                        "chart_type": "other",
+                        **chart_fields(code, self.package_name),
                         "code": code,
                         "source_file": filepath.name,
                         "id": self._generate_id(f"example_{filepath.stem}_{idx}")
@@ -589,7 +572,7 @@ class SoulExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "other",
+                **chart_fields(cmd["example"], self.package_name),
                 "code": cmd["example"],
                 "description": cmd["description"],
                 "source_file": "README.md",
@@ -670,9 +653,13 @@ def main():
     with open(combined_path, 'w', encoding='utf-8') as f:
         json.dump(all_items, f, indent=2, ensure_ascii=False)
 
-    # 保存统计信息
+    # 统计立方体与知识库版本一起保存，extraction-stats.json 由它汇总（失败的包记 0）
+    cube = StatsCube.build(all_items, kb_version(combined_path.read_bytes()))
+    cube.save(output_base / "stats-cube.json")
+    # 索引快照随知识库一起构建并切换 CURRENT，服务端启动或热重载时直接挂载新版本
+    snapshot = build_snapshot(all_items, cube.kb_version, output_base / "index" / "snapshots")
+    stats = cube.extraction_stats(stats)
     stats_path = output_base / "extraction-stats.json"
-    stats["total"] = len(all_items)
     with open(stats_path, 'w', encoding='utf-8') as f:
         json.dump(stats, f, indent=2, ensure_ascii=False)
 
@@ -692,6 +679,7 @@ def main():
     print(f"{'Total':25s}: {stats['total']:6d} items")
     print(f"\nCombined output: {combined_path}")
     print(f"Statistics: {stats_path}")
+    print(f"Index snapshot: {snapshot}")
     print("=" * 70)
 
 
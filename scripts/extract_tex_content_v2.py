@@ -12,6 +12,15 @@ from typing import List, Dict, Any
 import hashlib
 from abc import ABC, abstractmethod
 
+from stats_cube import StatsCube, kb_version
+from chart_classifier import chart_fields
+
+# 本脚本输出中已有的图表标签名（与 extract_all_manuals.py 不同），分类结果按此改名以保持兼容
+CHART_LABEL_ALIASES = {
+    "network": "network_graph",
+    "chemistry": "chemical_structure",
+}
+
 
 class BaseExtractor(ABC):
     """提取器基类"""
@@ -97,7 +106,7 @@ class TikzNetworkExtractor(BaseExtractor):
                 items.append({
                     "type": "executable_example",
                     "macro_package": self.package_name,
-                    "chart_type": "network_graph",
+                    **chart_fields(code, self.package_name, CHART_LABEL_ALIASES),
                     "code": code,
                     "source_file": "tikz-network.tex",
                     "id": self._generate_id(f"example_{idx}")
@@ -140,7 +149,7 @@ class ChemfigExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "chemical_structure",
+                **chart_fields(code, self.package_name, CHART_LABEL_ALIASES),
                 "title": title,
                 "code": code,
                 "source_file": "chemfig-en.tex",
@@ -245,7 +254,7 @@ class CircuitikzExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "circuit",
+                **chart_fields(code, self.package_name, CHART_LABEL_ALIASES),
                 "code": code,
                 "source_file": "circuitikzmanual.tex",
                 "id": self._generate_id(f"example_{idx}")
@@ -309,7 +318,7 @@ class TkzEuclideExtractor(BaseExtractor):
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": "geometry",
+                **chart_fields(code, self.package_name, CHART_LABEL_ALIASES),
                 "code": code,
                 "source_file": source_file.name,
                 "id": self._generate_id(f"example_{source_file.stem}_{idx}")
@@ -390,13 +399,10 @@ class StandardExtractor(BaseExtractor):
         for idx, match in enumerate(matches):
             code = match.group(2).strip()
 
-            # 判断图表类型
-            chart_type = self._detect_chart_type(code)
-
             items.append({
                 "type": "executable_example",
                 "macro_package": self.package_name,
-                "chart_type": chart_type,
+                **chart_fields(code, self.package_name, CHART_LABEL_ALIASES),
                 "code": code,
                 "source_file": str(filepath.relative_to(self.manual_dir)),
                 "id": self._generate_id(f"example_{filepath.stem}_{idx}")
@@ -404,24 +410,6 @@ class StandardExtractor(BaseExtractor):
 
         return items
 
-    def _detect_chart_type(self, code: str) -> str:
-        """检测图表类型"""
-        if '\\addplot' in code:
-            if 'ybar' in code or 'xbar' in code:
-                return "bar_chart"
-            elif 'scatter' in code:
-                return "scatter_plot"
-            elif 'mesh' in code or 'surf' in code:
-                return "3d_plot"
-            else:
-                return "line_chart"
-        elif '\\node' in code and '\\draw' in code:
-            return "node_graph"
-        elif '\\pie' in code:
-            return "pie_chart"
-        else:
-            return "other"
-
 
 class ExtractorFactory:
     """提取器工厂"""
@@ -495,9 +483,11 @@ def main():
     with open(combined_path, 'w', encoding='utf-8') as f:
         json.dump(all_items, f, indent=2, ensure_ascii=False)
 
-    # 保存统计信息
+    # 统计立方体与知识库版本一起保存，extraction-stats.json 由它汇总
+    cube = StatsCube.build(all_items, kb_version(combined_path.read_bytes()))
+    cube.save(output_base / "stats-cube.json")
+    stats = cube.extraction_stats(stats)
     stats_path = output_base / "extraction-stats.json"
-    stats["total"] = len(all_items)
     with open(stats_path, 'w', encoding='utf-8') as f:
         json.dump(stats, f, indent=2, ensure_ascii=False)
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+分面位图索引
+为 macro_package / type / chart_type 等字段的每个取值预先构建位图，
+过滤与分面计数都化为整数按位运算
+"""
+
+import zlib
+from typing import List, Dict, Iterable, Optional, Union
+
+# 分面字段 -> 从原始条目取值的函数
+FACET_FIELDS = {
+    "macro_package": lambda item: item.get('macro_package', 'unknown'),
+    "type": lambda item: item.get('type', 'unknown'),
+    "chart_type": lambda item: item.get('chart_type') if item.get('type') == 'executable_example' else None,
+    "has_example": lambda item: bool(item.get('code')),
+    "complexity": lambda item: code_complexity(item.get('code', '')),
+}
+
+# search.mdx 中 package 过滤值与知识库宏包名的对应
+PACKAGE_ALIASES = {
+    "tikz": "tikz-pgf",
+    "pgf": "tikz-pgf",
+}
+
+
+def code_complexity(code: str) -> Optional[str]:
+    """按代码行数粗分复杂度（basic / intermediate / advanced）"""
+    if not code:
+        return None
+    lines = code.count('\n') + 1
+    if lines <= 5:
+        return "basic"
+    if lines <= 20:
+        return "intermediate"
+    return "advanced"
+
+
+def popcount(bitmap: int) -> int:
+    """位图中置位的数量"""
+    return bitmap.bit_count()
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """由条目下标集合构造位图（经 bytearray 一次转换，避免逐位创建大整数）"""
+    buffer = bytearray(size // 8 + 1)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_bits(bitmap: int) -> Iterable[int]:
+    """按升序遍历位图中置位的下标"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """分面位图
+
+    位图用 Python 任意精度整数表示：第 i 位为 1 表示第 i 个条目取该值。
+    按位与/或在 C 层面逐机器字完成，9k 条目的位图只有约 1.1 KB；
+    持久化时用 zlib 压缩，稀疏取值（如单个 chart_type）压缩后只有几十字节。
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.all = (1 << size) - 1
+        self.bitmaps: Dict[str, Dict[object, int]] = {field: {} for field in FACET_FIELDS}
+        self._counts: Dict[str, Dict[object, int]] = {}
+
+    @classmethod
+    def build(cls, data: List[Dict]) -> 'FacetIndex':
+        """单次遍历为所有分面字段建位图"""
+        index = cls(len(data))
+        values: Dict[str, Dict[object, List[int]]] = {field: {} for field in FACET_FIELDS}
+        for pos, item in enumerate(data):
+            for field, getter in FACET_FIELDS.items():
+                value = getter(item)
+                if value is not None:
+                    values[field].setdefault(value, []).append(pos)
+
+        for field, groups in values.items():
+            for value, positions in groups.items():
+                index.bitmaps[field][value] = bitmap_from_positions(positions, len(data))
+        return index
+
+    def bitmap(self, field: str, values: Union[str, bool, List[Union[str, bool]]]) -> int:
+        """取一个或多个取值的位图（多值按 OR 合并）
+
+        取值只能是字符串、布尔值（has_example）或它们的数组，其他类型（如对象）抛出 ValueError。
+        """
+        if isinstance(values, (str, bool)):
+            values = [values]
+        elif not isinstance(values, (list, tuple)) or not all(isinstance(v, (str, bool)) for v in values):
+            raise ValueError(f"Filter value {values!r} must be a string or an array of strings")
+        if field == "macro_package":
+            values = [PACKAGE_ALIASES.get(v, v) for v in values]
+        result = 0
+        for value in values:
+            result |= self.bitmaps.get(field, {}).get(value, 0)
+        return result
+
+    def mask(self, filters: Dict[str, object]) -> int:
+        """多个字段的过滤条件按 AND 合并；未知字段抛出 KeyError"""
+        result = self.all
+        for field, values in filters.items():
+            if values is None:
+                continue
+            if field not in self.bitmaps:
+                raise KeyError(field)
+            result &= self.bitmap(field, values)
+        return result
+
+    def counts(self, field: str, within: Optional[int] = None) -> Dict[object, int]:
+        """某分面在结果集 within 内各取值的条目数；不传 within 时返回缓存的全量计数"""
+        if within is None:
+            if field not in self._counts:
+                self._counts[field] = {v: popcount(b) for v, b in self.bitmaps[field].items()}
+            return self._counts[field]
+        counts = {}
+        for value, bitmap in self.bitmaps[field].items():
+            count = popcount(bitmap & within)
+            if count:
+                counts[value] = count
+        return counts
+
+    def facet_counts(self, within: Optional[int] = None,
+                     fields: Iterable[str] = ("macro_package", "type", "chart_type")) -> Dict[str, Dict]:
+        """多个分面的计数，随搜索结果一并返回"""
+        return {field: self.counts(field, within) for field in fields}
+
+    def to_dict(self) -> Dict:
+        """序列化：每个位图压缩后转十六进制"""
+        nbytes = (self.size + 7) // 8
+        return {
+            "size": self.size,
+            "bitmaps": {
+                field: [[value, zlib.compress(bitmap.to_bytes(nbytes, 'little')).hex()]
+                        for value, bitmap in groups.items()]
+                for field, groups in self.bitmaps.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> 'FacetIndex':
+        """从 to_dict 的结果恢复"""
+        index = cls(payload["size"])
+        for field, groups in payload["bitmaps"].items():
+            index.bitmaps[field] = {
+                value: int.from_bytes(zlib.decompress(bytes.fromhex(blob)), 'little')
+                for value, blob in groups
+            }
+        return index
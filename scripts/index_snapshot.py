@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+索引快照
+把倒排表、分面位图、LSH 向量与桶、条目存储一次性写入按知识库版本命名的快照目录。
+数组以定长二进制段保存，服务端启动时只需 mmap 后用 memoryview 直接访问，不反序列化 Python 对象。
+"""
+
+import os
+import sys
+import json
+import mmap
+import fcntl
+import time
+import hashlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+
+from facet_index import FacetIndex
+from item_store import ItemStore
+from lsh_index import LSHIndex, Vector, build_example_index
+from page_engine import PageEngine
+from search_engine import SearchEngine, item_content
+from token_budget import estimate_tokens
+
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_ROOT = Path(__file__).parent.parent / 'knowledge-base' / 'index' / 'snapshots'
+MANIFEST_FILE = 'manifest.json'
+SECTIONS_FILE = 'index.bin'
+CURRENT_FILE = 'CURRENT'  # 指向当前快照目录名的指针文件
+BUILD_LOCK_FILE = '.build.lock'  # 首次构建时的排他文件锁，多个进程同时启动时只有一个构建
+KEEP_SNAPSHOTS = 3         # 保留的历史版本数（含当前版本）
+ALIGNMENT = 8
+
+
+class SectionWriter:
+    """把多个定长数组段按 8 字节对齐顺序写入同一个文件"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.sections: Dict[str, List] = {}
+        self.size = 0
+
+    def add(self, name: str, data: bytes, typecode: str = 'B'):
+        padding = -self.size % ALIGNMENT
+        if padding:
+            self.chunks.append(b'\0' * padding)
+            self.size += padding
+        self.sections[name] = [self.size, len(data), typecode]
+        self.chunks.append(data)
+        self.size += len(data)
+
+    def add_array(self, name: str, typecode: str, values):
+        self.add(name, array(typecode, values).tobytes(), typecode)
+
+    def add_strings(self, name: str, strings: List[str]):
+        """字符串表：拼接后的 UTF-8 字节 + 起始偏移数组"""
+        offsets = [0]
+        blob = bytearray()
+        for text in strings:
+            blob += text.encode('utf-8')
+            offsets.append(len(blob))
+        self.add(name + '.blob', bytes(blob))
+        self.add_array(name + '.offsets', 'I', offsets)
+
+    def write(self, path: Path):
+        with open(path, 'wb') as f:
+            for chunk in self.chunks:
+                f.write(chunk)
+
+
+class StringTable:
+    """有序字符串表上的二分查找（直接比较 mmap 中的字节）"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob = blob
+        self.offsets = offsets
+        self.count = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def key(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def __getitem__(self, i: int) -> str:
+        return self.key(i).decode('utf-8')
+
+    def find(self, text: str) -> Optional[int]:
+        target = text.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.key(lo) == target else None
+
+
+class TermMap:
+    """词 -> 值 的只读映射，值由词在有序词表中的序号按需从数组段中取出"""
+
+    def __init__(self, terms: StringTable, getter):
+        self.terms = terms
+        self.getter = getter
+
+    def __contains__(self, term: str) -> bool:
+        return self.terms.find(term) is not None
+
+    def __getitem__(self, term: str):
+        i = self.terms.find(term)
+        if i is None:
+            raise KeyError(term)
+        return self.getter(i)
+
+    def get(self, term: str, default=None):
+        i = self.terms.find(term)
+        value = None if i is None else self.getter(i)
+        return default if value is None else value
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.terms[i] for i in range(len(self.terms)))
+
+
+class MappedBuckets:
+    """LSH 单张表：有序桶键 + 成员区间"""
+
+    def __init__(self, keys: memoryview, starts: memoryview, members: memoryview):
+        self.keys = keys
+        self.starts = starts
+        self.members = members
+
+    def get(self, key: int, default=()):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.members[self.starts[i]:self.starts[i + 1]]
+        return default
+
+
+class MappedVectors(Sequence):
+    """CSR 布局的稀疏向量，按行取出时才组装成 {词表序号: 权重}"""
+
+    def __init__(self, row_start: memoryview, cols: memoryview, vals: memoryview):
+        self.row_start = row_start
+        self.cols = cols
+        self.vals = vals
+
+    def __len__(self) -> int:
+        return len(self.row_start) - 1
+
+    def __getitem__(self, ordinal: int) -> Vector:
+        a, b = self.row_start[ordinal], self.row_start[ordinal + 1]
+        return dict(zip(self.cols[a:b], self.vals[a:b]))
+
+
+class MappedLSHIndex(LSHIndex):
+    """直接映射自快照的 LSH 索引（只读）"""
+
+    def __init__(self, num_tables: int, num_bits: int, seed: int, vocab: StringTable):
+        super().__init__(num_tables, num_bits, seed)
+        self.vocab = vocab
+
+    def add(self, key, vector: Vector):
+        raise TypeError("Mapped LSH index is read-only")
+
+    def rerank_vector(self, vector: Vector) -> Vector:
+        """查询向量按词表编码；词表外的 token 与任何已存向量的点积为 0，直接丢弃"""
+        encoded = {}
+        for token, weight in vector.items():
+            i = self.vocab.find(str(token))
+            if i is not None:
+                encoded[i] = weight
+        return encoded
+
+
+class Snapshot:
+    """已挂载的索引快照"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {self.manifest.get('format_version')}")
+        self.kb_version = self.manifest["kb_version"]
+        self.count = self.manifest["count"]
+        self._file = open(self.directory / SECTIONS_FILE, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._views: List[memoryview] = []
+
+    def section(self, name: str) -> memoryview:
+        """按名称取数组段（类型化的只读 memoryview）"""
+        offset, length, typecode = self.manifest["sections"][name]
+        view = self._view[offset:offset + length]
+        if typecode != 'B':
+            view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def strings(self, name: str) -> StringTable:
+        return StringTable(self.section(name + '.blob'), self.section(name + '.offsets'))
+
+    def facet_index(self) -> FacetIndex:
+        """分面位图由原始字节直接转为整数（无解析，每个取值约 size/8 字节的拷贝）"""
+        facets = FacetIndex(self.count)
+        raw = self.section('facets.bitmaps')
+        nbytes = self.manifest["bitmap_bytes"]
+        for field, values in self.manifest["facets"].items():
+            facets.bitmaps[field] = {
+                value: int.from_bytes(raw[slot * nbytes:(slot + 1) * nbytes], 'little')
+                for value, slot in values
+            }
+        return facets
+
+    def search_engine(self) -> SearchEngine:
+        terms = self.strings('terms')
+        start = self.section('post.start')
+        docs = self.section('post.docs')
+        impacts = self.section('post.impacts')
+        upper = self.section('post.max')
+        block_start = self.section('post.block_start')
+        blocks = self.section('post.blocks')
+        bitmap_slot = self.section('post.bitmap_slot')
+        bitmaps = self.section('post.bitmaps')
+        nbytes = self.manifest["bitmap_bytes"]
+
+        def bitmap(i: int) -> Optional[int]:
+            slot = bitmap_slot[i]
+            if slot < 0:
+                return None
+            return int.from_bytes(bitmaps[slot * nbytes:(slot + 1) * nbytes], 'little')
+
+        return SearchEngine.from_parts(
+            self.count,
+            TermMap(terms, lambda i: (docs[start[i]:start[i + 1]], impacts[start[i]:start[i + 1]])),
+            TermMap(terms, lambda i: upper[i]),
+            TermMap(terms, lambda i: blocks[block_start[i]:block_start[i + 1]]),
+            TermMap(terms, bitmap),
+            self.facet_index(),
+        )
+
+    def lsh_index(self) -> MappedLSHIndex:
+        meta = self.manifest["lsh"]
+        index = MappedLSHIndex(meta["num_tables"], meta["num_bits"], meta["seed"], self.strings('lsh.vocab'))
+        index.meta = {"kb_version": self.kb_version}
+        index.keys = self.section('lsh.keys')
+        index.vectors = MappedVectors(self.section('lsh.row_start'), self.section('lsh.cols'),
+                                      self.section('lsh.vals'))
+        table_start = self.section('lsh.table_start')
+        bucket_keys = self.section('lsh.bucket_keys')
+        bucket_start = self.section('lsh.bucket_start')
+        members = self.section('lsh.members')
+        index.tables = []
+        for t in range(index.num_tables):
+            a, b = table_start[t], table_start[t + 1]
+            index.tables.append(MappedBuckets(bucket_keys[a:b], bucket_start[a:b + 1], members))
+        return index
+
+    def item_store(self) -> ItemStore:
+        return ItemStore.open(self.directory)
+
+    def close(self):
+        """释放映射；调用前须确保不再有查询引用本快照
+
+        若仍有派生的切片存活（如尚未回收的检索结构），映射在它们被回收时才真正解除。
+        """
+        for view in reversed(self._views + [self._view]):
+            try:
+                view.release()
+            except BufferError:
+                pass
+        self._views = []
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def build_snapshot(data: List[Dict], kb_version: str, root: Path = SNAPSHOT_ROOT) -> Path:
+    """构建全部索引并写入 root/<kb_version>/，最后原子地更新 CURRENT 指针"""
+    root = Path(root)
+    directory = root / kb_version
+    staging = root / f".{kb_version}.tmp-{os.getpid()}"
+    staging.mkdir(parents=True, exist_ok=True)
+    writer = SectionWriter()
+    n = len(data)
+    nbytes = n // 8 + 1
+
+    # 条目存储与逐条目数组
+    current = root / CURRENT_FILE
+    legacy = ItemStore.previous_hashes(root / current.read_text().strip()) if current.exists() else None
+    store, hashes = ItemStore.build(data, kb_version, legacy)
+    store.save(staging, hashes)
+    writer.add_array('items.token_estimates', 'I', (estimate_tokens(item_content(i)) for i in data))
+    writer.add_array('items.type_pages', 'I', PageEngine(data).type_pages())
+
+    # 倒排表（词按字节序排列，便于二分查找）
+    engine = SearchEngine(data)
+    terms = sorted(engine.postings, key=lambda t: t.encode('utf-8'))
+    starts, block_starts, bitmap_slots = [0], [0], []
+    docs, impacts, blocks, bitmaps = array('I'), array('d'), array('d'), bytearray()
+    for term in terms:
+        term_docs, term_impacts = engine.postings[term]
+        docs.extend(term_docs)
+        impacts.extend(term_impacts)
+        starts.append(len(docs))
+        blocks.extend(engine.block_max[term])
+        block_starts.append(len(blocks))
+        bitmap = engine.term_bitmaps.get(term)
+        if bitmap is None:
+            bitmap_slots.append(-1)
+        else:
+            bitmap_slots.append(len(bitmaps) // nbytes)
+            bitmaps += bitmap.to_bytes(nbytes, 'little')
+    writer.add_strings('terms', terms)
+    writer.add_array('post.start', 'I', starts)
+    writer.add('post.docs', docs.tobytes(), 'I')
+    writer.add('post.impacts', impacts.tobytes(), 'd')
+    writer.add_array('post.max', 'd', (engine.max_impact[t] for t in terms))
+    writer.add_array('post.block_start', 'I', block_starts)
+    writer.add('post.blocks', blocks.tobytes(), 'd')
+    writer.add_array('post.bitmap_slot', 'i', bitmap_slots)
+    writer.add('post.bitmaps', bytes(bitmaps))
+
+    # 分面位图
+    facets: Dict[str, List] = {}
+    facet_bytes = bytearray()
+    for field, groups in engine.facets.bitmaps.items():
+        facets[field] = []
+        for value, bitmap in groups.items():
+            facets[field].append([value, len(facet_bytes) // nbytes])
+            facet_bytes += bitmap.to_bytes(nbytes, 'little')
+    writer.add('facets.bitmaps', bytes(facet_bytes))
+
+    # LSH：词表按字节序编码，向量为 CSR，各表的桶键有序存放
+    lsh = build_example_index(data)
+    vocab = sorted({str(k) for vector in lsh.vectors for k in vector}, key=lambda t: t.encode('utf-8'))
+    vocab_ids = {token: i for i, token in enumerate(vocab)}
+    row_start, cols, vals = [0], array('I'), array('d')
+    for vector in lsh.vectors:
+        for token, weight in sorted(vector.items(), key=lambda kv: vocab_ids[str(kv[0])]):
+            cols.append(vocab_ids[str(token)])
+            vals.append(weight)
+        row_start.append(len(cols))
+    table_start, bucket_keys, bucket_start, members = [0], array('I'), [0], array('I')
+    for table in lsh.tables:
+        for key in sorted(table):
+            bucket_keys.append(key)
+            members.extend(table[key])
+            bucket_start.append(len(members))
+        table_start.append(len(bucket_keys))
+    writer.add_strings('lsh.vocab', vocab)
+    writer.add_array('lsh.keys', 'I', lsh.keys)
+    writer.add_array('lsh.row_start', 'I', row_start)
+    writer.add('lsh.cols', cols.tobytes(), 'I')
+    writer.add('lsh.vals', vals.tobytes(), 'd')
+    writer.add_array('lsh.table_start', 'I', table_start)
+    writer.add('lsh.bucket_keys', bucket_keys.tobytes(), 'I')
+    writer.add_array('lsh.bucket_start', 'I', bucket_start)
+    writer.add('lsh.members', members.tobytes(), 'I')
+
+    writer.write(staging / SECTIONS_FILE)
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "kb_version": kb_version,
+        "count": n,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "bitmap_bytes": nbytes,
+        "facets": facets,
+        "lsh": {"num_tables": lsh.num_tables, "num_bits": lsh.num_bits, "seed": lsh.seed},
+        "sections": writer.sections,
+    }
+    with open(staging / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    if directory.exists():
+        retired = root / f".{kb_version}.old-{os.getpid()}"
+        directory.rename(retired)
+        staging.rename(directory)
+        for path in retired.iterdir():
+            path.unlink()
+        retired.rmdir()
+    else:
+        staging.rename(directory)
+    pointer = root / f".{CURRENT_FILE}.tmp-{os.getpid()}"
+    pointer.write_text(kb_version + '\n')
+    os.replace(pointer, current)
+    prune_snapshots(root, kb_version)
+    return directory
+
+
+def prune_snapshots(root: Path, keep_version: str, keep: int = KEEP_SNAPSHOTS):
+    """删除最旧的快照目录（仍在映射中的文件在 POSIX 上会保留到解除映射为止）"""
+    versions = sorted((p for p in Path(root).iterdir() if p.is_dir() and not p.name.startswith('.')),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    for directory in versions[keep:]:
+        if directory.name == keep_version:
+            continue
+        for path in directory.iterdir():
+            path.unlink()
+        directory.rmdir()
+
+
+def current_snapshot(root: Path = SNAPSHOT_ROOT) -> Optional[Path]:
+    """CURRENT 指向的快照目录（不存在或格式版本过旧时返回 None）"""
+    current = Path(root) / CURRENT_FILE
+    if not current.exists():
+        return None
+    directory = Path(root) / current.read_text().strip()
+    manifest = directory / MANIFEST_FILE
+    if not manifest.exists():
+        return None
+    with open(manifest, 'r', encoding='utf-8') as f:
+        # 旧格式的快照视同不存在，由调用方重新构建
+        return directory if json.load(f).get("format_version") == SNAPSHOT_FORMAT_VERSION else None
+
+
+def ensure_snapshot(knowledge_file: Path, root: Path = SNAPSHOT_ROOT) -> Path:
+    """与知识库文件版本一致的快照目录；CURRENT 缺失、格式过旧或版本与知识库不符时由知识库重新构建
+
+    构建在 root/.build.lock 的排他锁下进行并在持锁后再检查一次：同时启动的多个进程只有一个构建，
+    其余等它完成后直接挂载，不会重复构建，也不会同时改写 CURRENT 或清理旧快照。
+    """
+    version = hashlib.md5(Path(knowledge_file).read_bytes()).hexdigest()[:12]
+    directory = current_snapshot(root)
+    if directory is not None and directory.name == version:
+        return directory
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / BUILD_LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            directory = current_snapshot(root)
+            if directory is None or directory.name != version:
+                if directory is not None:
+                    print(f"Snapshot {directory.name} is stale (knowledge base {version}); rebuilding",
+                          file=sys.stderr)
+                data, version = load_knowledge(knowledge_file)
+                directory = build_snapshot(data, version, root)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return directory
+
+
+def load_knowledge(knowledge_file: Path) -> Tuple[List[Dict], str]:
+    """读取知识库 JSON，版本为文件内容 MD5 的前 12 位"""
+    raw = Path(knowledge_file).read_bytes()
+    return json.loads(raw.decode('utf-8')), hashlib.md5(raw).hexdigest()[:12]
+
+
+def startup_benchmark(data: List[Dict], kb_version: str):
+    """对比冷启动（解析 JSON + 建索引）与挂载快照的首个查询耗时，语料按 x1/x2/x4 复制放大"""
+    import gc
+    import tempfile
+    from knowledge_tools import KnowledgeTools
+    from query_cache import QueryCache
+
+    def first_query(tools: 'KnowledgeTools') -> None:
+        tools.call("search_latex_knowledge", {"query": "bar chart axis", "limit": 10})
+        tools.call("similar_examples", {"code": "\\begin{axis}\\addplot coordinates {(0,1)};\\end{axis}"})
+
+    print("\n启动到首个查询完成（检索 + 相似示例）的耗时:")
+    print(f"{'corpus':>8s} {'items':>7s} {'cold build':>11s} {'attach':>8s} {'first query':>12s}")
+    print("-" * 70)
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in (1, 2, 4):
+            corpus = [dict(item, id=f"{item.get('id', '')}{r or ''}") for r in range(factor) for item in data]
+            version = f"{kb_version[:10]}x{factor}"
+            root = Path(tmp) / f"x{factor}"
+            build_snapshot(corpus, version, root)
+
+            t0 = time.perf_counter()
+            cold = KnowledgeTools(corpus, kb_version=version, cache=QueryCache())
+            first_query(cold)
+            del cold
+            gc.collect()
+            t1 = time.perf_counter()
+            warm = KnowledgeTools.from_snapshot(Snapshot(current_snapshot(root)), cache=QueryCache())
+            t2 = time.perf_counter()
+            first_query(warm)
+            t3 = time.perf_counter()
+            warm.close()
+            print(f"{'x' + str(factor):>8s} {len(corpus):7d} {(t1 - t0) * 1000:9.0f}ms "
+                  f"{(t2 - t1) * 1000:6.1f}ms {(t3 - t2) * 1000:10.1f}ms")
+
+
+def main():
+    """主函数：由知识库构建快照并更新 CURRENT；--benchmark 时再运行启动耗时基准"""
+    import argparse
+    from knowledge_tools import KNOWLEDGE_FILE
+
+    parser = argparse.ArgumentParser(description="Build the index snapshot for the current knowledge base")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="also compare cold start with snapshot attach on x1/x2/x4 corpora (slow)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("构建索引快照")
+    print("=" * 70)
+
+    data, kb_version = load_knowledge(KNOWLEDGE_FILE)
+    start = time.perf_counter()
+    directory = build_snapshot(data, kb_version)
+    size = sum(p.stat().st_size for p in directory.iterdir())
+    print(f"\n✓ 快照 {directory} ({size / 1024 / 1024:.1f} MB) 构建耗时 {time.perf_counter() - start:.2f}s")
+    if args.benchmark:
+        startup_benchmark(data, kb_version)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+按 ID 直接取条目的持久化存储
+条目逐行写入记录文件，另建开放寻址哈希表 (ID -> 记录偏移)；查询时只读取被请求条目的字节
+"""
+
+import json
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+STORE_FORMAT_VERSION = 1
+STORE_MAGIC = b'KBIX'
+RECORDS_FILE = 'items.dat'
+INDEX_FILE = 'items.idx'
+ALIASES_FILE = 'items-aliases.json'
+HASHES_FILE = 'items-hashes.json'  # 仅重建时读取，用于推导旧 ID 的别名
+
+HEADER = struct.Struct('<4sIII12s')  # magic, 格式版本, 条目数, 槽位数, 知识库版本
+OFFSET = struct.Struct('<QI')        # 记录偏移, 记录长度
+SLOT = struct.Struct('<32sI')        # 唯一 ID（补零）, 条目下标
+EMPTY_SLOT = 0xFFFFFFFF
+UID_LENGTH = 32
+SUFFIX_LENGTH = 6  # 重复 ID 追加的内容哈希位数
+
+
+def content_hash(item: Dict) -> str:
+    """条目内容（不含 id）的哈希，用于区分重复 ID 与跨版本追踪同一条目"""
+    body = {k: v for k, v in item.items() if k != 'id'}
+    return hashlib.md5(json.dumps(body, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def assign_uids(data: List[Dict]) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+    """为每个条目分配唯一 ID
+
+    _generate_id 的基串（如 "example_{idx}"、"cmd_{name}"）在不同宏包间会重复，
+    被多个条目共用的 ID 追加内容哈希后缀（"<id>-<hash6>"），其余条目沿用原 ID。
+    完全相同的重复条目得到同一唯一 ID。返回 (各条目唯一 ID, 共用 ID -> 候选唯一 ID, 各条目内容哈希)。
+    """
+    hashes = [content_hash(item) for item in data]
+    groups: Dict[str, List[int]] = {}
+    for pos, item in enumerate(data):
+        groups.setdefault(item.get('id', ''), []).append(pos)
+
+    uids = [item.get('id', '') for item in data]
+    shared: Dict[str, List[str]] = {}
+    for item_id, positions in groups.items():
+        if len(positions) == 1:
+            continue
+        distinct = {hashes[p] for p in positions}
+        length = SUFFIX_LENGTH
+        while len({h[:length] for h in distinct}) < len(distinct):
+            length += 2
+        candidates: List[str] = []
+        for pos in positions:
+            uid = f"{item_id}-{hashes[pos][:length]}"
+            uids[pos] = uid
+            if uid not in candidates:
+                candidates.append(uid)
+        shared[item_id] = candidates
+    return uids, shared, hashes
+
+
+def slot_hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+class ItemStore:
+    """基于记录文件 + 哈希表的条目存储，可直接映射磁盘文件（无需反序列化）"""
+
+    def __init__(self, records, index, aliases: Dict[str, List[str]]):
+        self._records = records
+        self._index = index
+        self.aliases = aliases  # 共用 ID 与旧 ID -> 唯一 ID 列表
+        magic, version, self.count, self.num_slots, kb_version = HEADER.unpack_from(index, 0)
+        if magic != STORE_MAGIC or version != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported item store format: {magic!r} v{version}")
+        self.kb_version = kb_version.rstrip(b'\0').decode('ascii')
+        self._slots_start = HEADER.size + self.count * OFFSET.size
+        self._mask = self.num_slots - 1
+        self._files = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def build(cls, data: List[Dict], kb_version: str = "",
+              legacy: Optional[Dict[str, str]] = None) -> Tuple['ItemStore', Dict[str, str]]:
+        """在内存中构建存储，返回 (存储, 各唯一 ID 的内容哈希)
+
+        legacy 为旧版本 {唯一 ID: 内容哈希}：旧 ID 在新版本中消失、但内容仍存在时登记为别名。
+        """
+        uids, shared, hashes = assign_uids(data)
+
+        records = bytearray()
+        offsets = bytearray()
+        for item, uid in zip(data, uids):
+            record = json.dumps(dict(item, uid=uid), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            offsets += OFFSET.pack(len(records), len(record))
+            records += record + b'\n'
+
+        num_slots = 1
+        while num_slots < 2 * len(data):
+            num_slots <<= 1
+        slots = bytearray(SLOT.pack(b'', EMPTY_SLOT) * num_slots)
+        mask = num_slots - 1
+        for pos, uid in enumerate(uids):
+            key = uid.encode('ascii')
+            slot = slot_hash(key) & mask
+            while True:
+                existing, ordinal = SLOT.unpack_from(slots, slot * SLOT.size)
+                if ordinal == EMPTY_SLOT:
+                    SLOT.pack_into(slots, slot * SLOT.size, key, pos)
+                    break
+                if existing.rstrip(b'\0') == key:  # 完全相同的重复条目，保留第一条
+                    break
+                slot = (slot + 1) & mask
+
+        current = {uid: h for uid, h in zip(uids, hashes)}
+        aliases: Dict[str, List[str]] = dict(shared)
+        if legacy:
+            by_hash = {h: uid for uid, h in current.items()}
+            for old_uid, old_hash in legacy.items():
+                if old_uid not in current and old_uid not in aliases and old_hash in by_hash:
+                    aliases[old_uid] = [by_hash[old_hash]]
+
+        header = HEADER.pack(STORE_MAGIC, STORE_FORMAT_VERSION, len(data), num_slots,
+                             kb_version.encode('ascii')[:12])
+        store = cls(bytes(records), header + bytes(offsets) + bytes(slots), aliases)
+        return store, current
+
+    def save(self, directory: Path, hashes: Dict[str, str]):
+        """写入记录文件、哈希表、别名表与内容哈希"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / RECORDS_FILE).write_bytes(self._records)
+        (directory / INDEX_FILE).write_bytes(self._index)
+        with open(directory / ALIASES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(self.aliases, f, ensure_ascii=False, separators=(',', ':'))
+        with open(directory / HASHES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, separators=(',', ':'))
+
+    @classmethod
+    def open(cls, directory: Path) -> 'ItemStore':
+        """以只读 mmap 方式挂载磁盘上的存储"""
+        directory = Path(directory)
+        files = [open(directory / RECORDS_FILE, 'rb'), open(directory / INDEX_FILE, 'rb')]
+        records, index = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in files)
+        with open(directory / ALIASES_FILE, 'r', encoding='utf-8') as f:
+            aliases = json.load(f)
+        store = cls(records, index, aliases)
+        store._files = files
+        return store
+
+    @staticmethod
+    def previous_hashes(directory: Path) -> Optional[Dict[str, str]]:
+        """读取上一版本的内容哈希（不存在时返回 None）"""
+        path = Path(directory) / HASHES_FILE
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def position(self, uid: str) -> Optional[int]:
+        """唯一 ID -> 条目下标（线性探测，平均 O(1)）"""
+        try:
+            key = uid.encode('ascii')
+        except UnicodeEncodeError:
+            return None
+        if not key or len(key) > UID_LENGTH:
+            return None
+        slot = slot_hash(key) & self._mask
+        while True:
+            existing, ordinal = SLOT.unpack_from(self._index, self._slots_start + slot * SLOT.size)
+            if ordinal == EMPTY_SLOT:
+                return None
+            if existing.rstrip(b'\0') == key:
+                return ordinal
+            slot = (slot + 1) & self._mask
+
+    def resolve(self, item_id: str) -> List[Tuple[str, int]]:
+        """ID 解析为 [(唯一 ID, 条目下标)]：唯一 ID 或旧 ID 得到一项，共用 ID 得到全部候选"""
+        pos = self.position(item_id)
+        if pos is not None:
+            return [(item_id, pos)]
+        resolved = []
+        for uid in self.aliases.get(item_id, []):
+            pos = self.position(uid)
+            if pos is not None:
+                resolved.append((uid, pos))
+        return resolved
+
+    def record(self, pos: int) -> Dict[str, Any]:
+        """读取并解码单个条目（只读取该条目的字节），记录中带 uid 字段"""
+        offset, length = OFFSET.unpack_from(self._index, HEADER.size + pos * OFFSET.size)
+        return json.loads(self._records[offset:offset + length])
+
+    def close(self):
+        for buf in (self._records, self._index):
+            if isinstance(buf, mmap.mmap):
+                try:
+                    buf.close()
+                except BufferError:  # 仍有导出的视图时随其回收解除映射
+                    pass
+        for f in self._files:
+            f.close()
+        self._files = []
+
+
+def main():
+    """主函数：构建条目存储并测量查询耗时"""
+    import random
+
+    base_dir = Path(__file__).parent.parent / 'knowledge-base'
+    knowledge_file = base_dir / 'latex-all-knowledge-raw.json'
+    store_dir = base_dir / 'index'
+
+    print("=" * 70)
+    print("构建条目 ID 存储")
+    print("=" * 70)
+
+    raw = knowledge_file.read_bytes()
+    data = json.loads(raw.decode('utf-8'))
+    kb_version = hashlib.md5(raw).hexdigest()[:12]
+
+    start = time.perf_counter()
+    store, hashes = ItemStore.build(data, kb_version, legacy=ItemStore.previous_hashes(store_dir))
+    store.save(store_dir, hashes)
+    print(f"\n构建完成: {len(store)} 条, 耗时 {time.perf_counter() - start:.2f}s")
+    print(f"共用 ID / 旧 ID 别名: {len(store.aliases)}")
+
+    start = time.perf_counter()
+    store = ItemStore.open(store_dir)
+    print(f"挂载耗时: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    sample = random.Random(0).sample(list(hashes), 1000)
+    start = time.perf_counter()
+    for uid in sample:
+        uid, pos = store.resolve(uid)[0]
+        store.record(pos)
+    print(f"按 ID 取条目: 平均 {(time.perf_counter() - start) * 1000:.1f}µs / 次（1000 次）")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
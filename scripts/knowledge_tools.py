@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+本地知识库 MCP 工具实现
+加载 latex-all-knowledge-raw.json 并提供可被 MCP 服务端调用的工具函数
+"""
+
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from lsh_index import LSHIndex, DEFAULT_PROBES, build_example_index, vectorize_code
+from search_engine import SearchEngine, CATEGORY_FILTERS, item_content, item_name
+from page_engine import DOCS_DIR, PageEngine, built_views, item_page_path, type_page_url
+from query_cache import QueryCache, cache_key
+from search_cursor import CursorError, query_fingerprint, encode_cursor, decode_cursor
+from token_budget import estimate_tokens, pack_results
+from response_encoding import FragmentEncoder, ItemResult, project
+from item_store import ItemStore
+from index_snapshot import SNAPSHOT_ROOT, Snapshot, ensure_snapshot, load_knowledge
+
+KNOWLEDGE_FILE = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+
+MAX_LIMIT = 50  # 与 search.mdx 中 limit 上限一致
+MAX_BATCH = 50  # batch_search 单次最多查询数
+MAX_GET_ITEMS = 100  # get_items 单次最多 ID 数
+SNIPPET_LENGTH = 200
+ITEM_CACHE_SIZE = 4096  # 进程内缓存的已解码条目数
+
+# fields 投影可选的字段：工具结果字段，加上可直接取自知识库条目的原始字段
+ITEM_FIELDS = ("code", "syntax", "description", "macro_package", "command_name",
+               "component_name", "environment_name", "key_name", "source_file")
+RESULT_FIELDS = ("id", "title", "type", "category", "snippet", "content", "url", "relevance",
+                 "tags", "token_estimate", "chart_type", "uid")
+SIMILAR_FIELDS = ("id", "macro_package", "chart_type", "source_file", "similarity", "code",
+                  "token_estimate")
+GET_FIELDS = ("id", "uid", "type", "title", "chart_type", "url", "token_estimate")
+FIELDS_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+
+# MCP tools/list 返回的工具描述与参数 JSON Schema
+TOOL_SCHEMAS = {
+    "search_latex_knowledge": {
+        "description": "Search LaTeX commands, environments, components and executable examples",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "category": {"type": "string", "enum": list(CATEGORY_FILTERS)},
+                "limit": {"type": "integer", "minimum": 1, "maximum": MAX_LIMIT},
+                "offset": {"type": "integer", "minimum": 0},
+                "cursor": {"type": "string"},
+                "filters": {"type": "object"},
+                "max_tokens": {"type": "integer", "minimum": 1},
+                "fields": FIELDS_SCHEMA,
+            },
+            "required": ["query"],
+        },
+    },
+    "similar_examples": {
+        "description": "Find executable examples most similar to an item ID or a pasted LaTeX snippet",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "code": {"type": "string"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": MAX_LIMIT},
+                "package": {"type": "string"},
+                "probes": {"type": "integer", "minimum": 0},
+                "max_tokens": {"type": "integer", "minimum": 1},
+                "fields": FIELDS_SCHEMA,
+            },
+        },
+    },
+    "get_item": {
+        "description": "Fetch one knowledge base item by ID (or the uid of an item whose ID is shared)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "fields": FIELDS_SCHEMA,
+            },
+            "required": ["id"],
+        },
+    },
+    "get_items": {
+        "description": "Fetch several knowledge base items by ID in one call; results keep request order",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ids": {"type": "array", "maxItems": MAX_GET_ITEMS, "items": {"type": "string"}},
+                "fields": FIELDS_SCHEMA,
+            },
+            "required": ["ids"],
+        },
+    },
+    "batch_search": {
+        "description": "Run many search_latex_knowledge queries in one call; results keep request order",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "queries": {
+                    "type": "array",
+                    "maxItems": MAX_BATCH,
+                    "items": {"type": "object"},
+                },
+            },
+            "required": ["queries"],
+        },
+    },
+    "cache_stats": {
+        "description": "Result cache hit, miss and eviction counters",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    "stats": {
+        "description": "Service metrics: per-tool counts, latency percentiles, result counts, "
+                       "cache hit rates, index version and recent slow queries with their query plan",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+}
+
+
+def tool_error(error: str, message: str, **extra) -> Dict[str, Any]:
+    """按 search.mdx 的错误响应格式构造返回值"""
+    result = {"error": error, "message": message}
+    result.update(extra)
+    return result
+
+
+def budget_error(max_tokens: int, required: int) -> Dict[str, Any]:
+    """max_tokens 连第一条结果都放不下时的错误（而不是返回空页）"""
+    return tool_error("Budget too small", f"max_tokens={max_tokens} cannot fit the top result",
+                      required_tokens=required,
+                      suggestion="Raise max_tokens, or drop long fields with 'fields'")
+
+
+def check_fields(fields: Any, allowed: tuple) -> Optional[Dict[str, Any]]:
+    """校验 fields 投影参数，合法时返回 None"""
+    if fields is None:
+        return None
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        return tool_error("Invalid fields", "'fields' must be an array of field names")
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        return tool_error("Invalid fields", f"Unknown fields: {', '.join(unknown)}",
+                          valid_fields=list(allowed))
+    return None
+
+
+class KnowledgeTools:
+    """知识库工具集合"""
+
+    TOOL_NAMES = tuple(TOOL_SCHEMAS)
+
+    def __init__(self, data: List[Dict], kb_version: str = "", cache: Optional[QueryCache] = None):
+        self.data = data
+        self.kb_version = kb_version
+        self.count = len(data)
+        self.snapshot: Optional[Snapshot] = None
+        self.cache = cache if cache is not None else QueryCache()
+        self.encoder = FragmentEncoder()  # 条目字段的预编码 JSON 片段，服务端序列化响应时复用
+        self.item = lru_cache(maxsize=ITEM_CACHE_SIZE)(self._read_item)
+        self._type_pages: Optional[List[int]] = None
+        self.item_pages = False  # 文档已生成 items 视图时，url 指向单条目页而不是分页
+        self.token_estimates = [estimate_tokens(item_content(item)) for item in data]  # 各条目返回内容的预估 token 数
+        self._engine: Optional[SearchEngine] = None
+        self._lsh: Optional[LSHIndex] = None
+        self._store: Optional[ItemStore] = None
+
+    @classmethod
+    def load(cls, knowledge_file: Path = KNOWLEDGE_FILE, **kwargs) -> 'KnowledgeTools':
+        """从 JSON 文件加载并在内存中建索引，知识库版本取文件内容的 MD5"""
+        data, kb_version = load_knowledge(knowledge_file)
+        return cls(data, kb_version=kb_version, **kwargs)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot, cache: Optional[QueryCache] = None,
+                      docs_root: Path = DOCS_DIR) -> 'KnowledgeTools':
+        """挂载索引快照：全部索引直接映射，不解析知识库 JSON，也不重建索引
+
+        docs_root 的页面清单中有 items 视图时，结果的 url 指向单条目页。
+        """
+        tools = cls([], snapshot.kb_version, cache)
+        tools.data = None
+        tools.count = snapshot.count
+        tools.snapshot = snapshot
+        tools.token_estimates = snapshot.section('items.token_estimates')
+        tools._type_pages = snapshot.section('items.type_pages')
+        tools._engine = snapshot.search_engine()
+        tools._lsh = snapshot.lsh_index()
+        tools._store = snapshot.item_store()
+        tools.item_pages = "items" in built_views(docs_root)
+        return tools
+
+    @classmethod
+    def open(cls, root: Path = SNAPSHOT_ROOT, knowledge_file: Path = KNOWLEDGE_FILE,
+             **kwargs) -> 'KnowledgeTools':
+        """服务端启动入口：挂载 CURRENT 快照；尚无快照时由知识库构建一个再挂载（多进程同时启动时只构建一次）"""
+        return cls.from_snapshot(Snapshot(ensure_snapshot(knowledge_file, root)), **kwargs)
+
+    def close(self):
+        """释放快照映射（仅在没有进行中的查询时调用）"""
+        self.item.cache_clear()
+        self.encoder = FragmentEncoder()
+        if self._store is not None:
+            self._store.close()
+        if self.snapshot is not None:
+            self._engine = self._lsh = self._store = None
+            self.token_estimates = self._type_pages = []
+            self.snapshot.close()
+
+    def warm_up(self):
+        """预先构建全部索引，避免首个请求承担构建开销（也避免多线程重复构建）"""
+        _ = self.engine
+        _ = self.lsh
+        _ = self.store
+
+    @property
+    def engine(self) -> SearchEngine:
+        """全文检索引擎（首次使用时构建倒排索引与分面位图）"""
+        if self._engine is None:
+            self._engine = SearchEngine(self.data)
+        return self._engine
+
+    @property
+    def lsh(self) -> LSHIndex:
+        """相似示例索引"""
+        if self._lsh is None:
+            self._lsh = build_example_index(self.data)
+            self._lsh.meta["kb_version"] = self.kb_version
+        return self._lsh
+
+    @property
+    def type_pages(self) -> List[int]:
+        """各条目在 knowledge-by-type 中的页码（与文档生成使用同一字节预算分页）"""
+        if self._type_pages is None:
+            self._type_pages = PageEngine(self.data).type_pages()
+        return self._type_pages
+
+    @property
+    def store(self) -> ItemStore:
+        """按 ID 取条目的存储"""
+        if self._store is None:
+            self._store, _ = ItemStore.build(self.data, self.kb_version)
+        return self._store
+
+    def _read_item(self, pos: int) -> Dict[str, Any]:
+        """从存储读取并解码条目（记录带 uid 字段）；返回的 dict 为缓存共享，调用方不得修改"""
+        return self.store.record(pos)
+
+    def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """按工具名分发调用"""
+        if name not in self.TOOL_NAMES:
+            return tool_error("Unknown tool", f"Tool '{name}' is not recognized",
+                              valid_tools=list(self.TOOL_NAMES))
+        if not isinstance(arguments, dict):
+            return tool_error("Invalid arguments", "'arguments' must be an object")
+        try:
+            return getattr(self, name)(**arguments)
+        except (TypeError, ValueError) as e:
+            # 参数类型不符（如 limit 不是数字、filters 不是对象）时返回错误而不是让请求处理崩溃
+            return tool_error("Invalid arguments", str(e))
+
+    def item_url(self, pos: int) -> str:
+        """条目的单条目页；未生成 items 视图时为它在 knowledge-by-type 分页中的位置"""
+        if self.item_pages:
+            return "/" + item_page_path(self.item(pos)['uid'])
+        item_type = self.item(pos).get('type', 'unknown')
+        return type_page_url(item_type, self.type_pages[pos])
+
+    def format_result(self, pos: int, relevance: float,
+                      fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """把知识库条目转换为 search.mdx 描述的结果结构；fields 非空时只保留这些字段"""
+        item = self.item(pos)
+        text = item.get('description') or item.get('title') or item.get('code') or ''
+        result = {
+            "id": item.get('id'),
+            "title": item_name(item),
+            "type": item.get('type'),
+            "category": item.get('macro_package'),
+            "snippet": text[:SNIPPET_LENGTH],
+            "content": item_content(item),
+            "url": self.item_url(pos),
+            "relevance": round(relevance, 4),
+            "tags": [t for t in (item.get('macro_package'), item.get('chart_type')) if t],
+            "token_estimate": self.token_estimates[pos],
+        }
+        if item.get('chart_type'):
+            result["chart_type"] = item['chart_type']
+        if item.get('uid', result["id"]) != result["id"]:
+            result["uid"] = item['uid']  # ID 被多个条目共用时附带可直接 get_item 的 uid
+        return self._project(pos, result, fields)
+
+    def _project(self, pos: int, result: Dict[str, Any], fields: Optional[List[str]],
+                 view: str = "result") -> ItemResult:
+        """补上请求的原始条目字段后按 fields 投影"""
+        if fields:
+            item = self.item(pos)
+            for field in fields:
+                if field not in result and item.get(field) is not None:
+                    result[field] = item[field]
+        return project(ItemResult(pos, result, view), fields)
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        """把工具响应序列化为紧凑 JSON，条目字段直接拼接预编码片段"""
+        return self.encoder.encode(payload)
+
+    def search_latex_knowledge(self, query: str = "", category: str = "all", limit: int = 10,
+                               offset: int = 0, filters: Optional[Dict[str, Any]] = None,
+                               cursor: Optional[str] = None,
+                               max_tokens: Optional[int] = None,
+                               fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """检索知识库（参数与返回结构见 mintlify-docs/api/search.mdx）
+
+        除 offset 外还支持游标翻页：每个响应带 next_cursor，传回 cursor 即从上一页末尾继续，
+        不重新计算之前的页。max_tokens 限制本页结果的总 token 数，按相关度贪心装箱。
+        fields 只返回指定字段（如 ["id", "code", "macro_package"]）。
+        成功的响应按 (知识库版本, 规范化查询, 参数) 缓存。
+        """
+        start = time.perf_counter()
+        key = cache_key(self.kb_version, "search_latex_knowledge", {
+            "query": query, "category": category, "limit": limit, "offset": offset,
+            "filters": filters or {}, "cursor": cursor, "max_tokens": max_tokens, "fields": fields,
+        })
+        cached = self.cache.get(key)
+        if cached is not None:
+            response = dict(cached)
+            response["query"] = query
+            response["cached"] = True
+            response["time_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return response
+
+        if not isinstance(query, str) or not query.strip():
+            return tool_error("Invalid query", "Query parameter cannot be empty",
+                              suggestion="Provide a search term or command name")
+        if category not in CATEGORY_FILTERS:
+            return tool_error("Invalid category", f"Category '{category}' is not recognized",
+                              valid_categories=list(CATEGORY_FILTERS))
+        error = check_fields(fields, RESULT_FIELDS + ITEM_FIELDS)
+        if error:
+            return error
+
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        offset = max(0, int(offset))
+        fingerprint = query_fingerprint(query, category, filters)
+        after = None
+        top = None
+        if cursor:
+            try:
+                position = decode_cursor(cursor, self.kb_version, fingerprint)
+            except CursorError as e:
+                return tool_error("Invalid cursor", str(e),
+                                  suggestion="Restart pagination without a cursor")
+            after = (position["score"], position["doc"])
+            offset = position["served"]
+            top = position["top"]
+
+        try:
+            found = self.engine.search(query, category, limit, offset, filters, after=after)
+        except ValueError as e:
+            return tool_error("Invalid filters", str(e))
+
+        hits = found["hits"]
+        if top is None:
+            top = found["max_score"]
+        results = [self.format_result(pos, score / top if top else 0.0, fields) for pos, score in hits]
+        budget = None
+        if max_tokens:
+            budget = pack_results(results, [self.token_estimates[pos] for pos, _ in hits], int(max_tokens))
+            if "required_tokens" in budget:
+                return budget_error(int(max_tokens), budget["required_tokens"])
+            # 装入的最后一条之后被跳过的结果留给下一页，不计入本页
+            deferred = len(hits) - budget["consumed"]
+            hits = hits[:budget["consumed"]]
+            results = budget["results"]
+            budget["omitted_ids"] = budget["omitted_ids"][:len(budget["omitted_ids"]) - deferred]
+        served = offset + len(hits)
+        has_more = served < found["total"]
+
+        response = {
+            "results": results,
+            "total": found["total"],
+            "query": query,
+            "limit": limit,
+            "offset": offset,
+            "has_more": has_more,
+            "facets": found["facets"],
+            "time_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        if budget is not None:
+            response["token_budget"] = {"max_tokens": int(max_tokens), "used_tokens": budget["used_tokens"],
+                                        "omitted_ids": budget["omitted_ids"]}
+        if has_more:
+            # 翻页从本页装入的最后一条继续；夹在本页结果之间、因预算被省略的条目列在 omitted_ids 中
+            response["next_offset"] = served
+            last_pos, last_score = hits[-1]
+            response["next_cursor"] = encode_cursor(self.kb_version, fingerprint, last_score,
+                                                    last_pos, served, top)
+        self.cache.put(key, response)
+        return response
+
+    def _resolve_item(self, item_id: Any):
+        """ID 解析为 (条目下标, None) 或 (None, 错误)"""
+        if not isinstance(item_id, str) or not item_id:
+            return None, tool_error("Invalid id", "Item ID must be a non-empty string")
+        resolved = self.store.resolve(item_id)
+        if not resolved:
+            return None, tool_error("Not found", f"No item with id '{item_id}'", id=item_id)
+        if len(resolved) > 1:
+            candidates = [{"uid": uid, "title": item_name(self.item(pos)), "type": self.item(pos).get('type'),
+                           "macro_package": self.item(pos).get('macro_package')} for uid, pos in resolved]
+            return None, tool_error("Ambiguous id", f"ID '{item_id}' is shared by {len(resolved)} items",
+                                    id=item_id, candidates=candidates,
+                                    suggestion="Pass one of the candidate uids")
+        return resolved[0][1], None
+
+    def _item_payload(self, pos: int, fields: Optional[List[str]]) -> ItemResult:
+        """从存储读取条目并附加 url 与 token 估算"""
+        record = dict(self.item(pos))
+        record["url"] = self.item_url(pos)
+        record["token_estimate"] = self.token_estimates[pos]
+        return project(ItemResult(pos, record, "item"), fields)
+
+    def get_item(self, id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """按 ID 取单个条目（哈希表定位，只读取该条目的字节）
+
+        也接受共用 ID 条目的 uid 与旧版本 ID 的别名；ID 被多个不同条目共用时返回候选 uid 列表。
+        """
+        start = time.perf_counter()
+        error = check_fields(fields, GET_FIELDS + ITEM_FIELDS)
+        if error:
+            return error
+        pos, error = self._resolve_item(id)
+        if error:
+            return error
+        return {"item": self._item_payload(pos, fields),
+                "time_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def get_items(self, ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """按 ID 批量取条目，结果与请求顺序一致；找不到或有歧义的 ID 在对应位置返回错误"""
+        start = time.perf_counter()
+        if not isinstance(ids, list) or not ids:
+            return tool_error("Invalid ids", "'ids' must be a non-empty array")
+        if len(ids) > MAX_GET_ITEMS:
+            return tool_error("Invalid ids", f"At most {MAX_GET_ITEMS} ids per call")
+        error = check_fields(fields, GET_FIELDS + ITEM_FIELDS)
+        if error:
+            return error
+
+        items = []
+        for item_id in ids:
+            pos, error = self._resolve_item(item_id)
+            items.append(error if error else self._item_payload(pos, fields))
+        return {
+            "items": items,
+            "found": sum(1 for item in items if "error" not in item),
+            "time_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def plan_batch(self, queries: Any):
+        """校验批量查询并去重
+
+        返回 (去重后的参数列表, 每个原始查询对应的去重下标或错误)；
+        参数相同（规范化后）的查询只执行一次。
+        """
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("'queries' must be a non-empty array")
+        if len(queries) > MAX_BATCH:
+            raise ValueError(f"At most {MAX_BATCH} queries per batch")
+
+        unique: List[Dict[str, Any]] = []
+        seen: Dict[tuple, int] = {}
+        slots: List[Any] = []
+        for arguments in queries:
+            if not isinstance(arguments, dict):
+                slots.append(tool_error("Invalid query", "Each query must be an object"))
+                continue
+            key = cache_key(self.kb_version, "search_latex_knowledge", arguments)
+            if key not in seen:
+                seen[key] = len(unique)
+                unique.append(arguments)
+            slots.append(seen[key])
+        return unique, slots
+
+    def run_batch_item(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """执行批量中的单个查询，异常只影响该查询"""
+        try:
+            return self.call("search_latex_knowledge", arguments)
+        except Exception as e:
+            return tool_error("Query failed", str(e))
+
+    @staticmethod
+    def assemble_batch(slots: List[Any], outcomes: List[Dict[str, Any]], start: float) -> Dict[str, Any]:
+        """按原始顺序组装批量结果"""
+        results = [outcomes[slot] if isinstance(slot, int) else slot for slot in slots]
+        return {
+            "results": results,
+            "total_queries": len(results),
+            "failed": sum(1 for r in results if "error" in r),
+            "time_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def batch_search(self, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """一次调用执行多个检索（每项参数同 search_latex_knowledge），结果与请求顺序一致
+
+        相同查询只算一次，分词结果与结果缓存在各查询间共享；单个查询出错不影响其他查询。
+        服务端会把去重后的查询分发到线程池并行执行。
+        """
+        start = time.perf_counter()
+        try:
+            unique, slots = self.plan_batch(queries)
+        except ValueError as e:
+            return tool_error("Invalid batch", str(e))
+        return self.assemble_batch(slots, [self.run_batch_item(a) for a in unique], start)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """结果缓存的命中/未命中/淘汰计数"""
+        stats = self.cache.stats()
+        stats["kb_version"] = self.kb_version
+        return stats
+
+    def index_info(self) -> Dict[str, Any]:
+        """索引来源、构建时间与版本"""
+        if self.snapshot is None:
+            return {"source": "memory", "kb_version": self.kb_version, "count": self.count}
+        manifest = self.snapshot.manifest
+        return {
+            "source": "snapshot",
+            "kb_version": self.kb_version,
+            "count": self.count,
+            "format_version": manifest["format_version"],
+            "created_at": manifest.get("created_at"),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """本进程的索引版本、结果缓存与响应片段缓存统计（服务端再合并请求指标）"""
+        return {
+            "index": self.index_info(),
+            "cache": self.cache.stats(),
+            "fragments": self.encoder.stats()["fragments"],
+            "fragment_evictions": self.encoder.evictions,
+            "item_cache": self.item.cache_info()._asdict(),
+        }
+
+    def query_plan(self, name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """检索类请求的查询计划，用于慢查询样本；其他工具或参数非法时返回 None"""
+        if name == "batch_search":
+            queries = arguments.get("queries")
+            if not isinstance(queries, list):
+                return None
+            return {"queries": [self.query_plan("search_latex_knowledge", q)
+                                for q in queries[:MAX_BATCH] if isinstance(q, dict)]}
+        if name != "search_latex_knowledge":
+            return None
+        try:
+            limit = max(1, min(int(arguments.get("limit", 10)), MAX_LIMIT))
+            return self.engine.explain(arguments.get("query") or "", arguments.get("category", "all"),
+                                       limit, max(0, int(arguments.get("offset", 0))),
+                                       arguments.get("filters"))
+        except (TypeError, ValueError):
+            return None
+
+    def similar_examples(self, id: Optional[str] = None, code: Optional[str] = None,
+                         limit: int = 5, package: Optional[str] = None,
+                         probes: int = DEFAULT_PROBES, max_tokens: Optional[int] = None,
+                         fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """查找与指定条目或粘贴代码最相似的可执行示例
+
+        id 与 code 二选一；package 限定结果所属宏包；probes 越大召回越高；
+        max_tokens 限制返回代码的总 token 数；fields 只返回指定字段。
+        """
+        start = time.perf_counter()
+        if not id and not code:
+            return tool_error("Invalid query", "Either 'id' or 'code' must be provided",
+                              suggestion="Pass an item ID from a search result or a LaTeX snippet")
+        if id and not isinstance(id, str):
+            return tool_error("Invalid id", "Item ID must be a non-empty string")
+        error = check_fields(fields, SIMILAR_FIELDS + ITEM_FIELDS)
+        if error:
+            return error
+
+        exclude = None
+        if id:
+            positions = [p for _, p in self.store.resolve(id) if self.item(p).get('code')]
+            if not positions:
+                return tool_error("Not found", f"No example with id '{id}'")
+            exclude = positions[0]
+            code = self.item(exclude)['code']
+
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        index = self.lsh
+        flags = None
+        if package is not None:
+            flags = self.engine.facets.bitmap('macro_package', package).to_bytes(self.count // 8 + 1, 'little')
+
+        def accept(ordinal: int) -> bool:
+            pos = index.keys[ordinal]
+            if pos == exclude:
+                return False
+            return flags is None or bool(flags[pos >> 3] >> (pos & 7) & 1)
+
+        results = []
+        costs = []
+        for ordinal, score in index.query(vectorize_code(code), limit, probes, accept=accept):
+            pos = index.keys[ordinal]
+            item = self.item(pos)
+            costs.append(self.token_estimates[pos])
+            results.append(self._project(pos, {
+                "id": item['id'],
+                "macro_package": item.get('macro_package'),
+                "chart_type": item.get('chart_type', 'other'),
+                "source_file": item.get('source_file'),
+                "similarity": round(score, 4),
+                "code": item['code'],
+                "token_estimate": self.token_estimates[pos],
+            }, fields, "similar"))
+
+        response = {"results": results, "total": len(results)}
+        if max_tokens:
+            budget = pack_results(results, costs, int(max_tokens), field="code")
+            if "required_tokens" in budget:
+                return budget_error(int(max_tokens), budget["required_tokens"])
+            response["results"] = budget["results"]
+            response["token_budget"] = {"max_tokens": int(max_tokens), "used_tokens": budget["used_tokens"],
+                                        "omitted_ids": budget["omitted_ids"]}
+        response["time_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return response
+
+
+def main():
+    """命令行调用：python knowledge_tools.py <tool> '<json arguments>'"""
+    import sys
+
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <tool> '<json arguments>'")
+        print(f"Tools: {', '.join(KnowledgeTools.TOOL_NAMES)}")
+        sys.exit(1)
+
+    tools = KnowledgeTools.load()
+    arguments = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    print(json.dumps(tools.call(sys.argv[1], arguments), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+检索服务压测：回放查询日志
+回放录制的查询日志（或由知识库的命令名、图表类型、宏包名生成的合成日志），
+按设定的并发与速率发送请求，报告吞吐、延迟分位数、错误率以及相对标准答案集的 recall@k。
+in-process 模式直接调用服务端的请求分发器；stdio 模式启动 mcp_server.py 子进程，经真实的 stdio 传输发送。
+
+查询日志为 JSON Lines，每行 {"tool": 工具名, "arguments": {...}}，也可简写为 {"query": "..."}；
+标准答案集每行 {"query", "category", "filters", "relevant": [前 k 名的 uid]}。
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from item_store import assign_uids
+
+SERVER_SCRIPT = Path(__file__).parent / 'mcp_server.py'
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_SYNTHETIC = 500
+DEFAULT_K = 10
+PERCENTILES = (50, 90, 95, 99)
+
+# 合成日志中各类请求的占比
+SYNTHETIC_MIX = (("search_latex_knowledge", 0.8), ("get_item", 0.1), ("similar_examples", 0.1))
+
+
+def read_log(path: Path) -> List[Dict[str, Any]]:
+    """读取查询日志；{"query": ...} 简写展开为 search_latex_knowledge 调用"""
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "tool" not in entry:
+                entry = {"tool": "search_latex_knowledge", "arguments": entry}
+            requests.append({"tool": entry["tool"], "arguments": entry.get("arguments") or {}})
+    return requests
+
+
+def write_jsonl(path: Path, rows: List[Dict[str, Any]]):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def synthetic_log(data: List[Dict], count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """由知识库的命令名、图表类型与宏包名生成查询日志
+
+    先生成一个查询池，再按偏斜分布抽样，使少数热门查询反复出现（与真实日志的缓存命中情况相近）。
+    """
+    rng = random.Random(seed)
+    commands = sorted({item['command_name'].lstrip('\\') for item in data if item.get('command_name')})
+    chart_types = sorted({item['chart_type'] for item in data
+                          if item.get('chart_type') and item.get('type') == 'executable_example'})
+    packages = sorted({item['macro_package'] for item in data if item.get('macro_package')})
+    uids, _, _ = assign_uids(data)  # 共用 ID 会得到 Ambiguous id，合成日志直接用唯一 ID
+    example_ids = [uid for item, uid in zip(data, uids) if item.get('type') == 'executable_example' and uid]
+    item_ids = [uid for uid in uids if uid]
+
+    def search_arguments() -> Dict[str, Any]:
+        kind = rng.randrange(6)
+        if kind == 0:
+            return {"query": "\\" + rng.choice(commands)}
+        if kind == 1:
+            return {"query": rng.choice(commands)}
+        if kind == 2:
+            return {"query": f"{rng.choice(chart_types).replace('_', ' ')} chart"}
+        if kind == 3:
+            return {"query": f"{rng.choice(chart_types).replace('_', ' ')} {rng.choice(commands)}",
+                    "category": "charts"}
+        if kind == 4:
+            package = rng.choice(packages)
+            return {"query": f"{package} {rng.choice(commands)}", "filters": {"package": package}}
+        return {"query": rng.choice(commands), "category": rng.choice(["tikz", "pgfplots"])}
+
+    pool = []
+    for _ in range(max(1, count // 3)):
+        roll = rng.random()
+        for tool, share in SYNTHETIC_MIX:
+            roll -= share
+            if roll < 0:
+                break
+        if tool == "get_item":
+            pool.append({"tool": tool, "arguments": {"id": rng.choice(item_ids)}})
+        elif tool == "similar_examples":
+            pool.append({"tool": tool, "arguments": {"id": rng.choice(example_ids), "limit": 5}})
+        else:
+            pool.append({"tool": tool, "arguments": search_arguments()})
+    return [pool[int(len(pool) * rng.random() ** 2)] for _ in range(count)]
+
+
+def golden_key(arguments: Dict[str, Any]) -> str:
+    """标准答案集的键：查询、category 与 filters"""
+    return json.dumps([arguments.get("query", ""), arguments.get("category", "all"), arguments.get("filters") or {}],
+                      sort_keys=True, ensure_ascii=False)
+
+
+def exact_golden(tools, requests: List[Dict[str, Any]], k: int = DEFAULT_K) -> Dict[str, List[str]]:
+    """以穷举 BM25 打分（SearchEngine.score，不走 MaxScore 剪枝）的前 k 名作为标准答案"""
+    from search_engine import query_terms
+
+    golden: Dict[str, List[str]] = {}
+    for request in requests:
+        if request["tool"] != "search_latex_knowledge":
+            continue
+        arguments = request["arguments"]
+        key = golden_key(arguments)
+        if key in golden:
+            continue
+        try:
+            mask = tools.engine.filter_mask(arguments.get("category", "all"), arguments.get("filters"))
+        except ValueError:
+            continue
+        scores = tools.engine.score(list(query_terms(arguments.get("query", ""))), mask)
+        top = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:k]  # 与 top_k 的排序一致
+        golden[key] = [tools.item(pos)["uid"] for pos, _ in top]
+    return golden
+
+
+def read_golden(path: Path) -> Dict[str, List[str]]:
+    golden = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                golden[golden_key(entry)] = entry["relevant"]
+    return golden
+
+
+def write_golden(path: Path, golden: Dict[str, List[str]]):
+    rows = []
+    for key, relevant in golden.items():
+        query, category, filters = json.loads(key)
+        rows.append({"query": query, "category": category, "filters": filters, "relevant": relevant})
+    write_jsonl(path, rows)
+
+
+def recall_at_k(payload: Dict[str, Any], relevant: List[str], k: int) -> Optional[float]:
+    """返回结果前 k 名覆盖标准答案前 k 名的比例；标准答案为空时返回 None"""
+    expected = relevant[:k]
+    if not expected:
+        return None
+    returned = {r.get("uid", r.get("id")) for r in payload.get("results", [])[:k]}
+    return sum(1 for uid in expected if uid in returned) / len(expected)
+
+
+class InProcessTarget:
+    """直接调用 MCPServer.call_tool（含线程池、在途上限与截止时间），不经过传输层"""
+
+    name = "in-process"
+
+    def __init__(self):
+        self.server = None
+
+    async def start(self):
+        from knowledge_tools import KnowledgeTools
+        from mcp_server import MCPServer
+
+        self.server = MCPServer(KnowledgeTools.open())
+        self.server.snapshots.current.tools.warm_up()
+
+    async def call(self, request_id: int, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.server.call_tool(request_id, tool, arguments)
+
+    async def close(self):
+        self.server.executor.shutdown(wait=True)
+
+
+class StdioTarget:
+    """启动 mcp_server.py 子进程，经 stdio 传输逐行发送 JSON-RPC 请求，按 id 分派响应"""
+
+    name = "stdio"
+
+    def __init__(self):
+        self.process = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.reader_task = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, str(SERVER_SCRIPT), '--transport', 'stdio', '--watch-interval', '0',
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL, limit=2 ** 24)
+        self.reader_task = asyncio.create_task(self._read_responses())
+        await self._request({"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}})
+
+    async def _read_responses(self):
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self.pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("server exited"))
+
+    async def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message["id"]] = future
+        self.process.stdin.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+        await self.process.stdin.drain()
+        return await future
+
+    async def call(self, request_id: int, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                                    "params": {"name": tool, "arguments": arguments}})
+
+    async def close(self):
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 10)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        await self.reader_task
+
+
+async def replay(target, requests: List[Dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY,
+                 rate: float = 0.0, golden: Optional[Dict[str, List[str]]] = None,
+                 k: int = DEFAULT_K) -> Dict[str, Any]:
+    """按并发上限（与可选的速率）回放请求并汇总指标
+
+    设定 rate 时按开环方式在预定时刻发出请求，延迟从预定时刻起算，
+    排队等待并发槽位的时间也计入，避免服务变慢时压测端随之放慢而低估延迟。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    recalls: List[float] = []
+    per_tool: Dict[str, int] = {}
+    golden = golden or {}
+
+    async def run(request_id: int, request: Dict[str, Any], scheduled: float):
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await target.call(request_id, request["tool"], request["arguments"])
+            except ConnectionError:
+                response = {"error": {"message": "Connection lost"}}
+            latencies.append(time.perf_counter() - (scheduled if rate else sent))
+        per_tool[request["tool"]] = per_tool.get(request["tool"], 0) + 1
+        if "error" in response:
+            kind = response["error"].get("message", "RPC error")
+            errors[kind] = errors.get(kind, 0) + 1
+            return
+        result = response["result"]
+        payload = json.loads(result["content"][0]["text"])
+        if result.get("isError"):
+            kind = payload.get("error", "Tool error")
+            errors[kind] = errors.get(kind, 0) + 1
+            return
+        relevant = golden.get(golden_key(request["arguments"])) if request["tool"] == "search_latex_knowledge" else None
+        if relevant is not None:
+            recall = recall_at_k(payload, relevant, min(k, int(request["arguments"].get("limit", DEFAULT_K))))
+            if recall is not None:
+                recalls.append(recall)
+
+    start = time.perf_counter()
+    tasks = []
+    for i, request in enumerate(requests):
+        scheduled = start + i / rate if rate else start
+        if rate:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run(i + 1, request, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    failed = sum(errors.values())
+    return {
+        "target": target.name,
+        "requests": len(requests),
+        "concurrency": concurrency,
+        "rate": rate or None,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": dict({f"p{p}": round(percentile(p), 3) for p in PERCENTILES},
+                           mean=round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                           max=round(latencies[-1] * 1000, 3) if latencies else 0.0),
+        "error_rate": round(failed / len(requests), 4) if requests else 0.0,
+        "errors": errors,
+        "tools": per_tool,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "recall_queries": len(recalls),
+    }
+
+
+def print_report(report: Dict[str, Any], k: int):
+    latency = report["latency_ms"]
+    print(f"\n目标: {report['target']}  请求: {report['requests']}  并发: {report['concurrency']}  "
+          f"速率: {report['rate'] or '不限'}")
+    print(f"耗时 {report['duration_s']:.2f}s，吞吐 {report['throughput_rps']:.1f} req/s")
+    print("延迟: " + "  ".join(f"{name} {value:.2f}ms" for name, value in latency.items()))
+    print(f"错误率: {report['error_rate']:.2%} {report['errors'] or ''}")
+    recall = report[f"recall@{k}"]
+    print(f"recall@{k}: {'-' if recall is None else f'{recall:.4f}'}（{report['recall_queries']} 个检索）")
+
+
+def main():
+    """主函数"""
+    import argparse
+    from index_snapshot import load_knowledge
+    from knowledge_tools import KNOWLEDGE_FILE, KnowledgeTools
+
+    parser = argparse.ArgumentParser(description="Replay a query log against the local MCP server")
+    parser.add_argument('--mode', choices=['inprocess', 'stdio'], default='inprocess')
+    parser.add_argument('--log', type=Path, help="query log (JSON Lines); default: synthetic log from the KB")
+    parser.add_argument('--synthetic', type=int, default=DEFAULT_SYNTHETIC,
+                        help="number of synthetic requests when no --log is given")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, help="replay this many requests (the log is cycled)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--rate', type=float, default=0.0, help="requests per second (0 = as fast as possible)")
+    parser.add_argument('--golden', type=Path, help="golden set (JSON Lines); default: exhaustive BM25 ranking")
+    parser.add_argument('--k', type=int, default=DEFAULT_K)
+    parser.add_argument('--write-log', type=Path, help="save the replayed log")
+    parser.add_argument('--write-golden', type=Path, help="save the golden set used for recall")
+    parser.add_argument('--report', type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("检索服务压测：回放查询日志")
+    print("=" * 70)
+
+    if args.log:
+        requests = read_log(args.log)
+        print(f"\n查询日志: {args.log}（{len(requests)} 条）")
+    else:
+        data, _ = load_knowledge(KNOWLEDGE_FILE)
+        requests = synthetic_log(data, args.synthetic, args.seed)
+        print(f"\n合成查询日志: {len(requests)} 条（seed {args.seed}）")
+    if args.requests:
+        requests = [requests[i % len(requests)] for i in range(args.requests)]
+    if args.write_log:
+        write_jsonl(args.write_log, requests)
+
+    if args.golden:
+        golden = read_golden(args.golden)
+    else:
+        tools = KnowledgeTools.open()
+        golden = exact_golden(tools, requests, args.k)
+        tools.close()
+    print(f"标准答案集: {len(golden)} 个检索")
+    if args.write_golden:
+        write_golden(args.write_golden, golden)
+
+    async def run():
+        target = InProcessTarget() if args.mode == 'inprocess' else StdioTarget()
+        await target.start()
+        try:
+            return await replay(target, requests, args.concurrency, args.rate, golden, args.k)
+        finally:
+            await target.close()
+
+    report = asyncio.run(run())
+    print_report(report, args.k)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+随机超平面 LSH 近似最近邻索引
+为 "查找相似示例" 提供低延迟候选召回，支持多表与多探针；持久化由索引快照负责（见 index_snapshot.py）
+
+召回与延迟的权衡（6132 个示例、16 表 x 10 位、recall@10，单核，各次运行有波动）：
+probes=0 约 0.58 / 0.9-1.5 ms，默认 probes=2 约 0.77 / 1.7-3 ms，probes=4 约 0.84 / 2.8-4.5 ms；穷举 16-18 ms。
+默认设置未达到亚毫秒目标；需要更低延迟时可减少探针数或表数，代价是召回下降。运行本脚本可复现这组数字。
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Tuple, Iterable, Union
+
+DEFAULT_NUM_TABLES = 16  # 哈希表数量
+DEFAULT_NUM_BITS = 10    # 每张表的超平面数（桶键位数）
+DEFAULT_PROBES = 2       # 每张表额外探测的相邻桶数（召回/延迟权衡，见模块说明）
+PLANE_CACHE_SIZE = 16384  # 超平面符号位缓存的维度数上限（知识库代码词表约 7.4k）
+
+TOKEN_PATTERN = re.compile(r'\\[A-Za-z@]+|[A-Za-z][A-Za-z\-]*[A-Za-z]|[A-Za-z]')
+
+Vector = Dict[Union[str, int], float]
+
+
+def code_tokens(code: str) -> List[str]:
+    """把 LaTeX 代码切分为命令和关键字 token"""
+    return TOKEN_PATTERN.findall(code or '')
+
+
+def vectorize_code(code: str) -> Vector:
+    """代码 token 计数 -> 次线性 TF 加权并 L2 归一化的稀疏向量"""
+    counts: Dict[str, int] = {}
+    for token in code_tokens(code):
+        counts[token] = counts.get(token, 0) + 1
+    return normalize({t: 1.0 + math.log(c) for t, c in counts.items()})
+
+
+def normalize(vector: Vector) -> Vector:
+    """L2 归一化；稠密嵌入可先转成 {维度下标: 值} 再传入"""
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm == 0:
+        return {}
+    return {k: v / norm for k, v in vector.items()}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    """两个已归一化稀疏向量的余弦相似度"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class LSHIndex:
+    """随机超平面 LSH 索引
+
+    每个维度的超平面分量由 (seed, 维度键) 的哈希位确定（±1），
+    因此既支持 token 计数向量，也支持任意稠密嵌入，且无需存储超平面矩阵。
+    """
+
+    def __init__(self, num_tables: int = DEFAULT_NUM_TABLES,
+                 num_bits: int = DEFAULT_NUM_BITS, seed: int = 0):
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.seed = seed
+        self.keys: List[Union[str, int]] = []
+        self.vectors: List[Vector] = []
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self.meta: Dict = {}  # 调用方附加信息（如知识库版本），随索引持久化
+        # 按维度缓存符号位；查询中的新 token 也会进入缓存，故限制容量并按 LRU 淘汰
+        self._plane_bits = lru_cache(maxsize=PLANE_CACHE_SIZE)(self._compute_plane_bits)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _compute_plane_bits(self, key: Union[str, int]) -> int:
+        """返回该维度在全部超平面上的符号位（第 j 位为 1 表示分量为 +1）"""
+        width = (self.num_tables * self.num_bits + 7) // 8
+        digest = hashlib.blake2b(f"{self.seed}:{key}".encode(),
+                                 digest_size=min(width, 64)).digest()
+        while len(digest) < width:
+            digest += hashlib.blake2b(digest, digest_size=64).digest()
+        return int.from_bytes(digest[:width], 'little')
+
+    def _projections(self, vector: Vector) -> List[float]:
+        """计算向量在全部超平面上的投影"""
+        total = self.num_tables * self.num_bits
+        acc = [0.0] * total
+        for key, weight in vector.items():
+            bits = self._plane_bits(key)
+            for j in range(total):
+                if bits >> j & 1:
+                    acc[j] += weight
+                else:
+                    acc[j] -= weight
+        return acc
+
+    def _bucket_keys(self, projections: List[float]) -> List[int]:
+        """每张表的桶键"""
+        keys = []
+        for t in range(self.num_tables):
+            key = 0
+            offset = t * self.num_bits
+            for b in range(self.num_bits):
+                if projections[offset + b] > 0:
+                    key |= 1 << b
+            keys.append(key)
+        return keys
+
+    def add(self, key: Union[str, int], vector: Vector):
+        """加入一个已归一化向量；key 为调用方的条目标识（如知识库下标）"""
+        ordinal = len(self.keys)
+        self.keys.append(key)
+        self.vectors.append(vector)
+        if not vector:
+            return
+        for table, bucket in zip(self.tables, self._bucket_keys(self._projections(vector))):
+            table.setdefault(bucket, []).append(ordinal)
+
+    def candidates(self, vector: Vector, probes: int = DEFAULT_PROBES) -> Iterable[int]:
+        """多探针候选召回
+
+        除了命中的桶，每张表再按投影绝对值从小到大翻转 probes 个位，
+        探测最可能包含近邻的相邻桶。probes 越大召回越高、延迟越大。
+        """
+        projections = self._projections(vector)
+        found = set()
+        for t, key in enumerate(self._bucket_keys(projections)):
+            table = self.tables[t]
+            found.update(table.get(key, ()))
+            if probes <= 0:
+                continue
+            offset = t * self.num_bits
+            margins = sorted(range(self.num_bits), key=lambda b: abs(projections[offset + b]))
+            for b in margins[:probes]:
+                found.update(table.get(key ^ (1 << b), ()))
+        return found
+
+    def query(self, vector: Vector, k: int = 10, probes: int = DEFAULT_PROBES,
+              accept=None) -> List[Tuple[int, float]]:
+        """近似 top-k，返回 (序号, 余弦相似度)；accept 可按序号过滤候选"""
+        if not vector:
+            return []
+        scored = []
+        rerank = self.rerank_vector(vector)
+        for ordinal in self.candidates(vector, probes):
+            if accept is not None and not accept(ordinal):
+                continue
+            scored.append((ordinal, cosine(rerank, self.vectors[ordinal])))
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:k]
+
+    def rerank_vector(self, vector: Vector) -> Vector:
+        """把查询向量转换为与 self.vectors 相同的维度键（词表编码存储的子类会覆盖）"""
+        return vector
+
+    def exact_query(self, vector: Vector, k: int = 10, accept=None) -> List[Tuple[int, float]]:
+        """穷举 top-k（用于基准对比）"""
+        if not vector:
+            return []
+        vector = self.rerank_vector(vector)
+        scored = [(i, cosine(vector, v)) for i, v in enumerate(self.vectors)
+                  if v and (accept is None or accept(i))]
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:k]
+
+
+def build_example_index(data: List[Dict], num_tables: int = DEFAULT_NUM_TABLES,
+                        num_bits: int = DEFAULT_NUM_BITS) -> LSHIndex:
+    """为所有带代码的可执行示例建索引，key 为知识库下标（ID 存在重复，不能作键）"""
+    index = LSHIndex(num_tables, num_bits)
+    for pos, item in enumerate(data):
+        if item.get('type') == 'executable_example' and item.get('code'):
+            index.add(pos, vectorize_code(item['code']))
+    return index
+
+
+def benchmark(index: LSHIndex, queries: List[Vector], k: int = 10,
+              probes_options: Iterable[int] = (0, 1, 2, 4)) -> List[Dict]:
+    """对比穷举搜索，报告各 probes 设置下的 recall@k 与平均延迟"""
+    exact = []
+    start = time.perf_counter()
+    for vector in queries:
+        exact.append({i for i, _ in index.exact_query(vector, k)})
+    exact_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+    report = []
+    for probes in probes_options:
+        hits = total = 0
+        start = time.perf_counter()
+        approx = [index.query(vector, k, probes) for vector in queries]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+        for truth, result in zip(exact, approx):
+            hits += len(truth & {i for i, _ in result})
+            total += len(truth)
+        report.append({
+            "probes": probes,
+            "recall_at_k": hits / total if total else 1.0,
+            "avg_ms": elapsed_ms,
+            "exact_avg_ms": exact_ms,
+        })
+    return report
+
+
+def main():
+    """主函数：构建索引并运行召回/延迟基准（只报告，不写文件；服务使用的 LSH 表保存在索引快照中）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the LSH similar-examples index")
+    parser.add_argument('--tables', type=int, default=DEFAULT_NUM_TABLES)
+    parser.add_argument('--bits', type=int, default=DEFAULT_NUM_BITS)
+    parser.add_argument('--queries', type=int, default=200, help="benchmark sample size")
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("LSH Similar-Examples Index Benchmark")
+    print("=" * 70)
+
+    knowledge_file = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+    with open(knowledge_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    start = time.perf_counter()
+    index = build_example_index(data, args.tables, args.bits)
+    print(f"✓ Indexed {len(index)} examples in {time.perf_counter() - start:.2f}s "
+          f"({args.tables} tables x {args.bits} bits)")
+
+    rng = random.Random(42)
+    sample = rng.sample(range(len(index)), min(args.queries, len(index)))
+    queries = [index.vectors[i] for i in sample]
+
+    print()
+    print(f"Benchmark ({len(queries)} queries, recall@{args.k} vs exact search)")
+    print("-" * 70)
+    for row in benchmark(index, queries, args.k):
+        print(f"  probes={row['probes']:2d}  recall={row['recall_at_k']:.3f}  "
+              f"lsh={row['avg_ms']:.3f} ms  exact={row['exact_avg_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+本地 MCP 检索服务
+基于 asyncio 的 JSON-RPC 服务端，支持 stdio 与本地 HTTP/SSE（与托管的 /mcp 端点一致）两种传输。
+打分在有界线程池中执行，并限制在途请求数、设置单请求截止时间，过载时立即拒绝并给出重试提示。
+索引快照更新后在后台热切换，进行中的请求在其开始时的版本上完成。
+请求指标通过 stats 工具与 HTTP 的 /metrics（Prometheus 文本格式）导出。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+
+from knowledge_tools import KnowledgeTools, TOOL_SCHEMAS, tool_error
+from snapshot_manager import DEFAULT_WATCH_INTERVAL, SnapshotHandle, SnapshotManager
+from server_metrics import ServerMetrics, result_count
+
+PROTOCOL_VERSION = "2024-11-05"
+SERVER_NAME = "latex-mcp-knowledge"
+
+DEFAULT_WORKERS = 8          # 打分线程数
+DEFAULT_MAX_INFLIGHT = 256   # 在途请求上限（排队 + 执行）
+DEFAULT_DEADLINE_MS = 2000   # 单请求截止时间
+RETRY_AFTER_MS = 100         # 过载时建议的重试间隔
+
+# JSON-RPC 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_OVERLOADED = -32000
+DEADLINE_EXCEEDED = -32001
+
+
+class InvalidParams(ValueError):
+    """工具参数不合法（由 call_tool 转成 JSON-RPC Invalid params）"""
+
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+def rpc_result(request_id: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def rpc_error(request_id: Any, code: int, message: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+class MCPServer:
+    """传输无关的请求分发器"""
+
+    def __init__(self, tools: Union[KnowledgeTools, SnapshotManager], workers: int = DEFAULT_WORKERS,
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT, deadline_ms: int = DEFAULT_DEADLINE_MS):
+        # 直接传入 KnowledgeTools 时版本固定，不做热更新
+        self.snapshots = tools if isinstance(tools, SnapshotManager) else SnapshotManager(tools, root=None)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-worker")
+        self.max_inflight = max_inflight
+        self.deadline = deadline_ms / 1000
+        self.workers = workers
+        self.inflight = 0
+        self._draining: Set[asyncio.Task] = set()
+        self.rejected = 0
+        self.timed_out = 0
+        self.metrics = ServerMetrics()
+
+    async def handle(self, message: Any) -> Optional[Dict[str, Any]]:
+        """处理一条 JSON-RPC 消息；通知（无 id）返回 None"""
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+            return rpc_error(None, INVALID_REQUEST, "Invalid request")
+
+        request_id = message.get("id")
+        method = message["method"]
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            return rpc_error(request_id, INVALID_PARAMS, "Invalid params", {"message": "'params' must be an object"})
+
+        if method == "initialize":
+            result = {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": SERVER_NAME, "version": self.snapshots.current.kb_version},
+            }
+        elif method == "ping":
+            result = {}
+        elif method == "tools/list":
+            result = {"tools": [dict(name=name, **schema) for name, schema in TOOL_SCHEMAS.items()]}
+        elif method == "tools/call":
+            name, arguments = params.get("name", ""), params.get("arguments") or {}
+            if not isinstance(name, str) or not isinstance(arguments, dict):
+                return rpc_error(request_id, INVALID_PARAMS, "Invalid params",
+                                 {"message": "'name' must be a string and 'arguments' an object"})
+            return await self.call_tool(request_id, name, arguments)
+        elif method.startswith("notifications/"):
+            return None
+        else:
+            return rpc_error(request_id, METHOD_NOT_FOUND, f"Method '{method}' not found")
+
+        return None if request_id is None else rpc_result(request_id, result)
+
+    async def call_tool(self, request_id: Any, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """在线程池中执行工具；超过在途上限立即拒绝，超过截止时间返回错误
+
+        每次调用按工具记录耗时与结果数；超过慢查询阈值时在后台线程中补算查询计划并留样。
+        """
+        start = time.perf_counter()
+        tool = name if name in TOOL_SCHEMAS else "unknown"  # 未知工具名不单独建指标，避免标签无限增长
+        if self.inflight >= self.max_inflight:
+            self.rejected += 1
+            self.metrics.record(tool, time.perf_counter() - start, True)
+            return rpc_error(request_id, SERVER_OVERLOADED, "Server overloaded",
+                             {"retry_after_ms": RETRY_AFTER_MS})
+
+        self.inflight += 1
+        handle = self.snapshots.acquire()
+        jobs: List[Future] = []
+        try:
+            if name == "stats":
+                text, is_error, count = handle.tools.encode(self.stats(handle.tools)), False, None
+            elif name == "batch_search":
+                text, is_error, count = await asyncio.wait_for(self._batch_search(handle, arguments, jobs),
+                                                               self.deadline)
+            else:
+                future = self._submit(handle, self._call_encoded, handle.tools, name, arguments)
+                jobs.append(future)
+                text, is_error, count = await asyncio.wait_for(asyncio.wrap_future(future), self.deadline)
+            elapsed = time.perf_counter() - start
+            self.metrics.record(tool, elapsed, is_error, count)
+            if self.metrics.is_slow(elapsed) and not is_error:
+                self._submit(handle, self._sample_slow, handle.tools, name, arguments, elapsed)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self.metrics.record(tool, time.perf_counter() - start, True)
+            return rpc_error(request_id, DEADLINE_EXCEEDED, "Deadline exceeded",
+                             {"deadline_ms": int(self.deadline * 1000)})
+        except InvalidParams as e:
+            self.metrics.record(tool, time.perf_counter() - start, True)
+            return rpc_error(request_id, INVALID_PARAMS, "Invalid params", {"message": str(e)})
+        except Exception as e:
+            # 工具内未预料的异常：返回 Internal error，不让 stdio 任务或 HTTP 连接异常终止
+            self.metrics.record(tool, time.perf_counter() - start, True)
+            return rpc_error(request_id, INTERNAL_ERROR, "Internal error", {"message": str(e)})
+        finally:
+            self.snapshots.release(handle)
+            self._release_slot(jobs)
+
+        return rpc_result(request_id, {
+            "content": [{"type": "text", "text": text}],
+            "isError": is_error,
+        })
+
+    def _release_slot(self, jobs: List[Future]):
+        """归还在途名额；超时后仍在线程池中运行的任务结束时才归还
+
+        截止时间到时排队中的任务已随 wait_for 取消，正在运行的无法中断：名额一直占到它们结束，
+        否则过载时超时的任务仍占着线程，新请求却不断被放进来，在线程池队列里越积越多。
+        """
+        running = [job for job in jobs if not job.done()]
+        if not running:
+            self.inflight -= 1
+            return
+        task = asyncio.ensure_future(asyncio.wait([asyncio.wrap_future(job) for job in running]))
+        self._draining.add(task)
+
+        def release(_):
+            self._draining.discard(task)
+            self.inflight -= 1
+        task.add_done_callback(release)
+
+    def _submit(self, handle: SnapshotHandle, fn, *args) -> Future:
+        """提交到线程池并为该版本加一个引用，任务真正结束（含超时后仍在运行的）才释放"""
+        self.snapshots.retain(handle)
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self.snapshots.release(handle))
+        return future
+
+    @staticmethod
+    def _call_encoded(tools: KnowledgeTools, name: str,
+                      arguments: Dict[str, Any]) -> Tuple[str, bool, Optional[int]]:
+        """在工作线程中执行工具并序列化响应（序列化需在该版本仍被引用时完成）
+
+        参数类型错误不作为工具结果返回，而是抛出，由 call_tool 转成 JSON-RPC Invalid params。
+        """
+        payload = tools.call(name, arguments)
+        if payload.get("error") == "Invalid arguments":
+            raise InvalidParams(payload["message"])
+        return tools.encode(payload), "error" in payload, result_count(payload)
+
+    def _sample_slow(self, tools: KnowledgeTools, name: str, arguments: Dict[str, Any], elapsed: float):
+        """记录慢查询样本及其查询计划（在后台线程中执行，不占用原请求的时间）"""
+        try:
+            plan = tools.query_plan(name, arguments)
+        except Exception as e:
+            plan = {"error": str(e)}
+        self.metrics.record_slow(name, elapsed, arguments, plan)
+
+    def stats(self, tools: KnowledgeTools) -> Dict[str, Any]:
+        """stats 工具的响应：索引与缓存统计、各工具请求指标、在途与拒绝计数、热更新记录"""
+        result = {"pid": os.getpid(), "kb_version": tools.kb_version}
+        result.update(tools.stats())
+        result["requests"] = self.metrics.summary()
+        result["server"] = {"workers": self.workers, "inflight": self.inflight,
+                            "max_inflight": self.max_inflight, "rejected": self.rejected,
+                            "timed_out": self.timed_out, "deadline_ms": int(self.deadline * 1000)}
+        result["snapshots"] = self.snapshots.stats()
+        return result
+
+    def prometheus(self) -> str:
+        """/metrics 的 Prometheus 文本；多进程部署时每个工作进程各自统计，每个序列都带 pid 标签
+
+        各工作进程的计数器互相独立，汇总时按 pid 求和（如 sum without (pid) (mcp_requests_total)）。
+        """
+        handle = self.snapshots.acquire()
+        try:
+            tools = handle.tools
+            cache = tools.cache.stats()
+            index = tools.index_info()
+        finally:
+            self.snapshots.release(handle)
+        snapshots = self.snapshots.stats()
+        info = {"kb_version": index["kb_version"], "source": index["source"],
+                "created_at": index.get("created_at") or ""}
+        gauges = [
+            ("mcp_index_info", "gauge", "Index version and build time", info, 1),
+            ("mcp_index_items", "gauge", "Items in the served index", {}, index["count"]),
+            ("mcp_index_mapped_bytes", "gauge", "Bytes of mapped snapshot files", {},
+             snapshots["mapped_bytes"]),
+            ("mcp_snapshot_reloads_total", "counter", "Snapshot switches", {}, snapshots["reloads"]),
+            ("mcp_snapshot_reload_failures_total", "counter", "Failed snapshot loads", {},
+             snapshots["reload_failures"]),
+            ("mcp_cache_hits_total", "counter", "Result cache hits", {}, cache["hits"]),
+            ("mcp_cache_misses_total", "counter", "Result cache misses", {}, cache["misses"]),
+            ("mcp_cache_evictions_total", "counter", "Result cache evictions", {}, cache["evictions"]),
+            ("mcp_cache_entries", "gauge", "Result cache entries", {}, cache["entries"]),
+            ("mcp_cache_hit_ratio", "gauge", "Result cache hit ratio", {}, cache["hit_rate"]),
+            ("mcp_inflight_requests", "gauge", "Requests queued or running", {}, self.inflight),
+            ("mcp_rejected_total", "counter", "Requests rejected as overloaded", {}, self.rejected),
+            ("mcp_deadline_exceeded_total", "counter", "Requests past their deadline", {}, self.timed_out),
+        ]
+        return self.metrics.prometheus(gauges, {"pid": os.getpid()})
+
+    async def _batch_search(self, handle: SnapshotHandle, arguments: Dict[str, Any],
+                            jobs: List[Future]) -> Tuple[str, bool, Optional[int]]:
+        """把批量检索中去重后的各查询并行分发到线程池，全部查询使用同一版本；提交的任务记入 jobs"""
+        start = time.perf_counter()
+        tools = handle.tools
+        try:
+            unique, slots = tools.plan_batch(arguments.get("queries"))
+        except ValueError as e:
+            return tools.encode(tool_error("Invalid batch", str(e))), True, None
+        jobs.extend(self._submit(handle, tools.run_batch_item, query) for query in unique)
+        outcomes = await asyncio.gather(*[asyncio.wrap_future(job) for job in jobs])
+        return tools.encode(tools.assemble_batch(slots, list(outcomes), start)), False, len(slots)
+
+    async def handle_raw(self, raw: bytes) -> Optional[Dict[str, Any]]:
+        """解析原始字节后分发"""
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return rpc_error(None, PARSE_ERROR, "Parse error")
+        return await self.handle(message)
+
+    async def serve_stdio(self):
+        """stdio 传输：每行一条 JSON-RPC 消息，请求并发处理，响应按完成顺序写回"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 24)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def respond(line: bytes):
+            response = await self.handle_raw(line)
+            if response is not None:
+                data = json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n"
+                async with write_lock:
+                    sys.stdout.buffer.write(data)
+                    sys.stdout.buffer.flush()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(respond(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def serve_http(self, host: str, port: int, sock=None):
+        """本地 HTTP 传输：POST /mcp，Accept 含 text/event-stream 时以 SSE 事件返回；
+        GET /health 返回状态，GET /metrics 返回 Prometheus 指标
+
+        传入 sock 时在已监听的套接字上接受连接：预派生的各工作进程共享同一个监听套接字，
+        由内核把新连接分给空闲的进程。
+        """
+        if sock is not None:
+            server = await asyncio.start_server(self._http_connection, sock=sock)
+        else:
+            server = await asyncio.start_server(self._http_connection, host, port)
+        print(f"Serving MCP on http://{host}:{port}/mcp (pid {os.getpid()})", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    async def _http_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个 HTTP/1.1 连接（支持 keep-alive）"""
+        try:
+            while True:
+                request = await read_http_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, content_type, payload, extra = await self._http_dispatch(method, path, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_http_response(writer, status, content_type, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _http_dispatch(self, method: str, path: str, headers: Dict[str, str],
+                             body: bytes) -> Tuple[int, str, bytes, Dict[str, str]]:
+        """路由 HTTP 请求，返回 (状态码, Content-Type, 响应体, 额外头)"""
+        if path == "/health":
+            return 200, "application/json", json.dumps({
+                "status": "ok", "kb_version": self.snapshots.current.kb_version, "pid": os.getpid(),
+                "inflight": self.inflight,
+                "snapshots": self.snapshots.stats(),
+            }).encode('utf-8'), {}
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.prometheus().encode('utf-8'), {}
+        if path != "/mcp":
+            return 404, "application/json", b'{"error":"Not found"}', {}
+        if method != "POST":
+            return 405, "application/json", b'{"error":"Method not allowed"}', {"Allow": "POST"}
+
+        response = await self.handle_raw(body)
+        if response is None:
+            return 202, "application/json", b"", {}
+
+        extra = {}
+        status = 200
+        error = response.get("error")
+        if error and error["code"] == SERVER_OVERLOADED:
+            status = 503
+            extra["Retry-After"] = str(max(1, RETRY_AFTER_MS // 1000))
+
+        data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        if "text/event-stream" in headers.get("accept", "") and status == 200:
+            return status, "text/event-stream", b"event: message\ndata: " + data + b"\n\n", extra
+        return status, "application/json", data, extra
+
+
+async def read_http_request(reader: asyncio.StreamReader):
+    """读取一个 HTTP 请求；连接关闭时返回 None"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split('?', 1)[0], headers, body
+
+
+def write_http_response(writer: asyncio.StreamWriter, status: int, content_type: str,
+                        payload: bytes, extra: Dict[str, str], keep_alive: bool):
+    """写出 HTTP 响应头和响应体"""
+    lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+             f"Content-Type: {content_type}; charset=utf-8",
+             f"Content-Length: {len(payload)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.extend(f"{name}: {value}" for name, value in extra.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + payload)
+
+
+def serve(args, sock=None):
+    """挂载索引快照并按命令行参数运行服务（单进程，或作为预派生的工作进程）"""
+    start = time.perf_counter()
+    snapshots = SnapshotManager.open()
+    tools = snapshots.current.tools
+    print(f"Loaded {tools.count} items (kb {tools.kb_version}) in "
+          f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    server = MCPServer(snapshots, args.workers, args.max_inflight, args.deadline_ms)
+
+    async def run():
+        if args.watch_interval > 0:
+            watcher = asyncio.create_task(snapshots.watch(args.watch_interval))  # noqa: F841  保持引用
+        if args.transport == 'stdio':
+            await server.serve_stdio()
+        else:
+            await server.serve_http(args.host, args.port, sock)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local MCP server for the LaTeX knowledge base")
+    parser.add_argument('--transport', choices=['stdio', 'http'], default='stdio')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--processes', type=int, default=1,
+                        help="pre-forked worker processes sharing the listening socket (http only)")
+    parser.add_argument('--max-inflight', type=int, default=DEFAULT_MAX_INFLIGHT)
+    parser.add_argument('--deadline-ms', type=int, default=DEFAULT_DEADLINE_MS)
+    parser.add_argument('--watch-interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help="seconds between checks for a new index snapshot (0 disables hot reload)")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        if args.transport != 'http':
+            parser.error("--processes requires --transport http")
+        from worker_pool import Supervisor
+        Supervisor(args).run()
+    else:
+        serve(args)
+
+
+if __name__ == '__main__':
+    main()
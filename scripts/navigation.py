@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+生成 mint.json 导航
+由页面清单（.page-manifest.json）中实际生成的页面构建各视图的导航分组，替换 mint.json 中对应的生成分组，
+手写分组保持不变。页数较多的分组按区间嵌套，超过上限时只列首页（其余页面经页内翻页与索引页到达），
+导航规模不随语料增长而膨胀。内容无变化时不写文件。
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional
+
+from page_engine import CURATED_EXAMPLES, DOCS_DIR, PageEngine, display_name, type_display
+
+ROOT_DIR = Path(__file__).parent.parent
+NAV_FLAT_PAGES = 10       # 页数不超过此值的分组平铺列出
+NAV_COLLAPSE_PAGES = 50   # 页数超过此值的分组只列首页
+
+# 生成页面所属的导航分区（按路径识别，用于区分 mint.json 中的生成分组与手写分组）
+SECTION_PATTERNS = (
+    ("browse", re.compile(r'^browse/')),
+    ("knowledge-by-type", re.compile(r'^knowledge-by-type/')),
+    ("examples-full", re.compile(r'^examples-full/')),
+    ("examples", re.compile(r'^examples/[^/]+-examples$')),
+)
+
+
+def page_section(page: str) -> Optional[str]:
+    for section, pattern in SECTION_PATTERNS:
+        if pattern.match(page):
+            return section
+    return None
+
+
+def collapse(label: str, pages: List[str]) -> Dict[str, Any]:
+    """一个分组的导航项：少量页面平铺，中等数量按 NAV_FLAT_PAGES 一段嵌套，过多时只列首页"""
+    if len(pages) <= NAV_FLAT_PAGES:
+        return {"group": label, "pages": pages}
+    if len(pages) > NAV_COLLAPSE_PAGES:
+        return {"group": f"{label} - {len(pages)} Pages", "pages": pages[:1]}
+    return {"group": label, "pages": [
+        {"group": f"Pages {start + 1}-{min(start + NAV_FLAT_PAGES, len(pages))}",
+         "pages": pages[start:start + NAV_FLAT_PAGES]}
+        for start in range(0, len(pages), NAV_FLAT_PAGES)]}
+
+
+def _by_key(pages: List[str], prefix: str, suffix: str) -> Dict[str, List[str]]:
+    """按分组键归并页面：prefix<key>suffix<页码>"""
+    groups: Dict[str, List[str]] = {}
+    for page in pages:
+        if page.startswith(prefix) and suffix in page[len(prefix):]:
+            key = page[len(prefix):].rsplit(suffix, 1)[0]
+            groups.setdefault(key, []).append(page)
+    return groups
+
+
+def _ordered(groups: Dict[str, List[str]], counts: Dict[str, int]) -> List[str]:
+    """分组键按条目数降序、同数按名称排列"""
+    return sorted(groups, key=lambda key: (-counts.get(key, 0), key))
+
+
+def build_sections(manifest: Dict[str, Dict[str, str]], engine: PageEngine) -> Dict[str, Dict[str, Any]]:
+    """由页面清单构建各分区的导航分组 {分区: 分组}（清单中没有页面的分区不生成；条目数取自统计立方体）"""
+    stats = engine.stats
+    by_type = stats.rollup("type")
+    by_package = stats.rollup("macro_package")
+    examples = stats.rollup("macro_package", type="executable_example")
+    pages: Dict[str, List[str]] = {}
+    for path in sorted(manifest):
+        if path.endswith('.mdx'):
+            page = path[:-len('.mdx')]
+            section = page_section(page)
+            if section:
+                pages.setdefault(section, []).append(page)
+
+    sections: Dict[str, Dict[str, Any]] = {}
+    browse = pages.get("browse", [])
+    if browse:
+        entries: List[Any] = [page for page in browse if page == "browse/index"]
+        all_pages = [page for page in browse if page.startswith("browse/all/")]
+        if all_pages:
+            entries.append(collapse(f"Browse All ({len(all_pages)} pages)", all_pages))
+        for label, directory, counts, title in (
+                ("By Type", "by-type", by_type, display_name),
+                ("By Chart Type", "by-chart-type", stats.rollup("chart_type", type="executable_example"), display_name),
+                ("By Package", "by-package", by_package, str.upper)):
+            groups = _by_key(browse, f"browse/{directory}/", "/page-")
+            if groups:
+                entries.append({"group": label, "pages": [
+                    collapse(f"{title(key)} ({counts.get(key, 0):,})", groups[key])
+                    for key in _ordered(groups, counts)]})
+        sections["browse"] = {"group": f"Browse All {stats.total:,} Items", "pages": entries}
+
+    type_pages = pages.get("knowledge-by-type", [])
+    if type_pages:
+        groups = _by_key(type_pages, "knowledge-by-type/", "-page-")
+        total_pages = sum(len(v) for v in groups.values())
+        entries = [page for page in type_pages if page == "knowledge-by-type/by-type-index"]
+        entries += [collapse(f"{type_display(key)} ({by_type.get(key, 0):,})", groups[key])
+                    for key in _ordered(groups, by_type)]
+        total = sum(by_type.get(key, 0) for key in groups)
+        sections["knowledge-by-type"] = {"group": f"By Type ({total:,} Total - {total_pages} Pages)",
+                                         "pages": entries}
+
+    examples_full = pages.get("examples-full", [])
+    if examples_full:
+        groups = _by_key(examples_full, "examples-full/", "-page-")
+        total_pages = sum(len(v) for v in groups.values())
+        entries = [page for page in examples_full if page == "examples-full/all-examples"]
+        entries += [collapse(f"{key} ({examples.get(key, 0):,} examples)", groups[key])
+                    for key in _ordered(groups, examples)]
+        total = sum(examples.get(key, 0) for key in groups)
+        sections["examples-full"] = {"group": f"All Examples ({total:,} Total - {total_pages} Pages)",
+                                     "pages": entries}
+
+    curated = pages.get("examples", [])
+    if curated:
+        groups = _by_key(curated, "examples/", "-examples")
+        total = sum(min(examples.get(key, 0), CURATED_EXAMPLES) for key in groups)
+        sections["examples"] = {"group": f"Quick Examples ({total:,} Total)",
+                                "pages": [groups[key][0] for key in _ordered(groups, examples)]}
+    return sections
+
+
+def _leaves(entry: Any) -> Iterator[str]:
+    if isinstance(entry, str):
+        yield entry
+    else:
+        for page in entry.get("pages", []):
+            yield from _leaves(page)
+
+
+def _prefixed(entry: Any, prefix: str) -> Any:
+    if isinstance(entry, str):
+        return prefix + entry
+    return dict(entry, pages=[_prefixed(page, prefix) for page in entry["pages"]])
+
+
+def merge_navigation(navigation: List[Any], sections: Dict[str, Dict[str, Any]], prefix: str = "") -> List[Any]:
+    """用生成的分区替换导航中对应的生成分组，手写分组与未生成分区的旧分组原样保留
+
+    分区放在原有生成分组的位置；原先没有的分区放在最后一个生成分区之后（都没有时追加到末尾）。
+    """
+    result: List[Any] = []
+    placed = set()
+    last = None
+    for group in navigation:
+        leaves = [page[len(prefix):] if page.startswith(prefix) else page for page in _leaves(group)]
+        owners = {page_section(page) for page in leaves}
+        section = owners.pop() if len(owners) == 1 else None
+        if section not in sections:
+            result.append(group)
+            continue
+        if section not in placed:
+            result.append(_prefixed(sections[section], prefix))
+            placed.add(section)
+        last = len(result)
+    missing = [_prefixed(sections[s], prefix) for s in sections if s not in placed]
+    position = len(result) if last is None else last
+    return result[:position] + missing + result[position:]
+
+
+def navigation_files(root: Path) -> List[tuple]:
+    """需要更新的 mint.json 及其页面路径前缀：文档目录内的一份，输出到仓库文档目录时还有根目录的一份"""
+    files = [(Path(root) / 'mint.json', "")]
+    if Path(root).resolve() == DOCS_DIR.resolve():
+        files.append((ROOT_DIR / 'mint.json', f"{DOCS_DIR.name}/"))
+    return files
+
+
+def update_navigation(manifest: Dict[str, Dict[str, str]], engine: PageEngine, root: Path = DOCS_DIR) -> List[Path]:
+    """重新生成 mint.json 中的导航分组，返回实际改写的文件（内容不变的文件不写）"""
+    sections = build_sections(manifest, engine)
+    changed = []
+    for path, prefix in navigation_files(root):
+        if not path.exists():
+            continue
+        old = path.read_text(encoding='utf-8')
+        config = json.loads(old)
+        config["navigation"] = merge_navigation(config.get("navigation", []), sections, prefix)
+        text = json.dumps(config, ensure_ascii=False, indent=2) + "\n"
+        if text == old:
+            continue
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, path)
+        changed.append(path)
+    return changed
@@ -0,0 +1,925 @@
+#!/usr/bin/env python3
+"""
+文档页面生成引擎
+只加载一次知识库、一次遍历完成分组，browse、knowledge-by-type、examples-full、examples 各视图
+共用按条目缓存的 MDX 片段渲染（同一条目在多个视图中只格式化、转义一次）。
+另生成供静态托管检索的分片 JSON 索引（search-index，见 static_search.py）。
+各视图拆成页面级工作单元，可在进程池中并行渲染，结果按顺序经有界队列写出，与串行输出逐字节一致。
+写出时按内容哈希增量更新：只重写内容变化的页面，并删除分页缩减后不再生成的旧页面。
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import hashlib
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from search_engine import item_name
+from stats_cube import StatsCube, kb_version
+
+DOCS_DIR = Path(__file__).parent.parent / 'mintlify-docs'
+KNOWLEDGE_FILE = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+MANIFEST_FILE = '.page-manifest.json'  # 页面路径 -> 所属视图与内容哈希
+
+# 分页按页面字节数预算装箱（约 4 字节 / token），而不是固定条数：条目从一行命令到数 KB 代码不等
+BROWSE_PAGE_BYTES = 32 * 1024    # browse/ 每页预算
+TYPE_PAGE_BYTES = 24 * 1024      # knowledge-by-type/ 每页预算
+EXAMPLES_PAGE_BYTES = 16 * 1024  # examples-full/ 每页预算
+PAGE_OVERHEAD = 1024             # 预留给 front matter、标题与翻页行
+CURATED_EXAMPLES = 100        # examples/ 每个包最多示例数
+CODE_LIMIT = 2000             # 代码块截断长度
+CURATED_CODE_LIMIT = 1500
+ITEM_CODE_LIMIT = 8000        # items/ 单条目页的代码截断长度
+ITEM_BUCKET_DIGITS = 2        # items/ 按唯一 ID 哈希的前 2 位十六进制分目录（256 个）
+DESCRIPTION_LIMIT = 500       # browse 描述截断长度
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+RENDER_CHUNK = 8              # 每次交给渲染进程的页面数
+WRITE_QUEUE_SIZE = 64         # 已渲染、待写出的页面上限
+WRITE_THREADS = 4
+
+# browse/ 下按分组分页的视图 -> 分组
+BROWSE_GROUPS = {
+    "browse-all": "all",
+    "browse-by-type": "type",
+    "browse-by-chart-type": "chart_type",
+    "browse-by-package": "package",
+}
+
+# 各视图生成页面的路径模式（相对文档目录）。没有页面清单时（首次运行）据此认领已有的生成页面，
+# 这样旧分页留下的页面也能作为过期页面删除；手写页面不匹配这些模式。
+VIEW_PATTERNS = {
+    "browse-all": re.compile(r'browse/all/page-\d{3}\.mdx'),
+    "browse-by-type": re.compile(r'browse/by-type/[^/]+/page-\d{3}\.mdx'),
+    "browse-by-chart-type": re.compile(r'browse/by-chart-type/[^/]+/page-\d{3}\.mdx'),
+    "browse-by-package": re.compile(r'browse/by-package/[^/]+/page-\d{3}\.mdx'),
+    "browse-index": re.compile(r'browse/index\.mdx'),
+    "knowledge-by-type": re.compile(r'knowledge-by-type/(?:[^/]+-page-\d{3}|by-type-index)\.mdx'),
+    "examples-full": re.compile(r'examples-full/(?:[^/]+-page-\d{3}|all-examples)\.mdx'),
+    "examples": re.compile(r'examples/[^/]+-examples\.mdx'),
+    "search-index": re.compile(r'search-index/(?:terms/[0-9a-f]+|items/[^/]+-\d{3}|manifest)\.json'),
+    "items": re.compile(r'items/[0-9a-f]{%d}/[^/]+\.mdx' % ITEM_BUCKET_DIGITS),
+}
+
+TYPE_DISPLAY = {
+    'executable_example': 'Executable Examples',
+    'command': 'Command Specifications',
+    'component': 'Component Definitions',
+    'environment': 'Environment Specifications',
+    'key_value': 'Key-Value Options',
+}
+
+# knowledge-by-type 中各类型条目的标题前缀、名称字段与类型说明
+TYPE_ENTRY = {
+    'command': ('Command', 'command_name', 'Command Specification'),
+    'component': ('Component', 'component_name', 'Component Definition'),
+    'environment': ('Environment', 'environment_name', 'Environment Specification'),
+    'key_value': ('Option', 'key_name', 'Key-Value Option'),
+}
+
+# 各条目样式的分页参数：条目标题格式与页面预算
+PAGE_LAYOUT = {
+    "browse": ("## {}. ", BROWSE_PAGE_BYTES),
+    "type": ("## {}. ", TYPE_PAGE_BYTES),
+    "example_full": ("## Example {}: ", EXAMPLES_PAGE_BYTES),
+}
+
+ZWSP = '\u200B'  # 零宽度空格
+# 唯一的转义表（所有视图共用）。str.replace 链走 C 层快速路径，实测比一对多映射的 str.translate 快数倍
+MDX_ESCAPES = (('{', '&#123;'), ('}', '&#125;'), ('<', '&lt;'), ('>', '&gt;'))
+KEYWORD_PATTERN = re.compile(r'^(export|import)(?=\s)', re.MULTILINE)
+
+
+def escape_for_mdx(text: str) -> str:
+    """转义可能导致 MDX 解析错误的字符：{}<> 换成实体，行首的 export/import 后加零宽度空格"""
+    if not text:
+        return text
+    for char, entity in MDX_ESCAPES:
+        text = text.replace(char, entity)
+    if 'export' in text or 'import' in text:
+        text = KEYWORD_PATTERN.sub(r'\1' + ZWSP, text)
+    return text
+
+
+def display_name(name: str) -> str:
+    return name.replace('_', ' ').title()
+
+
+def type_display(type_name: str) -> str:
+    return TYPE_DISPLAY.get(type_name, display_name(type_name))
+
+
+def _pack(sizes: List[int], capacity: int) -> List[Tuple[int, int]]:
+    """顺序贪心装箱：当前页放不下下一个条目时换页（超出容量的单个条目独占一页）"""
+    ranges = []
+    start = used = 0
+    for i, size in enumerate(sizes):
+        if i > start and used + size > capacity:
+            ranges.append((start, i))
+            start, used = i, 0
+        used += size
+    ranges.append((start, len(sizes)))
+    return ranges
+
+
+def type_page_url(type_name: str, page_num: int) -> str:
+    """knowledge-by-type 页面的站内链接"""
+    return f"/knowledge-by-type/{type_name}-page-{page_num:03d}"
+
+
+def item_page_path(uid: str) -> str:
+    """单条目页的路径（不含扩展名）：items/<哈希前缀>/<唯一 ID>，由唯一 ID 直接算出"""
+    return f"items/{hashlib.md5(uid.encode('utf-8')).hexdigest()[:ITEM_BUCKET_DIGITS]}/{uid}"
+
+
+def built_views(root: Path = DOCS_DIR) -> Set[str]:
+    """页面清单中记录的已生成视图（还没有清单时为空）"""
+    try:
+        with open(Path(root) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    return {entry.get('view') for entry in manifest.values()}
+
+
+def short_name(item: Dict, limit: int = 80) -> str:
+    """单行显示名称（从 .dtx 抽取的命令名可能跨多行）"""
+    name = item_name(item).strip().split('\n', 1)[0].strip()
+    return name[:limit] + "..." if len(name) > limit else name
+
+
+def paginate(sizes: List[int], budget: int) -> List[Tuple[int, int]]:
+    """按字节预算保序分页，返回各页的 [start, end) 区间
+
+    先按预算贪心装箱得到最少页数，再在页数不变的前提下二分出最小容量重新装箱，
+    使各页大小尽量均匀（避免前几页贴着预算、最后一页很轻）。
+    """
+    if not sizes:
+        return []
+    ranges = _pack(sizes, budget)
+    low, high = max(sum(sizes) // len(ranges), 1), budget
+    while low < high:
+        mid = (low + high) // 2
+        if len(_pack(sizes, mid)) <= len(ranges):
+            high = mid
+        else:
+            low = mid + 1
+    return _pack(sizes, high)
+
+
+class Page:
+    """一个待写出的 MDX 页面（路径相对 mintlify-docs/）"""
+
+    __slots__ = ('path', 'content')
+
+    def __init__(self, path: str, content: str):
+        self.path = path
+        self.content = content
+
+
+class PageEngine:
+    """一次加载、一次分组，渲染全部文档视图"""
+
+    VIEWS = ("browse-all", "browse-by-type", "browse-by-chart-type", "browse-by-package", "browse-index",
+             "knowledge-by-type", "examples-full", "examples", "search-index")
+    OPTIONAL_VIEWS = ("items",)  # 只在 --views 显式指定时生成
+
+    def __init__(self, data: List[Dict], stats: Optional[StatsCube] = None):
+        self.data = data
+        self.stats = stats if stats is not None else StatsCube.build(data)  # 索引页中的统计数字都来自这里
+        self._fragments: Dict[Tuple[str, int], str] = {}
+        self._escaped: Dict[str, str] = {}  # 原文 -> 转义结果（按内容缓存，相同代码/描述在各视图、各条目间共用）
+        self.fragment_hits = 0
+        self.escape_hits = 0
+        self._ranges: Dict[Tuple[str, str, str], List[Tuple[int, int]]] = {}
+        self._all = list(range(len(data)))
+        self._search_index = None
+        self._uids: Optional[List[str]] = None
+        self._related: Optional[List[List[Tuple[int, List[str]]]]] = None
+
+        # 一次遍历完成全部分组（值为条目下标，保持知识库顺序）
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_chart_type: Dict[str, List[int]] = {}
+        self.by_package: Dict[str, List[int]] = {}
+        self.examples_by_package: Dict[str, List[int]] = {}  # 有代码的可执行示例
+        for pos, item in enumerate(data):
+            item_type = item.get('type', 'unknown')
+            package = item.get('macro_package', 'unknown')
+            self.by_type.setdefault(item_type, []).append(pos)
+            self.by_package.setdefault(package, []).append(pos)
+            if item_type == 'executable_example':
+                self.by_chart_type.setdefault(item.get('chart_type', 'other'), []).append(pos)
+                if item.get('code'):
+                    self.examples_by_package.setdefault(package, []).append(pos)
+
+    @classmethod
+    def load(cls, knowledge_file: Path = KNOWLEDGE_FILE) -> 'PageEngine':
+        """加载知识库；统计立方体与知识库版本一致时直接复用已保存的结果"""
+        raw = Path(knowledge_file).read_bytes()
+        data = json.loads(raw.decode('utf-8'))
+        cube_file = Path(knowledge_file).parent / 'stats-cube.json'
+        return cls(data, StatsCube.for_knowledge(data, kb_version(raw), cube_file))
+
+    # ---- 条目片段（按视图样式缓存） ----
+
+    def fragment(self, style: str, pos: int) -> str:
+        """条目在某种样式下的 MDX 片段（不含随页面变化的序号），首次使用时渲染并缓存"""
+        key = (style, pos)
+        cached = self._fragments.get(key)
+        if cached is not None:
+            self.fragment_hits += 1
+            return cached
+        text = getattr(self, f"_render_{style}")(self.data[pos], pos)
+        self._fragments[key] = text
+        return text
+
+    def escape(self, text: str) -> str:
+        """escape_for_mdx 的缓存版本"""
+        cached = self._escaped.get(text)
+        if cached is not None:
+            self.escape_hits += 1
+            return cached
+        cached = self._escaped[text] = escape_for_mdx(text)
+        return cached
+
+    def code_block(self, pos: int, limit: int = CODE_LIMIT) -> str:
+        """转义并截断后的代码（knowledge-by-type、examples-full 与 examples 共用同一转义结果）"""
+        code = self.escape(self.data[pos].get('code', ''))
+        if len(code) > limit:
+            code = code[:limit] + "\n... (truncated)"
+        return code
+
+    def _render_browse(self, item: Dict, pos: int) -> str:
+        item_type = item['type']
+        parts = []
+        if item_type == 'executable_example':
+            parts.append(f"{display_name(item.get('chart_type', 'other'))} Example\n\n")
+        elif item_type == 'command_specification':
+            parts.append("Command Specification\n\n")
+        else:
+            parts.append(f"{display_name(item_type)}\n\n")
+
+        parts.append(f"**ID**: `{item.get('id', 'N/A')}`  \n")
+        parts.append(f"**Type**: {item_type}  \n")
+        parts.append(f"**Package**: {item.get('macro_package', 'N/A')}  \n")
+        if item_type == 'executable_example':
+            parts.append(f"**Chart Type**: {item.get('chart_type', 'N/A')}  \n")
+        parts.append("\n")
+
+        description = item.get('description', '') or item.get('title', '')
+        if description and description.strip():
+            if len(description) > DESCRIPTION_LIMIT:
+                description = description[:DESCRIPTION_LIMIT] + "..."
+            parts.append(f"### Description\n\n{self.escape(description)}\n\n")
+
+        # 不包含代码块：LaTeX 代码中的 {} 会被 MDX 误认为 JavaScript 表达式
+        parts.append("\n---\n\n")
+        return ''.join(parts)
+
+    def _render_type(self, item: Dict, pos: int) -> str:
+        type_name = item.get('type', 'unknown')
+        item_id = item.get('id', 'N/A')
+        package = item.get('macro_package', 'N/A')
+        parts = []
+        if type_name == 'executable_example':
+            parts.append(f"{display_name(item.get('chart_type', 'other'))}\n\n")
+            parts.append(f"**ID**: `{item_id}`  \n**Package**: {package}  \n**Type**: Executable Example  \n\n")
+            if item.get('code'):
+                parts.append(f'<pre><code class="language-latex">\n{self.code_block(pos)}\n</code></pre>\n\n')
+        elif type_name in TYPE_ENTRY:
+            label, name_field, type_label = TYPE_ENTRY[type_name]
+            parts.append(f"{label}: `{item.get(name_field, 'Unknown')}`\n\n")
+            parts.append(f"**ID**: `{item_id}`  \n**Package**: {package}  \n**Type**: {type_label}  \n\n")
+            description = item.get('description', '')
+            if description:
+                parts.append(f"**Description**: {self.escape(description)}\n\n")
+            if type_name == 'command' and item.get('syntax'):
+                parts.append(f"**Syntax**:\n```latex\n{item['syntax']}\n```\n\n")
+        parts.append("---\n\n")
+        return ''.join(parts)
+
+    def _render_example_full(self, item: Dict, pos: int) -> str:
+        parts = [f"{display_name(item.get('chart_type', 'other'))}\n\n",
+                 f"**ID**: `{item.get('id', 'N/A')}`\n**Package**: {item.get('macro_package', 'unknown')}\n\n"]
+        description = item.get('description', '') or item.get('title', '')
+        if description:
+            parts.append(f"**Description**: {self.escape(description)}\n\n")
+        parts.append(f'<pre><code class="language-latex">\n{self.code_block(pos)}\n</code></pre>\n\n---\n\n')
+        return ''.join(parts)
+
+    def _render_example(self, item: Dict, pos: int) -> str:
+        code = self.code_block(pos, CURATED_CODE_LIMIT)
+        return (f"{display_name(item.get('chart_type', 'other'))}\n\n"
+                f"**ID**: `{item.get('id', 'N/A')}`\n\n"
+                f'<pre><code class="language-latex">\n{code}\n</code></pre>\n\n---\n\n')
+
+    # ---- 视图：先规划成页面级工作单元，再逐页渲染 ----
+
+    def group(self, kind: str, key: str) -> List[int]:
+        """分组内的条目下标：kind 为 all / type / chart_type / package / examples"""
+        if kind == "all":
+            return self._all
+        return {"type": self.by_type, "chart_type": self.by_chart_type, "package": self.by_package,
+                "examples": self.examples_by_package}[kind][key]
+
+    def page_ranges(self, kind: str, key: str, style: str) -> List[Tuple[int, int]]:
+        """分组按 style 样式渲染时的分页区间（缓存，正文页、翻页行与索引页共用同一划分）
+
+        条目大小为标题加片段的 UTF-8 字节数；片段同时进入缓存，渲染正文时直接复用。
+        """
+        cache_key = (kind, key, style)
+        ranges = self._ranges.get(cache_key)
+        if ranges is None:
+            heading, budget = PAGE_LAYOUT[style]
+            sizes = [len(heading.format(i).encode('utf-8')) + len(self.fragment(style, pos).encode('utf-8'))
+                     for i, pos in enumerate(self.group(kind, key), 1)]
+            ranges = self._ranges[cache_key] = paginate(sizes, budget - PAGE_OVERHEAD)
+        return ranges
+
+    def type_pages(self) -> List[int]:
+        """每个条目在 knowledge-by-type 中的页码（按知识库顺序，供 MCP 结果的 url 使用）"""
+        pages = [0] * len(self.data)
+        for type_name, positions in self.by_type.items():
+            for page_num, (start, end) in enumerate(self.page_ranges("type", type_name, "type")):
+                for pos in positions[start:end]:
+                    pages[pos] = page_num
+        return pages
+
+    def plan(self, views: Optional[List[str]] = None) -> List[Tuple[str, str, tuple]]:
+        """把视图拆成页面级工作单元 [(视图, 渲染方法, 参数)]，参数都是可 pickle 的小元组"""
+        units = []
+        for view in views or self.VIEWS:
+            if view in BROWSE_GROUPS:
+                kind = BROWSE_GROUPS[view]
+                keys = [""] if kind == "all" else list({"type": self.by_type, "chart_type": self.by_chart_type,
+                                                        "package": self.by_package}[kind])
+                for key in keys:
+                    for page_num in range(len(self.page_ranges(kind, key, "browse"))):
+                        units.append((view, "browse_page", (kind, key, page_num)))
+            elif view == "browse-index":
+                units.append((view, "browse_index", ()))
+            elif view == "knowledge-by-type":
+                for type_name in self.stats.rollup("type"):
+                    for page_num in range(len(self.page_ranges("type", type_name, "type"))):
+                        units.append((view, "type_page", (type_name, page_num)))
+                units.append((view, "type_index", ()))
+            elif view == "examples-full":
+                for package in sorted(self.examples_by_package):
+                    for page_num in range(len(self.page_ranges("examples", package, "example_full"))):
+                        units.append((view, "example_full_page", (package, page_num)))
+                units.append((view, "examples_index", ()))
+            elif view == "examples":
+                units += [(view, "examples_page", (package,)) for package in sorted(self.examples_by_package)]
+            elif view == "items":
+                self.related  # 在父进程中先算好，fork 出的渲染进程直接继承
+                uids = self.uids
+                seen = set()
+                for pos, uid in enumerate(uids):
+                    if uid not in seen:  # 完全相同的重复条目共用一个页面
+                        seen.add(uid)
+                        units.append((view, "item_page", (pos,)))
+            elif view == "search-index":
+                units += [(view, "search_file", (path,)) for path in self.search_index.files()]
+            else:
+                raise ValueError(f"Unknown view: {view}")
+        return units
+
+    def render_unit(self, unit: Tuple[str, str, tuple]) -> Page:
+        _, renderer, args = unit
+        return getattr(self, renderer)(*args)
+
+    def browse_page(self, kind: str, key: str, page_num: int) -> Page:
+        """browse/ 下一组条目的一页"""
+        directory, title = {
+            "all": ("all", "All Items"),
+            "type": (f"by-type/{key}", display_name(key)),
+            "chart_type": (f"by-chart-type/{key}", display_name(key)),
+            "package": (f"by-package/{key}", key.upper()),
+        }[kind]
+        positions = self.group(kind, key)
+        ranges = self.page_ranges(kind, key, "browse")
+        start, end = ranges[page_num]
+        total_pages = len(ranges)
+        prev_link = f"[← Previous](page-{page_num - 1:03d})" if page_num > 0 else ""
+        next_link = f"[Next →](page-{page_num + 1:03d})" if page_num < total_pages - 1 else ""
+        nav_line = " | ".join(filter(None, [prev_link, next_link]))
+        page_title = f"{title} - Page {page_num + 1}"
+        parts = [f"""---
+title: "{page_title}"
+description: "Showing items {start + 1}-{end} of {len(positions)}"
+---
+
+# {page_title}
+
+Showing items **{start + 1}-{end}** of **{len(positions)}** | Page **{page_num + 1}** of **{total_pages}**
+
+{nav_line}
+
+---
+
+"""]
+        for i, pos in enumerate(positions[start:end], start=start + 1):
+            parts.append(f"## {i}. ")
+            parts.append(self.fragment("browse", pos))
+        parts.append(f"\n---\n\n{nav_line}\n")
+        return Page(f"browse/{directory}/page-{page_num:03d}.mdx", ''.join(parts))
+
+    def browse_index(self) -> Page:
+        """browse/index.mdx：统计与各分组入口"""
+        total = self.stats.total
+        types = list(self.stats.rollup("type").items())
+        packages = list(self.stats.rollup("macro_package").items())
+        chart_types = list(self.stats.rollup("chart_type", type="executable_example").items())
+
+        types_list = '\n'.join(f"- **{display_name(t)}**: {c} items" for t, c in types)
+        packages_list = '\n'.join(f"- **{p.upper()}**: {c} items" for p, c in packages)
+        chart_types_list = '\n'.join(f"- **{display_name(ct)}**: {c} items" for ct, c in chart_types)
+        browse_by_type = '\n'.join(f"- [{display_name(t)}](by-type/{t}/page-000) - {c} items" for t, c in types)
+        browse_by_chart = '\n'.join(f"- [{display_name(ct)}](by-chart-type/{ct}/page-000) - {c} items"
+                                    for ct, c in chart_types if c > 0)
+        browse_by_package = '\n'.join(f"- [{p.upper()}](by-package/{p}/page-000) - {c} items" for p, c in packages)
+
+        content = f"""---
+title: "Browse Knowledge Base"
+description: "Explore all {total} items in the LaTeX knowledge base"
+---
+
+# Browse Knowledge Base
+
+Welcome to the complete LaTeX chart knowledge base browser. Explore all **{total} items** extracted from {len(packages)} LaTeX package manuals.
+
+## Statistics
+
+### By Type
+{types_list}
+
+### By Package
+{packages_list}
+
+### By Chart Type (Executable Examples Only)
+{chart_types_list}
+
+## Browse Options
+
+### [Browse All Items →](all/page-000)
+View all {total} items in sequential order ({len(self.page_ranges("all", "", "browse"))} pages of up to {BROWSE_PAGE_BYTES // 1024} KB).
+
+### Browse by Type
+{browse_by_type}
+
+### Browse by Chart Type
+{browse_by_chart}
+
+### Browse by Package
+{browse_by_package}
+
+## Search
+
+Use the search box in the top navigation bar to search across all items. The search index includes:
+- Code snippets
+- Descriptions
+- Command names
+- Package names
+- Chart types
+
+## Download Full Dataset
+
+Download the complete knowledge base for offline use or programmatic access:
+
+- [Structured JSON (6 MB)](https://github.com/inker-yyk/latex-mcp-knowledge/raw/master/knowledge-base/latex-chart-knowledge-structured.json)
+- [Statistics](https://github.com/inker-yyk/latex-mcp-knowledge/raw/master/knowledge-base/knowledge-stats.json)
+- [TikZ Raw Data](https://github.com/inker-yyk/latex-mcp-knowledge/raw/master/knowledge-base/tikz-knowledge-raw.json)
+- [PGFPlots Raw Data](https://github.com/inker-yyk/latex-mcp-knowledge/raw/master/knowledge-base/pgfplots-knowledge-raw.json)
+
+## About This Knowledge Base
+
+This knowledge base was automatically extracted from:
+- TikZ/PGF Manual v3.1.10
+- PGFPlots Manual v1.18
+
+Each item includes:
+- Executable LaTeX code
+- Dependencies and requirements
+- Quality scores and priority ratings
+- MCP protocol metadata
+
+For more information, see the [Knowledge Base Overview](../knowledge/overview).
+"""
+        return Page("browse/index.mdx", content)
+
+    @staticmethod
+    def _nav(prefix: str, page_num: int, total_pages: int) -> str:
+        """knowledge-by-type 与 examples-full 的翻页行"""
+        parts = []
+        if page_num > 0:
+            parts.append(f"[← Previous]({prefix}-page-{page_num - 1:03d})")
+        parts.append(f"Page {page_num + 1} of {total_pages}")
+        if page_num < total_pages - 1:
+            parts.append(f"[Next →]({prefix}-page-{page_num + 1:03d})")
+        return " | ".join(parts)
+
+    def type_page(self, type_name: str, page_num: int) -> Page:
+        """knowledge-by-type/ 的一页（带代码与描述）"""
+        display = type_display(type_name)
+        positions = self.by_type[type_name]
+        ranges = self.page_ranges("type", type_name, "type")
+        start, end = ranges[page_num]
+        page_title = f"{display} - Page {page_num + 1}"
+        parts = [f"""---
+title: "{page_title}"
+description: "Items {start + 1}-{end} of {len(positions)} {display.lower()}"
+---
+
+# {page_title}
+
+Showing items **{start + 1}-{end}** of **{len(positions)}**
+
+"""]
+        nav = self._nav(type_name, page_num, len(ranges)) if len(ranges) > 1 else None
+        if nav:
+            parts.append(nav + "\n\n---\n\n")
+        for idx, pos in enumerate(positions[start:end], start=start + 1):
+            parts.append(f"## {idx}. ")
+            parts.append(self.fragment("type", pos))
+        if nav:
+            parts.append("\n" + nav + "\n")
+        return Page(f"knowledge-by-type/{type_name}-page-{page_num:03d}.mdx", ''.join(parts))
+
+    def type_index(self) -> Page:
+        """knowledge-by-type/by-type-index.mdx"""
+        parts = [f"""---
+title: "Knowledge Base by Type"
+description: "Browse all {self.stats.total:,} knowledge items by type"
+---
+
+# Knowledge Base by Type
+
+Complete categorization of all LaTeX knowledge items.
+
+## By Type
+
+"""]
+        for type_name, count in self.stats.rollup("type").items():
+            display = type_display(type_name)
+            total_pages = len(self.page_ranges("type", type_name, "type"))
+            parts.append(f"### {display} ({count} items)\n\n")
+            parts.append(f"- Total: {count} items across {total_pages} pages\n")
+            parts.append(f"- [View {display}]({type_name}-page-000)\n\n")
+        parts.append(f"**Total**: {self.stats.total} knowledge items\n")
+        return Page("knowledge-by-type/by-type-index.mdx", ''.join(parts))
+
+    def example_full_page(self, package: str, page_num: int) -> Page:
+        """examples-full/ 中一个包的一页示例"""
+        positions = self.examples_by_package[package]
+        ranges = self.page_ranges("examples", package, "example_full")
+        start, end = ranges[page_num]
+        page_title = f"{package.upper()} Examples - Page {page_num + 1}"
+        parts = [f"""---
+title: "{page_title}"
+description: "LaTeX examples {start + 1}-{end} from {package} ({len(positions)} total)"
+---
+
+# {page_title}
+
+Showing examples **{start + 1}-{end}** of **{len(positions)}** from the {package} package.
+
+"""]
+        nav = self._nav(package, page_num, len(ranges)) if len(ranges) > 1 else None
+        if nav:
+            parts.append(nav + "\n\n---\n\n")
+        for idx, pos in enumerate(positions[start:end], start=start + 1):
+            parts.append(f"## Example {idx}: ")
+            parts.append(self.fragment("example_full", pos))
+        if nav:
+            parts.append("\n" + nav + "\n")
+        return Page(f"examples-full/{package}-page-{page_num:03d}.mdx", ''.join(parts))
+
+    def examples_index(self) -> Page:
+        """examples-full/all-examples.mdx"""
+        counts = self.stats.rollup("macro_package", type="executable_example")
+        total = self.stats.count(type="executable_example")
+        parts = [f"""---
+title: "All LaTeX Code Examples"
+description: "Browse {total:,} executable LaTeX examples from {len(counts)} packages"
+---
+
+# All LaTeX Code Examples
+
+Complete collection of executable LaTeX examples from all {len(counts)} packages.
+
+## By Package
+
+"""]
+        for package in sorted(self.examples_by_package):
+            ranges = self.page_ranges("examples", package, "example_full")
+            total_pages = len(ranges)
+            parts.append(f"- **{package}**: {counts.get(package, 0)} examples across {total_pages} pages\n")
+            for page_num, (start, end) in enumerate(ranges):
+                parts.append(f"  - [Page {page_num + 1}]({package}-page-{page_num:03d}) - examples {start + 1}-{end}\n")
+        parts.append(f"\n**Total**: {total} executable examples\n")
+        return Page("examples-full/all-examples.mdx", ''.join(parts))
+
+    def examples_page(self, package: str) -> Page:
+        """examples/：一个包的精选示例页（前 CURATED_EXAMPLES 个）"""
+        positions = self.examples_by_package[package][:CURATED_EXAMPLES]
+        parts = [f"""---
+title: "{package.upper()} Code Examples"
+description: "Executable LaTeX examples from {package} package"
+---
+
+# {package.upper()} Code Examples
+
+This page contains {len(positions)} executable examples from the {package} package.
+
+"""]
+        for idx, pos in enumerate(positions, 1):
+            parts.append(f"## Example {idx}: ")
+            parts.append(self.fragment("example", pos))
+        return Page(f"examples/{package}-examples.mdx", ''.join(parts))
+
+    @property
+    def search_index(self) -> 'StaticSearchIndex':
+        """静态分片检索索引（首次使用时构建；条目 url 与 knowledge-by-type 的实际分页一致）"""
+        if self._search_index is None:
+            from static_search import StaticSearchIndex
+            urls = [type_page_url(self.data[pos].get('type', 'unknown'), page)
+                    for pos, page in enumerate(self.type_pages())]
+            self._search_index = StaticSearchIndex(self.data, urls)
+        return self._search_index
+
+    @property
+    def uids(self) -> List[str]:
+        """各条目的唯一 ID（与 get_item 使用的一致）"""
+        if self._uids is None:
+            from item_store import assign_uids
+            self._uids = assign_uids(self.data)[0]
+        return self._uids
+
+    @property
+    def related(self) -> List[List[Tuple[int, List[str]]]]:
+        """各条目预先算好的相关条目（共用宏与同源共现，见 related_items.py）"""
+        if self._related is None:
+            from related_items import related_items
+            self._related = related_items(self.data, self.uids)
+        return self._related
+
+    def item_page(self, pos: int) -> Page:
+        """items/ 下单个条目的独立页面（附相关条目）"""
+        item = self.data[pos]
+        uid = self.uids[pos]
+        name = short_name(item)
+        item_type = item.get('type', 'unknown')
+        package = item.get('macro_package', 'unknown')
+        parts = [f"""---
+title: {json.dumps(f"{name} - {package}", ensure_ascii=False)}
+description: {json.dumps(f"{display_name(item_type)} from {package}", ensure_ascii=False)}
+---
+
+# {self.escape(name)}
+
+**ID**: `{uid}`  
+**Type**: {display_name(item_type)}  
+**Package**: {package}  
+"""]
+        if item.get('chart_type'):
+            parts.append(f"**Chart Type**: {display_name(item['chart_type'])}  \n")
+        if item.get('source_file'):
+            parts.append(f"**Source**: `{item['source_file']}`  \n")
+        parts.append("\n")
+        if item.get('description'):
+            parts.append(f"{self.escape(item['description'])}\n\n")
+        if item.get('syntax'):
+            parts.append(f"**Syntax**:\n```latex\n{item['syntax']}\n```\n\n")
+        if item.get('code'):
+            parts.append(f'<pre><code class="language-latex">\n{self.code_block(pos, ITEM_CODE_LIMIT)}\n</code></pre>\n\n')
+        related = self.related[pos]
+        if related:
+            parts.append("## Related Items\n\n")
+            for other, macros in related:
+                entry = (f"- [{self.escape(short_name(self.data[other]))}](/{item_page_path(self.uids[other])})"
+                         f" - {self.data[other].get('macro_package', 'unknown')},"
+                         f" {display_name(self.data[other].get('type', 'unknown'))}")
+                if macros:
+                    entry += " · shared " + ", ".join(f"`{macro}`" for macro in macros[:3])
+                parts.append(entry + "\n")
+        return Page(item_page_path(uid) + ".mdx", ''.join(parts))
+
+    def search_file(self, path: str) -> Page:
+        """search-index/ 下的一个 JSON 分片或清单"""
+        return Page(path, self.search_index.render(path))
+
+    def render(self, views: Optional[List[str]] = None) -> Dict[str, List[Page]]:
+        """在当前进程中渲染指定视图（默认全部），返回 {视图名: 页面列表}"""
+        rendered: Dict[str, List[Page]] = {view: [] for view in (views or self.VIEWS)}
+        for view, page in iter_pages(self, self.plan(views)):
+            rendered[view].append(page)
+        return rendered
+
+
+_worker_engine: Optional[PageEngine] = None  # fork 出的渲染进程继承父进程的引擎（含已分组数据）
+
+
+def _render_in_worker(unit: Tuple[str, str, tuple]) -> Tuple[str, Page]:
+    return unit[0], _worker_engine.render_unit(unit)
+
+
+def iter_pages(engine: PageEngine, units: List[Tuple[str, str, tuple]],
+               processes: int = 1) -> Iterator[Tuple[str, Page]]:
+    """按规划顺序产出 (视图, 页面)
+
+    processes > 1 时把页面级工作单元分块交给进程池渲染；结果仍按规划顺序返回，
+    因此输出与串行渲染逐字节一致。没有 fork 的平台退回串行。
+    """
+    global _worker_engine
+    if processes <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for unit in units:
+            yield unit[0], engine.render_unit(unit)
+        return
+    _worker_engine = engine
+    try:
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            yield from pool.imap(_render_in_worker, units, chunksize=RENDER_CHUNK)
+    finally:
+        _worker_engine = None
+
+
+def page_hash(data: bytes) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+class PageWriter:
+    """按内容哈希增量写出页面
+
+    清单记录每个生成页面的所属视图与内容哈希：哈希未变且文件仍在时跳过写入；
+    清单中没有记录的已有文件（如首次运行）直接比较字节。渲染某个视图后，
+    该视图在清单中有记录、但本次未生成的页面视为过期并删除（手写页面不在清单中，不受影响）。
+    还没有清单时，先按 VIEW_PATTERNS 认领所渲染视图目录中已有的生成页面。
+    """
+
+    def __init__(self, root: Path = DOCS_DIR):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_FILE
+        self.manifest: Dict[str, Dict[str, str]] = {}
+        self.bootstrap = not self.manifest_path.exists()
+        if not self.bootstrap:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        self._seen = set()
+        self._dirty = False
+        self.written = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self._lock = threading.Lock()  # 多个写线程共用清单与计数
+
+    def write(self, view: str, page: Page) -> bool:
+        """写出一个页面，返回是否实际写入（可在多个线程中并发调用，各页面路径互不相同）"""
+        data = page.content.encode('utf-8')
+        digest = page_hash(data)
+        path = self.root / page.path
+        with self._lock:
+            self._seen.add(page.path)
+            entry = self.manifest.get(page.path)
+        if entry is not None and entry["hash"] == digest and path.exists():
+            same = True
+        elif entry is None and path.exists():
+            same = path.read_bytes() == data
+        else:
+            same = False
+        if not same:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        with self._lock:
+            if same:
+                self.unchanged += 1
+            else:
+                self.written += 1
+            if entry != {"view": view, "hash": digest}:
+                self.manifest[page.path] = {"view": view, "hash": digest}
+                self._dirty = True
+        return not same
+
+    def _existing_pages(self, views: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """文档目录中已有、路径符合所给视图页面模式的文件 (相对路径, 视图)"""
+        patterns = [(view, VIEW_PATTERNS[view]) for view in views if view in VIEW_PATTERNS]
+        if not self.root.exists():
+            return
+        for file in sorted(self.root.rglob('*')):
+            path = file.relative_to(self.root).as_posix()
+            for view, pattern in patterns:
+                if pattern.fullmatch(path):
+                    yield path, view
+                    break
+
+    def finish(self, views: List[str]):
+        """删除所渲染视图中的过期页面并保存清单（清单无变化时不写）"""
+        views = set(views)
+        if self.bootstrap:
+            for path, view in self._existing_pages(views):
+                self.manifest.setdefault(path, {"view": view, "hash": ""})
+            self.bootstrap = False
+        for path, entry in list(self.manifest.items()):
+            if entry["view"] in views and path not in self._seen:
+                target = self.root / path
+                if target.exists():
+                    target.unlink()
+                    self.deleted += 1
+                    try:
+                        target.parent.rmdir()  # 分组目录已空时一并删除
+                    except OSError:
+                        pass
+                del self.manifest[path]
+                self._dirty = True
+        if self._dirty:
+            tmp = self.manifest_path.with_name(f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
+            self._dirty = False
+
+
+def write_pages(pages: Iterable[Tuple[str, Page]], views: List[str], root: Path = DOCS_DIR,
+                threads: int = WRITE_THREADS) -> PageWriter:
+    """经有界队列增量写出页面，返回带写入/跳过/删除计数的 PageWriter
+
+    渲染端在队列满时阻塞，待写页面数不超过 WRITE_QUEUE_SIZE；固定数量的写线程并发写文件。
+    """
+    writer = PageWriter(root)
+    pending: 'queue.Queue[Optional[Tuple[str, Page]]]' = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    errors: List[BaseException] = []
+
+    def drain():
+        while True:
+            entry = pending.get()
+            if entry is None:
+                return
+            if not errors:
+                try:
+                    writer.write(*entry)
+                except BaseException as e:
+                    errors.append(e)
+
+    workers = [threading.Thread(target=drain, daemon=True) for _ in range(max(1, threads))]
+    for worker in workers:
+        worker.start()
+    try:
+        for entry in pages:
+            pending.put(entry)
+            if errors:
+                break
+    finally:
+        for _ in workers:
+            pending.put(None)
+        for worker in workers:
+            worker.join()
+    if errors:
+        raise errors[0]
+    writer.finish(views)
+    return writer
+
+
+def main(views: Optional[List[str]] = None):
+    """主函数：一次加载知识库并生成指定视图（默认全部）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the Mintlify MDX pages from the knowledge base")
+    parser.add_argument('--views', nargs='+', choices=PageEngine.VIEWS + PageEngine.OPTIONAL_VIEWS,
+                        default=list(views or PageEngine.VIEWS))
+    parser.add_argument('--output', type=Path, default=DOCS_DIR)
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help="render processes (1 = serial; output is identical either way)")
+    args = parser.parse_args([] if views is not None else None)
+
+    print("=" * 70)
+    print("Mintlify 文档页面生成")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    engine = PageEngine.load()
+    print(f"\n✓ Loaded {len(engine.data)} items in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    units = engine.plan(args.views)
+    counts: Dict[str, int] = {}
+    for view, _, _ in units:
+        counts[view] = counts.get(view, 0) + 1
+    for view, count in counts.items():
+        print(f"  [{view}] {count} pages")
+    writer = write_pages(iter_pages(engine, units, args.processes), args.views, args.output)
+    from navigation import update_navigation  # navigation 依赖本模块，延迟导入
+    changed = update_navigation(writer.manifest, engine, args.output)
+
+    print()
+    print("=" * 70)
+    print(f"✓ Rendered {len(units)} pages with {args.processes} process(es) in "
+          f"{time.perf_counter() - start:.2f}s")
+    print(f"  written {writer.written}, unchanged {writer.unchanged}, deleted {writer.deleted}")
+    print(f"  navigation: {', '.join(str(path) for path in changed) if changed else 'unchanged'}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+检索结果缓存
+按 (知识库版本, 工具名, 规范化参数) 缓存响应，容量与 TTL 双重限制的 LRU 淘汰
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+def normalize_query(query: str) -> str:
+    """查询规范化：小写并折叠空白，使 "Bar  Chart" 与 "bar chart" 命中同一条目"""
+    return ' '.join((query or '').lower().split())
+
+
+def cache_key(kb_version: str, tool: str, arguments: Dict[str, Any]) -> Tuple[str, str, str]:
+    """缓存键：知识库版本变化时全部旧条目自然失效"""
+    normalized = dict(arguments)
+    if isinstance(normalized.get('query'), str):
+        normalized['query'] = normalize_query(normalized['query'])
+    return kb_version, tool, json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+class QueryCache:
+    """容量 + TTL 限制的 LRU 缓存"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()  # 服务端在线程池中并发调用
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """命中时移到队尾并返回；过期条目视为未命中并删除"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        """写入并在超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存（计数器保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中、未命中与淘汰计数"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
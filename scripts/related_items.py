@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+相关条目
+构建时为每个条目预先算好若干相关条目：共用的宏（按 IDF 加权，越少见的宏权重越高）
+加上同一源文件中相邻出现的条目（同一手册章节中的共现）。结果供条目独立页面的 "Related Items" 使用。
+"""
+
+import re
+import math
+import time
+from typing import List, Dict, Set, Tuple
+
+RELATED_ITEMS = 5          # 每个条目保留的相关条目数
+MAX_MACRO_DF = 300         # 出现在过多条目中的宏（\draw、\node 等）不作为关联依据
+CO_OCCURRENCE_WINDOW = 2   # 同一源文件中前后各取几个条目视为共现
+CO_OCCURRENCE_WEIGHT = 1.0
+
+MACRO_PATTERN = re.compile(r'\\([A-Za-z@]+)')
+ENVIRONMENT_PATTERN = re.compile(r'\\begin\{([^}]+)\}')
+IGNORED_MACROS = {'\\begin', '\\end'}
+
+
+def item_macros(item: Dict) -> Set[str]:
+    """条目涉及的宏与环境：代码或语法中出现的 \\宏、{环境}，以及命令/环境条目本身的名称"""
+    text = item.get('code') or item.get('syntax') or ''
+    macros = {'\\' + name for name in MACRO_PATTERN.findall(text)}
+    macros.update('{' + name + '}' for name in ENVIRONMENT_PATTERN.findall(text))
+    match = MACRO_PATTERN.search(item.get('command_name') or '')
+    if match:
+        macros.add('\\' + match.group(1))
+    if item.get('environment_name'):
+        macros.add('{' + item['environment_name'].strip('{}') + '}')
+    return macros - IGNORED_MACROS
+
+
+def related_items(data: List[Dict], uids: List[str], limit: int = RELATED_ITEMS) -> List[List[Tuple[int, List[str]]]]:
+    """每个条目的相关条目 [(条目下标, 共用的宏（少见的在前）)]，按得分降序
+
+    相同唯一 ID 的重复条目只保留首次出现的一个；同分时优先同一宏包、再按知识库顺序。
+    """
+    first: Dict[str, int] = {}
+    for pos, uid in enumerate(uids):
+        first.setdefault(uid, pos)
+    macros = [item_macros(item) for item in data]
+
+    postings: Dict[str, List[int]] = {}
+    for pos, uid in enumerate(uids):
+        if first[uid] == pos:
+            for macro in macros[pos]:
+                postings.setdefault(macro, []).append(pos)
+    n = len(first)
+    weights = {macro: math.log(n / len(positions)) for macro, positions in postings.items()
+               if 1 < len(positions) <= MAX_MACRO_DF}
+
+    by_source: Dict[str, List[int]] = {}
+    for pos, item in enumerate(data):
+        if first[uids[pos]] == pos:
+            by_source.setdefault(item.get('source_file', ''), []).append(pos)
+    neighbours: Dict[int, List[int]] = {}
+    for positions in by_source.values():
+        for i, pos in enumerate(positions):
+            window = positions[max(0, i - CO_OCCURRENCE_WINDOW):i + 1 + CO_OCCURRENCE_WINDOW]
+            neighbours[pos] = [other for other in window if other != pos]
+
+    result: List[List[Tuple[int, List[str]]]] = []
+    for pos, item in enumerate(data):
+        scores: Dict[int, float] = {}
+        shared: Dict[int, List[str]] = {}
+        for macro in sorted(macros[pos]):
+            weight = weights.get(macro)
+            if weight is None:
+                continue
+            for other in postings[macro]:
+                scores[other] = scores.get(other, 0.0) + weight
+                shared.setdefault(other, []).append(macro)
+        for other in neighbours.get(first[uids[pos]], ()):
+            scores[other] = scores.get(other, 0.0) + CO_OCCURRENCE_WEIGHT
+        scores.pop(first[uids[pos]], None)
+        package = item.get('macro_package')
+        ranked = sorted(scores, key=lambda other: (-scores[other], data[other].get('macro_package') != package, other))
+        result.append([(other, sorted(shared.get(other, []), key=lambda m: -weights[m])) for other in ranked[:limit]])
+    return result
+
+
+def main():
+    """主函数：统计相关条目的覆盖率与构建耗时"""
+    import json
+    from pathlib import Path
+    from item_store import assign_uids
+
+    print("=" * 70)
+    print("相关条目")
+    print("=" * 70)
+
+    knowledge_file = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+    with open(knowledge_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    uids, _, _ = assign_uids(data)
+    start = time.perf_counter()
+    related = related_items(data, uids)
+    elapsed = time.perf_counter() - start
+
+    with_related = sum(1 for entries in related if entries)
+    by_macro = sum(1 for entries in related if any(macros for _, macros in entries))
+    same_package = sum(1 for pos, entries in enumerate(related) for other, _ in entries
+                       if data[other].get('macro_package') == data[pos].get('macro_package'))
+    total = sum(len(entries) for entries in related)
+    print(f"\n✓ {len(data)} items in {elapsed:.2f}s")
+    print(f"  with related items: {with_related} ({with_related / len(data):.1%})")
+    print(f"  linked by shared macros: {by_macro} ({by_macro / len(data):.1%})")
+    print(f"  same-package links: {same_package / max(total, 1):.1%}")
+
+
+if __name__ == '__main__':
+    main()
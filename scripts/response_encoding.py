@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+工具响应的字段投影与紧凑序列化
+每个条目的静态字段只做一次 JSON 编码，之后的响应直接拼接预编码片段
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+# 每次请求都会变化的字段，不缓存其编码
+DYNAMIC_FIELDS = frozenset({"relevance", "similarity"})
+
+# 片段缓存上限：键含客户端给出的字段投影，不设上限时每种新投影都会让常驻服务再缓存一份条目编码
+DEFAULT_MAX_FRAGMENTS = 32768
+
+
+# 紧凑 JSON 编码（无多余空白，保留非 ASCII 字符）；复用同一编码器，避免每次调用重新构造
+dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+class ItemResult(dict):
+    """由某个知识库条目生成的结果
+
+    行为与普通 dict 一致；额外记录条目下标与结果视图（同名字段在不同工具中可能取值不同），
+    序列化时据此复用预编码片段。被修改后的副本（如按 token 预算截断的结果）是普通 dict，
+    会按常规方式编码。
+    """
+
+    def __init__(self, pos: int, values: Dict[str, Any], view: str = "result"):
+        super().__init__(values)
+        self.pos = pos
+        self.view = view
+
+
+def project(result: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """按 fields 投影结果字段；fields 为空时原样返回"""
+    if not fields:
+        return result
+    projected = {f: result[f] for f in fields if f in result}
+    if isinstance(result, ItemResult):
+        return ItemResult(result.pos, projected, result.view)
+    return projected
+
+
+class FragmentEncoder:
+    """按条目缓存 JSON 片段的编码器（线程安全）
+
+    片段以 (条目下标, 视图, 静态字段名元组) 为键：同一条目以同一投影再次出现时整段复用，
+    只有 relevance 等动态字段需要当场编码。缓存按 LRU 淘汰，最多 max_fragments 个片段。
+    """
+
+    def __init__(self, max_fragments: int = DEFAULT_MAX_FRAGMENTS):
+        self.max_fragments = max_fragments
+        self._fragments: 'OrderedDict[Tuple[int, str, Tuple[str, ...]], str]' = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def encode_item(self, result: ItemResult) -> str:
+        """拼接条目的预编码片段与动态字段"""
+        static = tuple(f for f in result if f not in DYNAMIC_FIELDS)
+        key = (result.pos, result.view, static)
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+        if fragment is None:
+            fragment = dumps({f: result[f] for f in static})[1:-1]
+            with self._lock:
+                self._fragments[key] = fragment
+                while len(self._fragments) > self.max_fragments:
+                    self._fragments.popitem(last=False)
+                    self.evictions += 1
+        parts = [fragment] if fragment else []
+        parts.extend(f'"{f}":{dumps(result[f])}' for f in DYNAMIC_FIELDS if f in result)
+        return '{' + ','.join(parts) + '}'
+
+    def encode(self, value: Any) -> str:
+        """序列化整个响应：ItemResult 走片段拼接，不含嵌套容器的部分整体交给 json 编码"""
+        if isinstance(value, ItemResult):
+            return self.encode_item(value)
+        if isinstance(value, dict):
+            if not any(isinstance(v, (dict, list)) for v in value.values()):
+                return dumps(value)
+            return '{' + ','.join(dumps(str(k)) + ':' + self.encode(v) for k, v in value.items()) + '}'
+        if isinstance(value, list):
+            if not any(isinstance(v, (dict, list)) for v in value):
+                return dumps(value)
+            return '[' + ','.join(self.encode(v) for v in value) + ']'
+        return dumps(value)
+
+    def stats(self) -> Dict[str, int]:
+        return {"fragments": len(self._fragments), "evictions": self.evictions}
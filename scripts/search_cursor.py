@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+检索结果游标
+把上一页最后一条的 (分数, 条目下标)、知识库版本和查询指纹编码为不透明令牌
+"""
+
+import json
+import base64
+import hashlib
+from typing import Dict, Any, Optional
+
+from query_cache import normalize_query
+
+CURSOR_VERSION = 1
+
+
+class CursorError(ValueError):
+    """游标无法解析，或与当前查询/知识库版本不匹配"""
+
+
+def query_fingerprint(query: str, category: str, filters: Optional[Dict[str, Any]]) -> str:
+    """同一查询（忽略大小写与空白差异）得到相同指纹；limit 不参与，允许翻页时改变页大小"""
+    payload = json.dumps([normalize_query(query), category, filters or {}],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(kb_version: str, fingerprint: str, score: float, doc: int,
+                  served: int, top: float) -> str:
+    """生成游标令牌
+
+    served 为此前已返回的结果数，用于回填 offset；top 为第一名分数，
+    后续页据此计算 relevance，无需重新求第一名。
+    """
+    payload = {"c": CURSOR_VERSION, "v": kb_version, "q": fingerprint,
+               "s": score, "d": doc, "n": served, "t": top}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, kb_version: str, fingerprint: str) -> Dict[str, Any]:
+    """解析并校验游标，返回 {"score", "doc", "served", "top"}"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        score, doc, served = float(payload["s"]), int(payload["d"]), int(payload["n"])
+        top = float(payload["t"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError("Cursor is malformed") from e
+
+    if payload.get("c") != CURSOR_VERSION:
+        raise CursorError("Cursor format is not supported")
+    if payload.get("v") != kb_version:
+        raise CursorError("Cursor was issued for a different knowledge base version")
+    if payload.get("q") != fingerprint:
+        raise CursorError("Cursor does not belong to this query")
+    return {"score": score, "doc": doc, "served": served, "top": top}
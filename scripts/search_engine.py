@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+知识库全文检索引擎
+倒排索引 + BM25 打分，过滤条件通过分面位图按位求交
+"""
+
+import re
+import math
+import time
+import heapq
+from bisect import bisect_left
+from functools import lru_cache
+from typing import List, Dict, Any, Mapping, Optional, Tuple
+
+from facet_index import FacetIndex, bitmap_from_positions, iter_bits, popcount
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+BLOCK_SIZE = 64        # 倒排表分块大小，每块记录最大分量用于跳块
+BITMAP_MIN_DF = 128    # 文档频率不低于此值的词预先构建命中位图，用于 O(1) 统计总数
+SCORE_DIGITS = 9       # 分数舍入位数，消除累加顺序带来的浮点误差，保证游标翻页稳定
+
+# 字段权重：名称类字段命中最重要，代码只做弱信号
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "chart_type": 2.0,
+    "macro_package": 2.0,
+    "description": 1.0,
+    "code": 0.3,
+}
+
+NAME_FIELDS = ('command_name', 'component_name', 'environment_name', 'key_name', 'title')
+
+STOPWORDS = {"a", "an", "the", "with", "and", "or", "of", "to", "in", "for", "on", "by", "how"}
+
+TERM_PATTERN = re.compile(r'\\?[a-z0-9]+(?:[-_][a-z0-9]+)*')
+
+# search.mdx 中 category 参数对应的过滤条件
+CATEGORY_FILTERS = {
+    "tikz": {"macro_package": "tikz-pgf"},
+    "pgfplots": {"macro_package": "pgfplots"},
+    "charts": {"type": "executable_example"},
+    "all": {},
+}
+
+# search.mdx filters 对象的键 -> 分面字段
+FILTER_FIELDS = {
+    "chart_type": "chart_type",
+    "package": "macro_package",
+    "has_example": "has_example",
+    "complexity": "complexity",
+    "type": "type",
+}
+
+
+def text_terms(text: str) -> List[str]:
+    """把文本切分为检索词：保留 LaTeX 命令，同时拆出复合词的各部分"""
+    terms = []
+    for match in TERM_PATTERN.findall((text or '').lower()):
+        if match in STOPWORDS:
+            continue
+        terms.append(match)
+        bare = match.lstrip('\\')
+        if bare != match:
+            terms.append(bare)
+        if '-' in bare or '_' in bare:
+            terms.extend(p for p in re.split(r'[-_]', bare) if p and p not in STOPWORDS)
+    return terms
+
+
+@lru_cache(maxsize=4096)
+def query_terms(query: str) -> Tuple[str, ...]:
+    """查询分词结果缓存，批量检索与重复查询共享同一份分词"""
+    return tuple(text_terms(query))
+
+
+def item_content(item: Dict) -> str:
+    """条目的返回内容：代码优先，其次语法、描述"""
+    return item.get('code') or item.get('syntax') or item.get('description', '')
+
+
+def item_name(item: Dict) -> str:
+    """条目的显示名称"""
+    for field in NAME_FIELDS:
+        if item.get(field):
+            return item[field]
+    chart_type = item.get('chart_type') or 'other'
+    return f"{chart_type.replace('_', ' ').title()} Example"
+
+
+class SearchEngine:
+    """BM25 检索引擎
+
+    每个词的倒排表按条目下标升序保存 (docs, impacts)，impacts 为预先算好的 BM25 分量。
+    另外保存每个词的分量上界和分块上界，top-k 检索使用 MaxScore 按文档逐个遍历，
+    剩余条目不可能进入 top-k 时提前结束；过滤条件先由 FacetIndex 合成一个位图掩码。
+    """
+
+    def __init__(self, data: List[Dict]):
+        self.data = data
+        self.size = len(data)
+        self.postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        self.max_impact: Dict[str, float] = {}
+        self.block_max: Dict[str, List[float]] = {}
+        self.term_bitmaps: Dict[str, int] = {}
+        self.facets = FacetIndex.build(data)
+        self._build()
+
+    @classmethod
+    def from_parts(cls, size: int, postings: Mapping, max_impact: Mapping, block_max: Mapping,
+                   term_bitmaps: Mapping, facets: FacetIndex) -> 'SearchEngine':
+        """由已构建好的索引结构组装（如直接映射自索引快照的只读视图），不重新建索引"""
+        engine = cls.__new__(cls)
+        engine.data = None
+        engine.size = size
+        engine.postings = postings
+        engine.max_impact = max_impact
+        engine.block_max = block_max
+        engine.term_bitmaps = term_bitmaps
+        engine.facets = facets
+        return engine
+
+    def _build(self):
+        """构建倒排索引并预计算 BM25 分量"""
+        doc_terms: List[Dict[str, float]] = []
+        lengths = []
+        for item in self.data:
+            weighted: Dict[str, float] = {}
+            fields = {
+                "name": item_name(item) if any(item.get(f) for f in NAME_FIELDS) else '',
+                "chart_type": item.get('chart_type') or '',
+                "macro_package": item.get('macro_package') or '',
+                "description": item.get('description') or '',
+                "code": item.get('code') or '',
+            }
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for term in text_terms(text):
+                    weighted[term] = weighted.get(term, 0.0) + weight
+            doc_terms.append(weighted)
+            lengths.append(sum(weighted.values()))
+
+        n = len(self.data)
+        avg_len = (sum(lengths) / n) if n else 1.0
+        doc_freq: Dict[str, int] = {}
+        for weighted in doc_terms:
+            for term in weighted:
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        for doc, weighted in enumerate(doc_terms):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / avg_len)
+            for term, tf in weighted.items():
+                idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                docs, impacts = self.postings.setdefault(term, ([], []))
+                docs.append(doc)
+                impacts.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        for term, (docs, impacts) in self.postings.items():
+            self.max_impact[term] = max(impacts)
+            self.block_max[term] = [max(impacts[i:i + BLOCK_SIZE])
+                                    for i in range(0, len(impacts), BLOCK_SIZE)]
+            if len(docs) >= BITMAP_MIN_DF:
+                self.term_bitmaps[term] = bitmap_from_positions(docs, n)
+
+    def filter_mask(self, category: str = "all", filters: Optional[Dict[str, Any]] = None) -> int:
+        """把 category 与 filters 合成位图掩码；非法参数抛出 ValueError"""
+        if category not in CATEGORY_FILTERS:
+            raise ValueError(f"Category '{category}' is not recognized")
+        if filters is not None and not isinstance(filters, dict):
+            raise ValueError("'filters' must be an object")
+        conditions = {}
+        for key, value in (filters or {}).items():
+            if key not in FILTER_FIELDS:
+                raise ValueError(f"Filter '{key}' is not recognized")
+            conditions[FILTER_FIELDS[key]] = value
+        # category 与 filters 作用于同一字段时取交集
+        return self.facets.mask(CATEGORY_FILTERS[category]) & self.facets.mask(conditions)
+
+    def score(self, terms: List[str], mask: int) -> Dict[int, float]:
+        """穷举累加各词在掩码内条目上的 BM25 分量（作为 top_k 的对照基准）"""
+        scores: Dict[int, float] = {}
+        flags = self._mask_flags(mask)
+        for term in dict.fromkeys(terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            for doc, impact in zip(*posting):
+                if flags is None or flags[doc >> 3] >> (doc & 7) & 1:
+                    scores[doc] = scores.get(doc, 0.0) + impact
+        return {doc: round(score, SCORE_DIGITS) for doc, score in scores.items()}
+
+    def _mask_flags(self, mask: int) -> Optional[bytes]:
+        """把掩码转成字节串以便逐条目 O(1) 判断；全集返回 None"""
+        if mask == self.facets.all:
+            return None
+        return mask.to_bytes(self.size // 8 + 1, 'little')
+
+    def match_bitmap(self, terms: List[str]) -> int:
+        """任一检索词命中的条目位图（高频词直接取预建位图）"""
+        matched = 0
+        for term in dict.fromkeys(terms):
+            bitmap = self.term_bitmaps.get(term)
+            if bitmap is None:
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                bitmap = bitmap_from_positions(posting[0], self.size)
+            matched |= bitmap
+        return matched
+
+    def top_k(self, terms: List[str], mask: int, k: int,
+              after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """MaxScore 文档逐个遍历取 top-k
+
+        检索词按分量上界升序排列，上界前缀和不超过当前第 k 名分数的词为"非必要词"：
+        只命中非必要词的条目不可能进入 top-k，因此只沿必要词的倒排表推进，
+        非必要词用二分查找补分并在上界不足时提前放弃。只剩一个必要词时按分块上界整块跳过。
+        排序与 score() 一致：分数降序，同分按条目下标升序。
+        after=(分数, 条目下标) 时只返回排在该位置之后的条目，用于游标翻页。
+        """
+        lists = sorted(
+            ((self.max_impact[t], self.postings[t], self.block_max[t])
+             for t in dict.fromkeys(terms) if t in self.postings),
+            key=lambda x: x[0])
+        if not lists or k <= 0:
+            return []
+
+        n = len(lists)
+        prefix = []
+        total = 0.0
+        for upper, _, _ in lists:
+            total += upper
+            prefix.append(total)
+
+        flags = self._mask_flags(mask)
+        pointers = [0] * n
+        heap: List[Tuple[float, int]] = []
+        threshold = -1.0
+        first_essential = 0
+
+        while True:
+            if len(heap) == k:
+                threshold = heap[0][0]
+                while first_essential < n and prefix[first_essential] <= threshold:
+                    first_essential += 1
+                if first_essential == n:
+                    break
+
+            # 只剩一个必要词：跳过上界不足的整块
+            if first_essential == n - 1 and len(heap) == k:
+                docs = lists[-1][1][0]
+                blocks = lists[-1][2]
+                rest = prefix[n - 2] if n > 1 else 0.0
+                block = pointers[-1] // BLOCK_SIZE
+                while block < len(blocks) and blocks[block] + rest <= threshold:
+                    block += 1
+                if block * BLOCK_SIZE > pointers[-1]:
+                    pointers[-1] = min(block * BLOCK_SIZE, len(docs))
+
+            doc = None
+            for i in range(first_essential, n):
+                docs = lists[i][1][0]
+                if pointers[i] < len(docs) and (doc is None or docs[pointers[i]] < doc):
+                    doc = docs[pointers[i]]
+            if doc is None:
+                break
+
+            score = 0.0
+            for i in range(first_essential, n):
+                docs, impacts = lists[i][1]
+                p = pointers[i]
+                if p < len(docs) and docs[p] == doc:
+                    score += impacts[p]
+                    pointers[i] = p + 1
+
+            if flags is not None and not flags[doc >> 3] >> (doc & 7) & 1:
+                continue
+
+            for i in range(first_essential - 1, -1, -1):
+                if len(heap) == k and score + prefix[i] <= threshold:
+                    break
+                docs, impacts = lists[i][1]
+                p = bisect_left(docs, doc, pointers[i])
+                pointers[i] = p
+                if p < len(docs) and docs[p] == doc:
+                    score += impacts[p]
+
+            score = round(score, SCORE_DIGITS)
+            if after is not None and (score > after[0] or (score == after[0] and doc <= after[1])):
+                continue
+
+            entry = (score, -doc)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        return [(-neg_doc, score) for score, neg_doc in sorted(heap, reverse=True)]
+
+    def search(self, query: str, category: str = "all", limit: int = 10, offset: int = 0,
+               filters: Optional[Dict[str, Any]] = None,
+               after: Optional[Tuple[float, int]] = None) -> Dict[str, Any]:
+        """执行检索，返回排序后的条目下标、总数与分面计数
+
+        排名只取前 offset + limit 名；传入 after 时从该位置继续，只需取 limit 名。
+        总数与分面计数由命中位图求得，不依赖完整打分。
+        """
+        start = time.perf_counter()
+        mask = self.filter_mask(category, filters)
+        terms = query_terms(query)
+        if after is not None:
+            ranked = self.top_k(terms, mask, limit, after)
+            hits = ranked
+        else:
+            ranked = self.top_k(terms, mask, offset + limit)
+            hits = ranked[offset:offset + limit]
+        matched = self.match_bitmap(terms) & mask
+
+        return {
+            "hits": hits,
+            "total": popcount(matched),
+            "max_score": ranked[0][1] if ranked and after is None else None,
+            "facets": self.facets.facet_counts(matched),
+            "time_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def explain(self, query: str, category: str = "all", limit: int = 10, offset: int = 0,
+                filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """查询计划：各检索词的文档频率与分量上界、过滤后的候选数、
+        按第 k 名分数划分的必要词，以及只剩一个必要词时可整块跳过的块数"""
+        mask = self.filter_mask(category, filters)
+        terms = query_terms(query)
+        k = offset + limit
+        ranked = self.top_k(terms, mask, k)
+        threshold = ranked[-1][1] if len(ranked) == k else 0.0
+
+        plan_terms = []
+        missing = []
+        for term in dict.fromkeys(terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                missing.append(term)
+                continue
+            plan_terms.append({"term": term, "df": len(posting[0]),
+                               "max_impact": round(self.max_impact[term], 4),
+                               "blocks": len(self.block_max[term]),
+                               "bitmap": term in self.term_bitmaps})
+        plan_terms.sort(key=lambda t: t["max_impact"])
+        running = 0.0
+        for entry in plan_terms:
+            running += entry["max_impact"]
+            entry["essential"] = running > threshold
+
+        essential = [t for t in plan_terms if t["essential"]]
+        skippable = 0
+        if len(essential) == 1:
+            rest = sum(t["max_impact"] for t in plan_terms if not t["essential"])
+            skippable = sum(1 for upper in self.block_max[essential[0]["term"]]
+                            if upper + rest <= threshold)
+        return {
+            "strategy": "maxscore",
+            "k": k,
+            "terms": plan_terms,
+            "unknown_terms": missing,
+            "filtered": mask != self.facets.all,
+            "candidates": popcount(mask),
+            "postings": sum(t["df"] for t in plan_terms),
+            "essential_postings": sum(t["df"] for t in essential),
+            "kth_score": round(threshold, 4),
+            "skippable_blocks": skippable,
+        }
+
+    def browse(self, category: str = "all", filters: Optional[Dict[str, Any]] = None,
+               limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """无查询词时按原始顺序列出过滤结果，总数与分面计数直接由位图得到"""
+        mask = self.filter_mask(category, filters)
+        hits = []
+        for i, doc in enumerate(iter_bits(mask)):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                hits.append((doc, 0.0))
+        return {
+            "hits": hits,
+            "total": popcount(mask),
+            "facets": self.facets.facet_counts(mask),
+        }
+
+
+def main():
+    """主函数：对比 MaxScore 与穷举打分的结果和延迟"""
+    import json
+    from pathlib import Path
+
+    knowledge_file = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+    with open(knowledge_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    start = time.perf_counter()
+    engine = SearchEngine(data)
+    print(f"✓ Indexed {len(data)} items in {time.perf_counter() - start:.2f}s "
+          f"({len(engine.postings)} terms)")
+    print()
+
+    queries = ["tikz node", "axis", "line chart with legend", "draw circle",
+               "resistor", "commutative diagram", "bar chart", "\\addplot coordinates"]
+    k = 10
+    print(f"{'query':28s} {'matches':>8s} {'exhaustive':>11s} {'maxscore':>9s}  same")
+    print("-" * 70)
+    for query in queries:
+        terms = text_terms(query)
+        mask = engine.facets.all
+
+        t0 = time.perf_counter()
+        scores = engine.score(terms, mask)
+        exhaustive = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:k]
+        t1 = time.perf_counter()
+        pruned = engine.top_k(terms, mask, k)
+        t2 = time.perf_counter()
+
+        same = all(abs(a[1] - b[1]) < 1e-9 for a, b in zip(exhaustive, pruned)) \
+            and len(exhaustive) == len(pruned)
+        print(f"{query:28s} {len(scores):8d} {(t1 - t0) * 1000:9.2f}ms {(t2 - t1) * 1000:7.2f}ms  {same}")
+
+
+if __name__ == '__main__':
+    main()
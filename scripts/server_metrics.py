@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+检索服务指标
+按工具统计请求数、错误数、延迟直方图（p50/p95/p99）与结果数分布，并保留慢查询样本。
+直方图为固定分桶计数，记录一次只是一次二分查找和几次加法；可导出为 Prometheus 文本格式。
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# 延迟分桶上界（秒），与 Prometheus 默认分桶相近，下端加密以区分缓存命中
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+RESULT_BUCKETS = (0, 1, 5, 10, 20, 50, 100)
+SLOW_QUERY_SECONDS = 0.05  # 超过此耗时的请求记入慢查询样本
+SLOW_QUERY_SAMPLES = 20
+
+
+class Histogram:
+    """固定分桶直方图（最后一个桶为 +Inf）"""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶内线性插值估算分位数；落在 +Inf 桶时返回最后一个有限上界"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Prometheus 风格的累计桶 [(le, 计数)]"""
+        buckets = []
+        running = 0
+        for bound, n in zip(list(self.bounds) + [float('inf')], self.counts):
+            running += n
+            buckets.append(("+Inf" if bound == float('inf') else repr(bound), running))
+        return buckets
+
+
+class ToolMetrics:
+    """单个工具的计数与直方图"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.results = Histogram(RESULT_BUCKETS)
+
+    def summary(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": ms(self.latency.quantile(0.5)),
+                "p95": ms(self.latency.quantile(0.95)),
+                "p99": ms(self.latency.quantile(0.99)),
+                "mean": ms(self.latency.total / self.latency.count) if self.latency.count else None,
+            },
+            "results": {
+                "mean": round(self.results.total / self.results.count, 2) if self.results.count else None,
+                "buckets": dict(self.results.cumulative()),
+            },
+        }
+
+
+def result_count(payload: Dict[str, Any]) -> Optional[int]:
+    """工具响应中的结果条数；错误响应与无结果列表的响应返回 None"""
+    if "error" in payload:
+        return None
+    for key in ("results", "items"):
+        if isinstance(payload.get(key), list):
+            return len(payload[key])
+    return 1 if "item" in payload else None
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+class ServerMetrics:
+    """服务端指标汇总（线程安全）"""
+
+    def __init__(self, slow_seconds: float = SLOW_QUERY_SECONDS):
+        self.slow_seconds = slow_seconds
+        self.started_at = time.time()
+        self.tools: Dict[str, ToolMetrics] = {}
+        self.slow_queries: deque = deque(maxlen=SLOW_QUERY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, seconds: float, is_error: bool, results: Optional[int] = None):
+        """记录一次工具调用"""
+        with self._lock:
+            metrics = self.tools.get(tool)
+            if metrics is None:
+                metrics = self.tools[tool] = ToolMetrics()
+            metrics.requests += 1
+            if is_error:
+                metrics.errors += 1
+            metrics.latency.observe(seconds)
+            if results is not None:
+                metrics.results.observe(results)
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= self.slow_seconds
+
+    def record_slow(self, tool: str, seconds: float, arguments: Dict[str, Any], plan: Optional[Dict[str, Any]]):
+        """保存慢查询样本（参数与查询计划），只保留最近的若干条"""
+        sample = {
+            "tool": tool,
+            "time_ms": round(seconds * 1000, 3),
+            "at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "arguments": arguments,
+            "plan": plan,
+        }
+        with self._lock:
+            self.slow_queries.append(sample)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "tools": {name: m.summary() for name, m in sorted(self.tools.items())},
+                "slow_query_threshold_ms": self.slow_seconds * 1000,
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def prometheus(self, gauges: Iterable[Tuple[str, str, str, Dict[str, Any], float]],
+                   common: Optional[Dict[str, Any]] = None) -> str:
+        """导出 Prometheus 文本格式；gauges 为额外的 (名称, 类型, 说明, 标签, 值)
+
+        common 为附加到每个序列上的标签（如多进程部署时的 pid），各进程的序列因此互不覆盖。
+        """
+        common = common or {}
+        lines: List[str] = []
+        with self._lock:
+            tools = sorted(self.tools.items())
+            lines += ["# HELP mcp_requests_total Tool calls handled",
+                      "# TYPE mcp_requests_total counter"]
+            for name, m in tools:
+                lines.append(f"mcp_requests_total{_labels({**common, 'tool': name, 'status': 'ok'})} {m.requests - m.errors}")
+                lines.append(f"mcp_requests_total{_labels({**common, 'tool': name, 'status': 'error'})} {m.errors}")
+            for metric, attr, help_text in (
+                    ("mcp_request_duration_seconds", "latency", "Tool call latency"),
+                    ("mcp_results", "results", "Results returned per tool call")):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for name, m in tools:
+                    histogram = getattr(m, attr)
+                    if not histogram.count:
+                        continue
+                    for le, count in histogram.cumulative():
+                        lines.append(f"{metric}_bucket{_labels({**common, 'tool': name, 'le': le})} {count}")
+                    lines.append(f"{metric}_sum{_labels({**common, 'tool': name})} {histogram.total!r}")
+                    lines.append(f"{metric}_count{_labels({**common, 'tool': name})} {histogram.count}")
+
+        declared = set()
+        for name, kind, help_text, labels, value in gauges:
+            if name not in declared:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                declared.add(name)
+            lines.append(f"{name}{_labels({**common, **labels})} {value}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+索引快照热更新
+监视 CURRENT 指针，在后台挂载新版本快照后原子切换；旧快照按引用计数退役，
+进行中的查询在其开始时的版本上完成，最后一个引用释放后才解除映射。
+"""
+
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from index_snapshot import SNAPSHOT_ROOT, Snapshot, current_snapshot
+from knowledge_tools import KnowledgeTools
+from query_cache import QueryCache
+
+DEFAULT_WATCH_INTERVAL = 2.0  # 检查 CURRENT 指针的间隔（秒）
+RELOAD_HISTORY = 10           # 保留最近几次切换记录
+
+
+def mapped_bytes(tools: KnowledgeTools) -> int:
+    """快照映射的文件总大小（字节）；内存中构建的索引返回 0"""
+    if tools.snapshot is None:
+        return 0
+    return sum(p.stat().st_size for p in tools.snapshot.directory.iterdir() if p.is_file())
+
+
+class SnapshotHandle:
+    """一个已挂载的版本及其引用计数"""
+
+    def __init__(self, tools: KnowledgeTools):
+        self.tools = tools
+        self.kb_version = tools.kb_version
+        self.refs = 0
+        self.retired = False
+        self.retired_at: Optional[float] = None
+        self.mapped_bytes = mapped_bytes(tools)
+
+
+class SnapshotManager:
+    """持有当前版本并负责切换与退役（线程安全）"""
+
+    def __init__(self, tools: KnowledgeTools, root: Optional[Path] = SNAPSHOT_ROOT):
+        self.root = Path(root) if root else None
+        self.cache = tools.cache  # 缓存键含知识库版本，各版本共用同一缓存，旧条目自然失效
+        self.current = SnapshotHandle(tools)
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._retiring: List[SnapshotHandle] = []
+        self._failed_version: Optional[str] = None
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_error: Optional[str] = None
+        self.history: List[Dict[str, Any]] = []
+
+    @classmethod
+    def open(cls, root: Path = SNAPSHOT_ROOT, cache: Optional[QueryCache] = None) -> 'SnapshotManager':
+        return cls(KnowledgeTools.open(root, cache=cache), root)
+
+    def acquire(self) -> SnapshotHandle:
+        """取当前版本并加一个引用；用完必须 release"""
+        with self._lock:
+            handle = self.current
+            handle.refs += 1
+            return handle
+
+    def retain(self, handle: SnapshotHandle):
+        """为同一版本再加一个引用（如批量请求分发到多个线程）"""
+        with self._lock:
+            handle.refs += 1
+
+    def release(self, handle: SnapshotHandle):
+        """释放引用；已退役且无引用的版本立即解除映射"""
+        with self._lock:
+            handle.refs -= 1
+            finished = handle.retired and handle.refs == 0
+            if finished:
+                self._retiring.remove(handle)
+        if finished:
+            self._close(handle)
+
+    def _close(self, handle: SnapshotHandle):
+        handle.tools.close()
+        overlap_ms = round((time.perf_counter() - handle.retired_at) * 1000, 3)
+        with self._lock:
+            for entry in self.history:
+                if entry["from_version"] == handle.kb_version and entry["overlap_ms"] is None:
+                    entry["overlap_ms"] = overlap_ms
+
+    def pending_version(self) -> Optional[Path]:
+        """CURRENT 指向的快照与当前版本不同（且不是上次失败的版本）时返回其目录"""
+        if self.root is None:
+            return None
+        directory = current_snapshot(self.root)
+        if directory is None or directory.name in (self.current.kb_version, self._failed_version):
+            return None
+        return directory
+
+    def reload(self, directory: Optional[Path] = None) -> bool:
+        """挂载新快照并原子切换；失败时保留当前版本。返回是否发生了切换"""
+        with self._reload_lock:
+            directory = directory or self.pending_version()
+            if directory is None:
+                return False
+            start = time.perf_counter()
+            try:
+                tools = KnowledgeTools.from_snapshot(Snapshot(directory), cache=self.cache)
+                tools.warm_up()
+            except (OSError, ValueError, KeyError) as e:
+                self.reload_failures += 1
+                self._failed_version = directory.name
+                self.last_error = f"{directory.name}: {e}"
+                return False
+            load_ms = round((time.perf_counter() - start) * 1000, 3)
+
+            new = SnapshotHandle(tools)
+            with self._lock:
+                old = self.current
+                self.current = new
+                old.retired = True
+                old.retired_at = time.perf_counter()
+                in_flight = old.refs
+                self._retiring.append(old)
+                self.reloads += 1
+                self._failed_version = None
+                self.history.append({
+                    "from_version": old.kb_version,
+                    "to_version": new.kb_version,
+                    "switched_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    "load_ms": load_ms,
+                    "in_flight_at_switch": in_flight,
+                    "overlap_bytes": old.mapped_bytes + new.mapped_bytes,
+                    "overlap_ms": None,
+                })
+                del self.history[:-RELOAD_HISTORY]
+            # 旧版本没有进行中的查询时直接退役
+            self.retain(old)
+            self.release(old)
+            return True
+
+    async def watch(self, interval: float = DEFAULT_WATCH_INTERVAL):
+        """定期检查 CURRENT 指针，发现新版本时在后台线程中加载并切换"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self.pending_version() is not None:
+                await loop.run_in_executor(None, self.reload)
+
+    def stats(self) -> Dict[str, Any]:
+        """当前版本、切换次数与最近的切换记录"""
+        with self._lock:
+            return {
+                "kb_version": self.current.kb_version,
+                "in_flight": self.current.refs,
+                "mapped_bytes": self.current.mapped_bytes,
+                "retiring": [{"kb_version": h.kb_version, "in_flight": h.refs} for h in self._retiring],
+                "reloads": self.reloads,
+                "reload_failures": self.reload_failures,
+                "last_error": self.last_error,
+                "history": [dict(entry) for entry in self.history],
+            }
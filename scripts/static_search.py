@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+静态分片检索索引
+随文档页面一起生成：BM25 倒排表按词哈希前缀拆成倒排分片，条目（含完整代码）按包拆成条目分片，
+另有一个小清单。浏览器或边缘节点只取查询词所在的倒排分片与命中条目所在的条目分片，
+静态托管即可做完整代码检索，不需要后端。
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from item_store import assign_uids
+from search_engine import SearchEngine, TERM_PATTERN, STOPWORDS, item_name, text_terms
+
+SEARCH_DIR = 'search-index'     # 相对 mintlify-docs/
+INDEX_FORMAT_VERSION = 1
+TERM_PREFIX_DIGITS = 2          # 倒排分片取词哈希的前 2 位十六进制（最多 256 片）
+ITEM_SHARD_BYTES = 16 * 1024    # 条目分片字节预算
+IMPACT_DIGITS = 3               # 分量保留的小数位数
+
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+
+def term_hash(term: str) -> str:
+    """词的 32 位 FNV-1a 哈希（UTF-8 字节，8 位十六进制），客户端几行代码即可实现"""
+    value = FNV_OFFSET
+    for byte in term.encode('utf-8'):
+        value = ((value ^ byte) * FNV_PRIME) & 0xFFFFFFFF
+    return f"{value:08x}"
+
+
+def term_shard(term: str, digits: int = TERM_PREFIX_DIGITS) -> str:
+    return term_hash(term)[:digits]
+
+
+def dumps(value: Any) -> str:
+    """分片统一的紧凑、确定性序列化（内容不变则字节不变，增量写出可跳过）"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+class StaticSearchIndex:
+    """把知识库拆成静态分片文件
+
+    文档号为按包分组（包内保持知识库顺序）后的重新编号，每个包的条目连续，
+    客户端按文档号区间即可定位条目分片，也可直接按包区间过滤。
+    """
+
+    def __init__(self, data: List[Dict], urls: List[str]):
+        from page_engine import paginate  # page_engine 在生成 search-index 视图时才导入本模块
+
+        n = len(data)
+        order = sorted(range(n), key=lambda pos: (data[pos].get('macro_package', 'unknown'), pos))
+        doc_of = [0] * n
+        for doc, pos in enumerate(order):
+            doc_of[pos] = doc
+
+        uids, _, _ = assign_uids(data)
+        records = [self._record(data[pos], uids[pos], urls[pos]) for pos in order]
+
+        # 条目分片：每个包按字节预算保序装箱
+        self.packages: Dict[str, List[int]] = {}
+        for doc, pos in enumerate(order):
+            package = data[pos].get('macro_package', 'unknown')
+            self.packages.setdefault(package, [doc, doc])[1] = doc + 1
+        self.item_shards: List[Tuple[str, int, int]] = []
+        self._items: Dict[str, List[Dict]] = {}
+        for package, (first, last) in self.packages.items():
+            sizes = [len(dumps(record).encode('utf-8')) for record in records[first:last]]
+            for i, (start, end) in enumerate(paginate(sizes, ITEM_SHARD_BYTES)):
+                path = f"{SEARCH_DIR}/items/{package}-{i:03d}.json"
+                self.item_shards.append((path, first + start, first + end))
+                self._items[path] = records[first + start:first + end]
+
+        # 倒排分片：{词: [文档号差分, 分量]}，文档号升序
+        engine = SearchEngine(data)
+        self._terms: Dict[str, Dict[str, List[List]]] = {}
+        for term, (docs, impacts) in engine.postings.items():
+            pairs = sorted(zip((doc_of[pos] for pos in docs), impacts))
+            deltas, previous = [], 0
+            for doc, _ in pairs:
+                deltas.append(doc - previous)
+                previous = doc
+            shard = self._terms.setdefault(f"{SEARCH_DIR}/terms/{term_shard(term)}.json", {})
+            shard[term] = [deltas, [round(impact, IMPACT_DIGITS) for _, impact in pairs]]
+        self.count = n
+
+    @staticmethod
+    def _record(item: Dict, uid: str, url: str) -> Dict[str, Any]:
+        record = {
+            "id": item.get('id'),
+            "title": item_name(item),
+            "type": item.get('type'),
+            "package": item.get('macro_package'),
+            "url": url,
+        }
+        if uid != record["id"]:
+            record["uid"] = uid
+        for field in ('chart_type', 'description', 'syntax', 'code'):
+            if item.get(field):
+                record[field] = item[field]
+        return record
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "format_version": INDEX_FORMAT_VERSION,
+            "count": self.count,
+            "term_hash": "fnv1a32",
+            "term_prefix_digits": TERM_PREFIX_DIGITS,
+            "term_shards": sorted(Path(path).stem for path in self._terms),
+            "tokenizer": {
+                "lowercase": True,
+                "pattern": TERM_PATTERN.pattern,
+                "stopwords": sorted(STOPWORDS),
+                "also_index": "term without leading backslash; parts split on - and _",
+            },
+            "scoring": "sum of per-term BM25 impacts",
+            "impact_digits": IMPACT_DIGITS,
+            "postings": "{term: [doc deltas, impacts]}",
+            "packages": self.packages,
+            "item_shards": [[Path(path).name, start, end] for path, start, end in self.item_shards],
+        }
+
+    def files(self) -> List[str]:
+        """全部分片路径（清单在最后）"""
+        return sorted(self._terms) + [path for path, _, _ in self.item_shards] + [f"{SEARCH_DIR}/manifest.json"]
+
+    def render(self, path: str) -> str:
+        if path in self._terms:
+            return dumps(self._terms[path])
+        if path in self._items:
+            return dumps(self._items[path])
+        return dumps(self.manifest())
+
+
+class StaticSearchClient:
+    """参考客户端：只按需读取分片（fetch 为按相对路径取字节的函数，如 HTTP GET）"""
+
+    def __init__(self, fetch: Callable[[str], bytes]):
+        self._fetch = fetch
+        self._cache: Dict[str, Any] = {}
+        self.bytes_fetched = 0
+        self.manifest = self._get("manifest.json")
+        self._shards = set(self.manifest["term_shards"])
+
+    def _get(self, path: str) -> Any:
+        if path not in self._cache:
+            raw = self._fetch(path)
+            self.bytes_fetched += len(raw)
+            self._cache[path] = json.loads(raw.decode('utf-8'))
+        return self._cache[path]
+
+    def search(self, query: str, limit: int = 10, package: Optional[str] = None) -> List[Dict[str, Any]]:
+        """BM25 检索，返回带 score 的条目记录；package 非空时只保留该包的文档号区间"""
+        low, high = self.manifest["packages"].get(package, (0, 0)) if package else (0, self.manifest["count"])
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(text_terms(query)):
+            prefix = term_shard(term, self.manifest["term_prefix_digits"])
+            if prefix not in self._shards:
+                continue
+            posting = self._get(f"terms/{prefix}.json").get(term)
+            if posting is None:
+                continue
+            doc = 0
+            for delta, impact in zip(*posting):
+                doc += delta
+                if low <= doc < high:
+                    scores[doc] = scores.get(doc, 0.0) + impact
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
+        return [dict(self.item(doc), score=round(score, IMPACT_DIGITS)) for doc, score in ranked]
+
+    def item(self, doc: int) -> Dict[str, Any]:
+        for name, start, end in self.manifest["item_shards"]:
+            if start <= doc < end:
+                return self._get(f"items/{name}")[doc - start]
+        raise KeyError(doc)
+
+
+def main():
+    """主函数：读取已生成的分片，对比完整 BM25 的 top-10 并统计每个查询的传输量"""
+    import argparse
+    from knowledge_tools import KnowledgeTools
+    from page_engine import DOCS_DIR
+
+    parser = argparse.ArgumentParser(description="Check the static sharded search index")
+    parser.add_argument('--root', type=Path, default=DOCS_DIR / SEARCH_DIR)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("静态分片检索索引")
+    print("=" * 70)
+
+    files = [p for p in args.root.rglob('*.json')]
+    terms = [p for p in files if p.parent.name == 'terms']
+    items = [p for p in files if p.parent.name == 'items']
+    for label, group in (("倒排分片", terms), ("条目分片", items)):
+        sizes = sorted(p.stat().st_size for p in group)
+        print(f"\n{label}: {len(group)} 个, 共 {sum(sizes) / 1024:.0f} KB, "
+              f"中位 {sizes[len(sizes) // 2] / 1024:.1f} KB, 最大 {sizes[-1] / 1024:.1f} KB")
+
+    tools = KnowledgeTools.load()
+    queries = ["circuit diagram resistor", "bar chart pgfplots", "3d surface plot", "benzene ring",
+               "commutative diagram arrows", "binary tree", "\\draw arrow", "node distance",
+               "tkz-euclide triangle", "network graph vertices"]
+    print(f"\n{'query':<30} {'KB':>7} {'recall':>7} {'ms':>7}")
+    for query in queries:
+        client = StaticSearchClient(lambda path: (args.root / path).read_bytes())
+        start = time.perf_counter()
+        results = client.search(query, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        exact = tools.engine.search(query, limit=args.limit)["hits"]
+        expected = {tools.item(pos)['uid'] for pos, _ in exact}
+        found = {r.get('uid', r['id']) for r in results}
+        recall = len(expected & found) / len(expected) if expected else 1.0
+        print(f"{query:<30} {client.bytes_fetched / 1024:>7.1f} {recall:>7.2f} {elapsed:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
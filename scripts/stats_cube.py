@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+知识库统计立方体
+一次遍历按 包 × 类型 × 图表类型 × 源文件 聚合条目数，并与知识库版本一起保存；
+extraction-stats.json、knowledge-stats.json 与各索引页中的数字都从这里汇总，保证口径一致。
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+CUBE_FILE = Path(__file__).parent.parent / 'knowledge-base' / 'stats-cube.json'
+CUBE_FORMAT_VERSION = 1
+DIMENSIONS = ("macro_package", "type", "chart_type", "source_file")
+
+Cell = Tuple[str, str, str, str]
+
+
+def kb_version(raw: bytes) -> str:
+    """知识库版本：文件内容 MD5 的前 12 位（与索引快照一致）"""
+    return hashlib.md5(raw).hexdigest()[:12]
+
+
+class StatsCube:
+    """稀疏计数立方体：只保存出现过的维度组合"""
+
+    def __init__(self, cells: Dict[Cell, int], kb_version: str = ""):
+        self.cells = cells
+        self.kb_version = kb_version
+
+    @classmethod
+    def build(cls, data: Iterable[Dict], kb_version: str = "") -> 'StatsCube':
+        cells: Dict[Cell, int] = {}
+        for item in data:
+            cell = tuple(item.get(dim) or '' for dim in DIMENSIONS)
+            cells[cell] = cells.get(cell, 0) + 1
+        return cls(cells, kb_version)
+
+    @property
+    def total(self) -> int:
+        return sum(self.cells.values())
+
+    def _matches(self, cell: Cell, filters: Dict[str, str]) -> bool:
+        return all(cell[DIMENSIONS.index(dim)] == value for dim, value in filters.items())
+
+    def count(self, **filters: str) -> int:
+        """满足过滤条件的条目数，如 count(type='executable_example')"""
+        return sum(n for cell, n in self.cells.items() if self._matches(cell, filters))
+
+    def rollup(self, *dims: str, **filters: str) -> Dict[Any, int]:
+        """按若干维度汇总（单个维度时键为值本身，多个维度时为元组），按条目数降序、同数按键排列"""
+        indexes = [DIMENSIONS.index(dim) for dim in dims]
+        counts: Dict[Any, int] = {}
+        for cell, n in self.cells.items():
+            if filters and not self._matches(cell, filters):
+                continue
+            key = cell[indexes[0]] if len(indexes) == 1 else tuple(cell[i] for i in indexes)
+            counts[key] = counts.get(key, 0) + n
+        return dict(sorted(counts.items(), key=lambda x: (-x[1], x[0])))
+
+    # ---- 报表 ----
+
+    def extraction_stats(self, packages: Iterable[str] = ()) -> Dict[str, int]:
+        """extraction-stats.json：各包条目数（packages 中没有条目的包记 0）与总数"""
+        stats = {package: 0 for package in packages}
+        stats.update(self.rollup("macro_package"))
+        stats = dict(sorted(stats.items()))
+        stats["total"] = self.total
+        return stats
+
+    def knowledge_stats(self, schema_version: str, generated_at: str) -> Dict[str, Any]:
+        """knowledge-stats.json：总数、按类型与按包的条目数"""
+        return {
+            "total_items": self.total,
+            "by_type": self.rollup("type"),
+            "by_package": self.rollup("macro_package"),
+            "schema_version": schema_version,
+            "generated_at": generated_at,
+            "kb_version": self.kb_version,
+        }
+
+    # ---- 持久化 ----
+
+    def save(self, path: Path = CUBE_FILE):
+        payload = {
+            "format_version": CUBE_FORMAT_VERSION,
+            "kb_version": self.kb_version,
+            "dimensions": list(DIMENSIONS),
+            "total": self.total,
+            "cells": [list(cell) + [n] for cell, n in sorted(self.cells.items())],
+        }
+        tmp = Path(path).with_name(f"{Path(path).name}.tmp-{os.getpid()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = CUBE_FILE) -> Optional['StatsCube']:
+        """读取已保存的立方体；文件不存在或格式不符时返回 None"""
+        if not Path(path).exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get("format_version") != CUBE_FORMAT_VERSION or payload.get("dimensions") != list(DIMENSIONS):
+            return None
+        return cls({tuple(row[:-1]): row[-1] for row in payload["cells"]}, payload["kb_version"])
+
+    @classmethod
+    def for_knowledge(cls, data: List[Dict], version: str, path: Path = CUBE_FILE) -> 'StatsCube':
+        """取与知识库版本一致的已保存立方体；版本不符时重新聚合并保存"""
+        cube = cls.load(path)
+        if cube is not None and cube.kb_version == version:
+            return cube
+        cube = cls.build(data, version)
+        cube.save(path)
+        return cube
+
+
+def main():
+    """主函数：重建立方体并打印主要维度的汇总"""
+    print("=" * 70)
+    print("知识库统计立方体")
+    print("=" * 70)
+
+    knowledge_file = Path(__file__).parent.parent / 'knowledge-base' / 'latex-all-knowledge-raw.json'
+    raw = knowledge_file.read_bytes()
+    cube = StatsCube.build(json.loads(raw.decode('utf-8')), kb_version(raw))
+    cube.save()
+    print(f"\n✓ {cube.total} items, {len(cube.cells)} cells, kb_version {cube.kb_version} -> {CUBE_FILE}")
+    for dim in DIMENSIONS[:3]:
+        print(f"\n{dim}:")
+        for key, n in list(cube.rollup(dim).items())[:10]:
+            print(f"  {key or '-':30s} {n:6d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,8 @@ from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
 
+from stats_cube import StatsCube, kb_version
+
 
 class KnowledgeStructurer:
     """知识结构化处理器"""
@@ -268,21 +270,9 @@ def main():
 
     print(f"Saved to {output_file}")
 
-    # 生成统计信息
-    stats = {
-        "total_items": len(structured_items),
-        "by_type": {},
-        "by_package": {},
-        "schema_version": "1.0.0",
-        "generated_at": datetime.now().isoformat()
-    }
-
-    for item in structured_items:
-        item_type = item["type"]
-        package = item["macro_package"]
-
-        stats["by_type"][item_type] = stats["by_type"].get(item_type, 0) + 1
-        stats["by_package"][package] = stats["by_package"].get(package, 0) + 1
+    # 生成统计信息（由结构化条目的统计立方体汇总，版本取原始知识文件）
+    cube = StatsCube.build(structured_items, kb_version(raw_file.read_bytes()))
+    stats = cube.knowledge_stats(structurer.schema_version, datetime.now().isoformat())
 
     stats_file = base_path / "knowledge-stats.json"
     with open(stats_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+按 token 预算装箱检索结果
+估算每个条目的 token 长度，并在语句边界处截断过长的代码示例
+"""
+
+import re
+import math
+from typing import List, Dict, Any, Tuple
+
+CHARS_PER_TOKEN = 3.5        # LaTeX 代码符号密集，按每 token 约 3.5 个字符估算
+RESULT_OVERHEAD_TOKENS = 40  # id / title / url / tags 等字段与 JSON 结构的开销
+MIN_TRIMMED_TOKENS = 60      # 剩余预算低于此值时不再截断塞入，避免返回无用的残片
+TRUNCATION_MARK = "% ... (truncated)"
+
+# 结构边界：语句结束（\addplot ...; / \draw ...;）、环境结束、空行
+BOUNDARY_PATTERN = re.compile(r';[ \t]*(?:%[^\n]*)?\n|\\end\{[^}]+\}[ \t]*\n|\n[ \t]*\n')
+ENV_PATTERN = re.compile(r'\\(begin|end)\{([^}]+)\}')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数"""
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _closers(code: str) -> str:
+    """为截断后仍未闭合的环境补上 \\end{...}"""
+    stack = []
+    for kind, name in ENV_PATTERN.findall(code):
+        if kind == 'begin':
+            stack.append(name)
+        elif stack and stack[-1] == name:
+            stack.pop()
+    return ''.join(f"\\end{{{name}}}\n" for name in reversed(stack))
+
+
+def trim_code(code: str, max_tokens: int) -> Tuple[str, bool]:
+    """把代码截断到 max_tokens 以内，返回 (代码, 是否截断)
+
+    截断点选在最后一个能放下的语句/环境结束处或空行，而不是任意字符；
+    截断后补齐未闭合的环境，使片段保持结构完整。
+    """
+    if estimate_tokens(code) <= max_tokens:
+        return code, False
+
+    max_chars = math.ceil(max_tokens * CHARS_PER_TOKEN) - 1  # 估算值不超过 max_tokens 的最大长度
+    cuts = [m.end() for m in BOUNDARY_PATTERN.finditer(code) if m.end() <= max_chars]
+    if not cuts:
+        newline = code.rfind('\n', 0, max_chars)
+        cuts = [newline + 1] if newline > 0 else [max_chars]
+
+    for cut in reversed(cuts):
+        head = code[:cut]
+        if not head.endswith('\n'):
+            head += '\n'
+        trimmed = head + TRUNCATION_MARK + '\n' + _closers(head)
+        if len(trimmed) <= max_chars:
+            return trimmed.rstrip('\n'), True
+
+    return code[:max(0, max_chars - len(TRUNCATION_MARK) - 1)] + '\n' + TRUNCATION_MARK, True
+
+
+def pack_results(results: List[Dict[str, Any]], costs: List[int], max_tokens: int,
+                 field: str = "content") -> Dict[str, Any]:
+    """按相关度顺序贪心装箱，used_tokens 不超过 max_tokens
+
+    costs 为各结果 field 字段的预估 token 数，只在结果中确有该字段时计入（字段投影去掉它时不占预算）。
+    放得下的结果原样保留；放不下的代码类结果在剩余预算足够时按结构边界截断后放入，
+    否则跳过并继续尝试后面更短的结果。consumed 为装入的最后一条结果之后的位置，
+    翻页应从这里继续，其后被跳过的结果留给下一页；一条也放不下时 required_tokens 为放下第一条所需的预算。
+    """
+    packed = []
+    omitted = []
+    used = 0
+    consumed = 0
+    required = 0
+    for i, (result, cost) in enumerate(zip(results, costs)):
+        if field not in result:
+            cost = 0
+        overhead = RESULT_OVERHEAD_TOKENS + estimate_tokens(result.get("snippet", ""))
+        remaining = max_tokens - used - overhead
+        trimmable = '\\' in (result.get(field) or '')
+        if i == 0:
+            required = overhead + (min(cost, MIN_TRIMMED_TOKENS) if trimmable else cost)
+        if cost > remaining and remaining >= MIN_TRIMMED_TOKENS and trimmable:
+            content, _ = trim_code(result[field], remaining)
+            result = dict(result, **{field: content, "truncated": True})
+            cost = estimate_tokens(content)
+        if cost > remaining:
+            omitted.append(result.get("id"))
+            continue
+        packed.append(result)
+        used += overhead + cost
+        consumed = i + 1
+
+    budget = {
+        "results": packed,
+        "used_tokens": used,
+        "omitted_ids": omitted,
+        "consumed": consumed,
+    }
+    if results and not packed:
+        budget["required_tokens"] = required
+    return budget
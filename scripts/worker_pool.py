@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+多进程检索服务
+预派生的监督进程先创建监听套接字，再 fork 出多个工作进程共享它，由内核把连接分给各进程。
+各工作进程以只读 mmap 挂载同一个索引快照：页缓存只有一份，新增进程只增加解释器本身的内存。
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import traceback
+from typing import Dict, List, Optional
+
+RESTART_BACKOFF = 1.0   # 工作进程启动后很快退出时，重启前等待的秒数
+MIN_UPTIME = 2.0        # 运行不足此时长即退出视为启动失败
+LISTEN_BACKLOG = 1024
+
+
+class Supervisor:
+    """预派生监督进程：维持固定数量的工作进程，异常退出时重启，收到 SIGTERM/SIGINT 时一并结束"""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = args.processes
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.restarts = 0
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            from mcp_server import serve
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                serve(self.args, self.sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """准备好索引快照并创建监听套接字，再派生工作进程并监督，直到全部工作进程退出
+
+        快照在 fork 之前由监督进程挂载或构建，工作进程启动时都能直接挂载同一个快照。
+        """
+        from index_snapshot import ensure_snapshot
+        from knowledge_tools import KNOWLEDGE_FILE
+
+        start = time.perf_counter()
+        directory = ensure_snapshot(KNOWLEDGE_FILE)
+        print(f"Supervisor {os.getpid()}: snapshot {directory.name} ready in "
+              f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+        self.sock = socket.create_server((self.args.host, self.args.port), backlog=LISTEN_BACKLOG)
+        self.sock.setblocking(False)
+        print(f"Supervisor {os.getpid()}: {self.processes} workers on "
+              f"http://{self.args.host}:{self.args.port}/mcp", file=sys.stderr)
+        for _ in range(self.processes):
+            self._spawn()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            print(f"Worker {pid} exited with {code}; restarting", file=sys.stderr)
+            if time.monotonic() - started < MIN_UPTIME:
+                time.sleep(RESTART_BACKOFF)
+            self.restarts += 1
+            self._spawn()
+        self.sock.close()
+
+
+def worker_pids(supervisor_pid: int) -> List[int]:
+    """监督进程的子进程（Linux /proc）"""
+    path = f"/proc/{supervisor_pid}/task/{supervisor_pid}/children"
+    try:
+        with open(path) as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """进程的 RSS 与 PSS（按共享进程数分摊共享页后的实际占用），单位 KB"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ("Rss", "Pss"):
+                    usage[name.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _load_client(port: int, duration: float, queries: List[str], queue):
+    """压测客户端：一个 keep-alive 连接上循环发送检索请求"""
+    import http.client
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        body = json.dumps({"jsonrpc": "2.0", "id": done, "method": "tools/call", "params": {
+            "name": "search_latex_knowledge",
+            "arguments": {"query": queries[done % len(queries)], "limit": 10}}})
+        conn.request("POST", "/mcp", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            errors += 1
+        done += 1
+    conn.close()
+    queue.put((done, errors))
+
+
+def main():
+    """主函数：分别以 1/2/4 个工作进程启动服务，对比吞吐与内存"""
+    import subprocess
+    import multiprocessing
+    import urllib.request
+    from pathlib import Path
+
+    duration = 5.0
+    clients = 8
+    queries = ["tikz node", "axis", "line chart with legend", "draw circle", "resistor",
+               "commutative diagram", "bar chart", "addplot coordinates", "matrix", "arrow"]
+    server = Path(__file__).parent / 'mcp_server.py'
+
+    print("=" * 70)
+    print(f"多进程检索服务压测（{os.cpu_count()} 核，{clients} 个客户端，每轮 {duration:.0f}s）")
+    print("=" * 70)
+    print(f"{'processes':>9s} {'req/s':>8s} {'errors':>7s} {'RSS total':>10s} {'PSS total':>10s} {'PSS/worker':>11s}")
+    print("-" * 70)
+
+    for processes in (1, 2, 4):
+        port = 3100 + processes
+        supervisor = subprocess.Popen(
+            [sys.executable, str(server), '--transport', 'http', '--port', str(port),
+             '--processes', str(processes), '--watch-interval', '0'],
+            stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            time.sleep(0.5)
+
+            queue = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_load_client, args=(port, duration, queries, queue))
+                       for _ in range(clients)]
+            for w in workers:
+                w.start()
+            results = [queue.get() for _ in workers]
+            for w in workers:
+                w.join()
+
+            pids = worker_pids(supervisor.pid) if processes > 1 else [supervisor.pid]
+            usage = [memory_kb(pid) for pid in pids]
+            rss = sum(u.get("rss", 0) for u in usage)
+            pss = sum(u.get("pss", 0) for u in usage)
+            total = sum(done for done, _ in results)
+            errors = sum(e for _, e in results)
+            print(f"{processes:9d} {total / duration:8.0f} {errors:7d} {rss / 1024:8.1f}MB "
+                  f"{pss / 1024:8.1f}MB {pss / 1024 / max(1, len(pids)):9.1f}MB")
+        finally:
+            supervisor.send_signal(signal.SIGTERM)
+            supervisor.wait(timeout=10)
+
+    # 对照：每个进程各自解析 JSON 并在内存中建索引时的单进程占用
+    probe = ("import os, knowledge_tools, worker_pool; t = knowledge_tools.KnowledgeTools.load(); "
+             "t.warm_up(); print(worker_pool.memory_kb(os.getpid()).get('pss', 0))")
+    pss = int(subprocess.run([sys.executable, '-c', probe], cwd=Path(__file__).parent,
+                             capture_output=True, text=True).stdout.strip() or 0)
+    print(f"\n对照：内存中自建索引的单个进程 PSS {pss / 1024:.1f}MB")
+
+
+if __name__ == '__main__':
+    main()